@@ -0,0 +1,5 @@
+"""Offline benchmarks for the RAG system.
+
+Run them with:
+    python -m benchmarks.run --docs 1000 --queries 200
+"""
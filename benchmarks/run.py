@@ -0,0 +1,402 @@
+"""Offline benchmark of ingestion, retrieval and end-to-end query latency.
+
+Generates a synthetic corpus of job description PDFs, then measures:
+
+- parse: PDF load and split throughput
+- embed: chunk embedding throughput
+- index: index build time, serialized size, memory and recall@k against flat search
+- ingest: DocumentProcessor.update_index on an empty index, end to end
+- retrieval: retriever latency percentiles and the hit rate of the source document
+  in the top k
+- e2e: RAGModel.get_response latency and streamed time to first token, with a
+  local stub LLM that simulates token latency
+
+Results are written as JSON; pass --baseline with an earlier result file to
+print the relative change of every metric.
+
+Usage:
+    python -m benchmarks.run --docs 1000 --queries 200 --index-type hnsw
+"""
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from benchmarks.stub_llm import StubChatModel
+from benchmarks.synthetic import generate_corpus, generate_questions
+from rag_app import document_processor, index_factory, metrics
+from rag_app.document_processor import DocumentProcessor
+from rag_app.embedding_backends import BACKENDS, build_embeddings
+from rag_app.rag_model import RAGModel
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def run_benchmark(
+    docs: int = 1000,
+    queries: int = 200,
+    e2e_queries: int = 50,
+    embeddings: str = "fake",
+    embedding_backend: Optional[str] = None,
+    index_type: Optional[str] = None,
+    min_vectors: Optional[int] = None,
+    encoding: Optional[str] = None,
+    docstore: Optional[str] = None,
+    retrieval_mode: Optional[str] = None,
+    workers: int = 1,
+    first_token_latency: float = 0.2,
+    token_latency: float = 0.01,
+    answer_tokens: int = 64,
+    seed: int = 0,
+    workdir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Generate a corpus and run every benchmark phase on it.
+
+    Args:
+        docs: Number of synthetic PDFs.
+        queries: Number of retrieval queries.
+        e2e_queries: Number of end-to-end get_response queries.
+        embeddings: "fake" for deterministic hash embeddings, which isolates
+            everything but the model, or "model" for the configured model.
+        embedding_backend: Overrides document.embeddings.backend for the model.
+        index_type: Overrides document.index.type.
+        min_vectors: Overrides document.index.min_vectors.
+        encoding: Overrides document.index.encoding.
+        docstore: Overrides document.storage.docstore.
+        retrieval_mode: Overrides retrieval.mode ("hybrid" or "vector").
+        workers: PDF parsing processes.
+        first_token_latency: Stub LLM delay before the first token, in seconds.
+        token_latency: Stub LLM delay per token, in seconds.
+        answer_tokens: Stub LLM answer length in tokens.
+        seed: Seed of the corpus and the queries.
+        workdir: Directory for the corpus and index; a temporary directory
+            that is removed afterwards when None.
+
+    Returns:
+        Dict with the benchmark "params" and "results" per phase.
+    """
+    params = {
+        "docs": docs, "queries": queries, "e2e_queries": e2e_queries,
+        "embeddings": embeddings, "embedding_backend": embedding_backend,
+        "index_type": index_type, "min_vectors": min_vectors,
+        "encoding": encoding, "docstore": docstore,
+        "retrieval_mode": retrieval_mode, "workers": workers,
+        "first_token_latency": first_token_latency, "token_latency": token_latency,
+        "answer_tokens": answer_tokens, "seed": seed,
+    }
+    # The processor reads its settings from its module config
+    doc_config = document_processor.config
+    saved_config = copy.deepcopy(doc_config)
+    if embedding_backend is not None:
+        embeddings_config = doc_config['document'].setdefault('embeddings', {})
+        embeddings_config['backend'] = embedding_backend
+    if index_type is not None:
+        doc_config['document'].setdefault('index', {})['type'] = index_type
+    if min_vectors is not None:
+        doc_config['document'].setdefault('index', {})['min_vectors'] = min_vectors
+    if encoding is not None:
+        doc_config['document'].setdefault('index', {})['encoding'] = encoding
+    if docstore is not None:
+        doc_config['document'].setdefault('storage', {})['docstore'] = docstore
+    if retrieval_mode is not None:
+        doc_config['retrieval']['mode'] = retrieval_mode
+    params["index"] = index_factory.index_settings(
+        doc_config['document'].get('index', {})
+    )
+    k = doc_config['retrieval']['k']
+
+    root = workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    try:
+        corpus_dir = os.path.join(root, "docs")
+        start = time.perf_counter()
+        jobs = generate_corpus(corpus_dir, docs, seed=seed)
+        results: Dict[str, Any] = {"generate": {"seconds": time.perf_counter() - start}}
+
+        model = _embeddings(embeddings)
+        processor = DocumentProcessor(
+            path=corpus_dir,
+            index_path=os.path.join(root, "index"),
+            embeddings=model,
+            ingest_workers=workers,
+        )
+
+        rel_paths = processor._list_pdfs()
+        start = time.perf_counter()
+        texts = [
+            chunk.page_content
+            for _, chunks in processor._iter_split_files(rel_paths)
+            for chunk in chunks
+        ]
+        seconds = time.perf_counter() - start
+        results["parse"] = {
+            "seconds": seconds,
+            "chunks": len(texts),
+            "docs_per_second": len(rel_paths) / seconds,
+            "chunks_per_second": len(texts) / seconds,
+        }
+
+        start = time.perf_counter()
+        vectors = []
+        for i in range(0, len(texts), processor.embed_batch_size):
+            batch = texts[i:i + processor.embed_batch_size]
+            vectors.extend(model.embed_documents(batch))
+        vectors = np.asarray(vectors, dtype=np.float32)
+        seconds = time.perf_counter() - start
+        results["embed"] = {
+            "seconds": seconds, "chunks_per_second": len(texts) / seconds
+        }
+
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        index = index_factory.build_index(
+            vectors, doc_config['document'].get('index', {})
+        )
+        seconds = time.perf_counter() - start
+        results["index"] = {
+            "seconds": seconds,
+            "type": type(index).__name__,
+            "vectors": int(index.ntotal),
+            "bytes": int(faiss.serialize_index(index).nbytes),
+            "rss_delta_mb": _rss_mb() - rss_before,
+            f"recall_at_{k}": index_factory.recall_at_k(index, vectors, k=k),
+        }
+        del index, vectors, texts
+
+        start = time.perf_counter()
+        counts = processor.update_index()
+        seconds = time.perf_counter() - start
+        results["ingest"] = {
+            "seconds": seconds,
+            "chunks": counts["added"],
+            "chunks_per_second": counts["added"] / seconds,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+
+        retriever = processor.get_retriever()
+        questions = generate_questions(jobs, queries, seed=seed + 1)
+        latencies, hits = [], 0
+        for item in questions:
+            start = time.perf_counter()
+            found = retriever.invoke(item["question"])
+            latencies.append(time.perf_counter() - start)
+            hits += any(
+                Path(doc.metadata["source"]).name == item["source"] for doc in found
+            )
+        results["retrieval"] = {
+            **_percentiles(latencies),
+            f"hit_rate_at_{k}": hits / len(questions) if questions else None,
+        }
+
+        llm = StubChatModel(
+            first_token_latency=first_token_latency,
+            token_latency=token_latency,
+            answer_tokens=answer_tokens,
+        )
+        rag_model = RAGModel("benchmark", llm=llm)
+        metrics.latency.reset()
+        latencies, first_tokens = [], []
+        for i, item in enumerate(generate_questions(jobs, e2e_queries, seed=seed + 2)):
+            start = time.perf_counter()
+            if i % 2:
+                # Every other query streams, to measure the time to first token
+                first_token = None
+                for part in rag_model.stream_response(retriever, item["question"]):
+                    if "answer" in part and first_token is None:
+                        first_token = time.perf_counter() - start
+                first_tokens.append(first_token)
+            else:
+                rag_model.get_response(retriever, item["question"])
+            latencies.append(time.perf_counter() - start)
+        results["e2e"] = {
+            **_percentiles(latencies),
+            "first_token": _percentiles(first_tokens),
+            "stages": metrics.latency.summary(),
+        }
+        results["peak_rss_mb"] = _peak_rss_mb()
+        return {"meta": _metadata(), "params": params, "results": results}
+    finally:
+        doc_config.clear()
+        doc_config.update(saved_config)
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Describe the relative change of every numeric result against a baseline.
+
+    Args:
+        current: Result of run_benchmark.
+        baseline: Earlier result, e.g. loaded from a JSON file of another commit.
+
+    Returns:
+        One line per metric present in both, e.g.
+        "retrieval.p50: 0.0123 -> 0.0101 (-17.9%)".
+    """
+    old = _flatten(baseline.get("results", {}))
+    lines = []
+    for name, value in _flatten(current.get("results", {})).items():
+        before = old.get(name)
+        if before is None:
+            continue
+        change = f"{(value - before) / before:+.1%}" if before else "n/a"
+        lines.append(f"{name}: {before:.4g} -> {value:.4g} ({change})")
+    return lines
+
+
+def _embeddings(kind: str) -> Embeddings:
+    """Embeddings model for the benchmark."""
+    if kind == "fake":
+        return DeterministicFakeEmbedding(size=384)
+    doc_config = document_processor.config['document']
+    return build_embeddings(doc_config['embedding_model'], doc_config.get('embeddings'))
+
+
+def _percentiles(samples: List[float]) -> Dict[str, Any]:
+    """Count, mean, p50 and p99 of latency samples in seconds."""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean": float(np.mean(samples)),
+        "p50": float(np.percentile(samples, 50)),
+        "p99": float(np.percentile(samples, 99)),
+    }
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MiB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into dotted names of numeric values."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def _metadata() -> Dict[str, Any]:
+    """Commit, time and platform the benchmark ran on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "faiss": faiss.__version__,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--docs", type=int, default=1000, help="number of synthetic PDFs"
+    )
+    parser.add_argument("--queries", type=int, default=200, help="retrieval queries")
+    parser.add_argument(
+        "--e2e-queries", type=int, default=50, help="get_response queries"
+    )
+    parser.add_argument("--embeddings", choices=["fake", "model"], default="fake")
+    parser.add_argument("--embedding-backend", choices=BACKENDS)
+    parser.add_argument("--index-type", choices=sorted(index_factory.INDEX_TYPES))
+    parser.add_argument(
+        "--min-vectors", type=int, help="override document.index.min_vectors"
+    )
+    parser.add_argument("--encoding", choices=sorted(index_factory.ENCODINGS))
+    parser.add_argument("--docstore", choices=["memory", "mmap"])
+    parser.add_argument("--retrieval-mode", choices=["hybrid", "vector"])
+    parser.add_argument("--workers", type=int, default=1, help="PDF parsing processes")
+    parser.add_argument("--first-token-latency", type=float, default=0.2)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--answer-tokens", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="keep the corpus and index in this directory")
+    parser.add_argument(
+        "--output",
+        help="result file (default: benchmarks/results/<time>-<commit>.json)",
+    )
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(
+        docs=args.docs,
+        queries=args.queries,
+        e2e_queries=args.e2e_queries,
+        embeddings=args.embeddings,
+        embedding_backend=args.embedding_backend,
+        index_type=args.index_type,
+        min_vectors=args.min_vectors,
+        encoding=args.encoding,
+        docstore=args.docstore,
+        retrieval_mode=args.retrieval_mode,
+        workers=args.workers,
+        first_token_latency=args.first_token_latency,
+        token_latency=args.token_latency,
+        answer_tokens=args.answer_tokens,
+        seed=args.seed,
+        workdir=args.workdir,
+    )
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{result['meta']['commit'] or 'nogit'}.json"
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result["results"], indent=2))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        commit = baseline.get('meta', {}).get('commit')
+        print(f"Compared with {args.baseline} ({commit}):")
+        for line in compare(result, baseline):
+            print(f"  {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Deterministic local chat model for end-to-end benchmarks.
+
+Answers are built from the words of the prompt, so the same prompt always
+yields the same answer, and generation sleeps per token to simulate the
+latency of a hosted model without calling one.
+"""
+import time
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that answers from the prompt words after simulated delays.
+
+    Attributes:
+        first_token_latency: Seconds before the first token, like prompt processing
+        token_latency: Seconds per generated token
+        answer_tokens: Number of tokens in every answer
+    """
+
+    first_token_latency: float = 0.2
+    token_latency: float = 0.01
+    answer_tokens: int = 64
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-stub"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        """The answer tokens for a prompt, chosen by a hash of the prompt."""
+        words = " ".join(str(message.content) for message in messages).split() or ["ok"]
+        digest = hashlib.sha256(" ".join(words).encode()).digest()
+        seed = int.from_bytes(digest[:8], "big")
+        return [
+            ("" if i == 0 else " ") + words[(seed + i * 7919) % len(words)]
+            for i in range(self.answer_tokens)
+        ]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        message = AIMessage(content="".join(tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        message = AIMessage(content="".join(tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency)
+        for i, token in enumerate(self._tokens(messages)):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
@@ -0,0 +1,255 @@
+"""Synthetic job description PDFs for benchmarks.
+
+Documents follow the layout of the PDFs in job_descriptions/ (a title line,
+then bulleted Job Code, Department, FLSA Status, Job Summary, Key
+Responsibilities and Qualifications fields) so they exercise the same
+parsing, chunking and metadata extraction. PDFs are written directly with a
+minimal PDF 1.4 writer, which keeps generating 100k documents fast and needs
+no extra dependency.
+"""
+import os
+import random
+import textwrap
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+ROLES: List[Tuple[str, str, str]] = [
+    ("Software Engineer", "Information Technology", "ENG"),
+    ("Data Scientist", "Information Technology", "DAT"),
+    ("DevOps Engineer", "Information Technology", "OPS"),
+    ("QA Analyst", "Information Technology", "QAA"),
+    ("Product Manager", "Product", "PRD"),
+    ("UX Designer", "Product", "UXD"),
+    ("Financial Analyst", "Finance", "FIN"),
+    ("Accountant", "Finance", "ACC"),
+    ("Payroll Specialist", "Finance", "PAY"),
+    ("Marketing Coordinator", "Marketing", "MKT"),
+    ("Content Strategist", "Marketing", "CNT"),
+    ("Sales Representative", "Sales", "SLS"),
+    ("Account Executive", "Sales", "ACX"),
+    ("Recruiter", "Human Resources", "HRR"),
+    ("HR Generalist", "Human Resources", "HRG"),
+    ("Operations Analyst", "Operations", "OPA"),
+    ("Supply Chain Planner", "Operations", "SCP"),
+    ("Customer Support Agent", "Customer Service", "CSA"),
+    ("Legal Counsel", "Legal", "LGL"),
+    ("Compliance Officer", "Legal", "CMP"),
+]
+LEVELS = ["Junior", "", "Senior", "Lead", "Principal"]
+SKILLS = [
+    "Python", "SQL", "Excel", "Tableau", "Salesforce", "HubSpot", "AWS", "Kubernetes",
+    "Terraform", "Java", "C++", "Figma", "SAP", "Workday", "Jira", "Power BI",
+    "GAAP reporting", "contract law", "SEO", "A/B testing", "Kafka", "Spark",
+]
+DUTIES = [
+    "Plan and prioritize work with cross-functional partners",
+    "Prepare weekly status reports for senior management",
+    "Maintain documentation of processes and decisions",
+    "Mentor new team members and review their work",
+    "Identify risks early and propose mitigation plans",
+    "Track key performance indicators and recommend improvements",
+    "Coordinate with vendors and external stakeholders",
+    "Ensure compliance with company policies and regulations",
+    "Support quarterly planning and budgeting cycles",
+    "Gather requirements and translate them into actionable tasks",
+    "Run retrospectives and drive continuous improvement",
+    "Present findings to leadership and customers",
+]
+DEGREES = [
+    "Bachelor's degree in Business Administration",
+    "Bachelor's degree in Computer Science",
+    "Bachelor's degree in Finance or Accounting",
+    "Bachelor's degree in Marketing or Communications",
+    "Master's degree in a related field",
+    "Juris Doctor from an accredited law school",
+]
+LOCATIONS = ["Austin", "Boston", "Chicago", "Denver", "Remote", "Seattle", "Toronto"]
+
+
+@dataclass
+class JobDescription:
+    """A generated job description and the facts questions are asked about."""
+
+    file_name: str
+    title: str
+    department: str
+    job_code: str
+    salary: str
+    skills: List[str]
+    lines: List[str]
+
+
+def generate_job(index: int, rng: random.Random) -> JobDescription:
+    """Generate one job description.
+
+    Args:
+        index: Sequence number, part of the unique job code.
+        rng: Random generator; the same seed yields the same corpus.
+
+    Returns:
+        The job description.
+    """
+    role, department, prefix = rng.choice(ROLES)
+    level = rng.choice(LEVELS)
+    title = f"{level} {role}".strip()
+    job_code = f"{prefix}-{index:06d}"
+    low = rng.randrange(40, 180) * 1000
+    salary = f"${low:,} - ${low + rng.randrange(10, 60) * 1000:,}"
+    skills = rng.sample(SKILLS, 4)
+    location = rng.choice(LOCATIONS)
+
+    lines = [
+        title,
+        f"*Job Code: {job_code}",
+        f"*Department: {department}",
+        f"*FLSA Status: {'Exempt' if low >= 60000 else 'Non-Exempt'}",
+        f"*Location: {location}",
+        f"*Salary Range: {salary}",
+        f"*Job Summary: The {title} supports the {department} team in {location} "
+        f"and owns outcomes for {rng.choice(DUTIES).lower()}.",
+        "*Key Responsibilities:",
+    ]
+    lines += [f"  - {duty}." for duty in rng.sample(DUTIES, 6)]
+    lines.append("*Qualifications:")
+    lines += [
+        f"  - {rng.choice(DEGREES)}.",
+        f"  - {rng.randrange(1, 12)}+ years of experience as a {role} or similar role.",
+        f"  - Proficiency with {', '.join(skills)}.",
+        "  - Excellent written and verbal communication skills.",
+    ]
+    return JobDescription(
+        file_name=f"{title} {job_code}.pdf",
+        title=title,
+        department=department,
+        job_code=job_code,
+        salary=salary,
+        skills=skills,
+        lines=lines,
+    )
+
+
+def generate_corpus(path: str, n_docs: int, seed: int = 0) -> List[JobDescription]:
+    """Write n_docs synthetic job description PDFs into a directory.
+
+    Args:
+        path: Directory to write the PDFs to; created if missing.
+        n_docs: Number of documents.
+        seed: Random seed.
+
+    Returns:
+        The generated job descriptions.
+    """
+    os.makedirs(path, exist_ok=True)
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(n_docs):
+        job = generate_job(i, rng)
+        with open(os.path.join(path, job.file_name), "wb") as f:
+            f.write(render_pdf(job.lines))
+        jobs.append(job)
+    return jobs
+
+
+def generate_questions(
+    jobs: List[JobDescription], n_queries: int, seed: int = 0
+) -> List[Dict[str, str]]:
+    """Generate questions whose answer is in exactly one known document.
+
+    Args:
+        jobs: The generated job descriptions.
+        n_queries: Number of questions.
+        seed: Random seed.
+
+    Returns:
+        Dicts with the "question" and the "source" file that answers it.
+    """
+    rng = random.Random(seed)
+    templates = [
+        "What is the salary range for the {title} role {job_code}?",
+        "Which skills does job {job_code} require?",
+        "What are the key responsibilities of the {title} position {job_code}?",
+        "Which department is the {title} ({job_code}) in?",
+    ]
+    questions = []
+    for _ in range(n_queries):
+        job = rng.choice(jobs)
+        template = rng.choice(templates)
+        questions.append({
+            "question": template.format(title=job.title, job_code=job.job_code),
+            "source": job.file_name,
+        })
+    return questions
+
+
+def render_pdf(lines: List[str], width: int = 90, lines_per_page: int = 48) -> bytes:
+    """Render lines of text as a PDF with Helvetica text.
+
+    Lines starting with "*" get a "●" bullet (ZapfDingbats), like the
+    bulleted fields of the real job descriptions. Long lines are wrapped.
+
+    Args:
+        lines: Lines of ASCII text.
+        width: Maximum characters per line.
+        lines_per_page: Lines per page.
+
+    Returns:
+        The PDF file contents.
+    """
+    wrapped: List[Tuple[bool, str]] = []
+    for line in lines:
+        bullet = line.startswith("*")
+        text = line[1:] if bullet else line
+        for i, part in enumerate(textwrap.wrap(text, width) or [""]):
+            wrapped.append((bullet and i == 0, part))
+    pages = [
+        wrapped[i:i + lines_per_page] for i in range(0, len(wrapped), lines_per_page)
+    ]
+
+    n_pages = len(pages)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(
+            b"%d 0 R" % (5 + 2 * i) for i in range(n_pages)
+        ) + b"] /Count %d >>" % n_pages,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /ZapfDingbats >>",
+    ]
+    for page in pages:
+        ops = ["BT", "/F1 11 Tf", "14 TL", "60 740 Td"]
+        for bullet, text in page:
+            if bullet:
+                # "l" is the black circle of ZapfDingbats
+                ops.append(f"/F2 7 Tf (l) Tj /F1 11 Tf ( {_escape(text)}) Tj T*")
+            else:
+                ops.append(f"({_escape(text)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content_ref = len(objects) + 2
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> "
+            b"/Contents %d 0 R >>" % content_ref
+        )
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, xref
+    )
+    return bytes(out)
+
+
+def _escape(text: str) -> str:
+    """Escape a string for a PDF literal."""
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
@@ -0,0 +1,168 @@
+"""Semantic answer cache for the RAG system.
+
+This module caches generated answers by question. A repeated question is
+served from an exact-match lookup on its normalized text; a paraphrase is
+served when its embedding is close enough to a cached question's. Entries
+expire after a TTL, are evicted in least-recently-used order beyond a fixed
+capacity, and are dropped whenever the vector store is rebuilt.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+
+class AnswerCache:
+    """Caches RAG responses keyed by question text and question similarity.
+
+    Attributes:
+        embeddings: Embeddings model used to compare questions
+        similarity_threshold: Minimum cosine similarity for a semantic hit
+        ttl_seconds: Lifetime of a cached answer
+        max_entries: Maximum number of cached answers
+        index_version: Version of the vector store the cached answers came from
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 512,
+    ) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            embeddings: Embeddings model used to compare questions.
+            similarity_threshold: Minimum cosine similarity for a semantic hit.
+            ttl_seconds: Lifetime of a cached answer in seconds.
+            max_entries: Maximum number of cached answers.
+        """
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.index_version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, question: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for a question or a close paraphrase of it.
+
+        Args:
+            question: The user's question.
+
+        Returns:
+            A copy of the cached response, or None on a miss.
+        """
+        key = _normalize(question)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            has_entries = bool(self._entries)
+
+        if entry is None and has_entries:
+            # Embed outside the lock so slow embeddings do not serialize lookups
+            vector = self._embed(question)
+            with self._lock:
+                entry = self._nearest(vector)
+
+        with self._lock:
+            if entry is None or entry["key"] not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry["key"])
+            self.hits += 1
+        logger.info(f"Answer cache hit for question: {question}")
+        return dict(entry["response"])
+
+    def put(self, question: str, response: Dict[str, Any]) -> None:
+        """Cache the response generated for a question.
+
+        Args:
+            question: The user's question.
+            response: The response returned by the RAG chain.
+        """
+        key = _normalize(question)
+        vector = self._embed(question)
+        with self._lock:
+            self._entries[key] = {
+                "key": key,
+                "vector": vector,
+                "response": dict(response),
+                "created": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, index_version: Optional[str] = None) -> None:
+        """Drop every cached answer if the vector store version changed.
+
+        Args:
+            index_version: Version of the current vector store.
+        """
+        with self._lock:
+            if index_version == self.index_version:
+                return
+            if self._entries:
+                logger.info("Vector store changed, clearing answer cache")
+            self._entries.clear()
+            self.index_version = index_version
+
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of cached answers."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+    def _embed(self, question: str) -> np.ndarray:
+        """Embed a question as a unit-length vector."""
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _nearest(self, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """Return the most similar cached entry above the similarity threshold."""
+        entries = list(self._entries.values())
+        if not entries:
+            return None
+        similarities = np.stack([entry["vector"] for entry in entries]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return entries[best]
+
+    def _expire(self) -> None:
+        """Remove entries older than the TTL."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        # Entries are only ever moved to the end on use, so check them all
+        for key in [k for k, e in self._entries.items() if e["created"] < cutoff]:
+            del self._entries[key]
+
+
+def _normalize(question: str) -> str:
+    """Lowercase a question and collapse its whitespace for exact matching."""
+    return " ".join(question.lower().split())
@@ -5,19 +5,22 @@ system. It provides a user interface for interacting with job description docume
 using the Llama3 8B model through Groq's API.
 """
 import os
-import time
-import warnings
-import torch
 import logging
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Iterator
 
 import streamlit as st
 from dotenv import load_dotenv
 from PIL import Image
 
-from rag_app.document_processor import DocumentProcessor
-from rag_app.rag_model import RAGModel
+from rag_app import metrics
 from rag_app.config.loader import load_config, setup_logging
+from rag_app.startup import ResourceLoader
+
+# torch, the embedding model, FAISS and the LLM client are imported by the
+# background loader, so the UI renders before they are ready
+if TYPE_CHECKING:
+    from rag_app.document_processor import DocumentProcessor
+    from rag_app.rag_model import RAGModel
 
 # Load configuration and setup logging
 config = load_config()
@@ -25,6 +28,35 @@ setup_logging(config)
 logger = logging.getLogger(__name__)
 
 
+@st.cache_resource(show_spinner=False)
+def get_shared_loader() -> ResourceLoader:
+    """Return the process-wide loader, starting it on first use.
+
+    The embedding model and the vector store are built once per process in a
+    background thread and shared by every Streamlit session.
+    """
+    logger.info("Starting shared resource loader")
+    return ResourceLoader().start()
+
+
+def get_shared_processor() -> "DocumentProcessor":
+    """Return the process-wide DocumentProcessor, waiting until it is loaded."""
+    return get_shared_loader().wait()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_model(api_key: str) -> "RAGModel":
+    """Return the process-wide RAGModel for the given Groq API key.
+
+    Args:
+        api_key: API key for the Groq service.
+    """
+    from rag_app.rag_model import RAGModel
+
+    logger.info("Initializing shared RAGModel")
+    return RAGModel(api_key, embeddings=get_shared_processor().embeddings)
+
+
 class RAGApp:
     """Main application class for the RAG system.
     
@@ -45,19 +77,41 @@ class RAGApp:
             logger.error("GROQ_API_KEY is not set in environment variables")
             raise ValueError("GROQ_API_KEY is not set in the environment variables.")
         
-        # Fix PyTorch classes warning
-        logger.info("Configuring PyTorch settings")
-        torch.classes.__path__ = []
-        os.environ["TOKENIZERS_PARALLELISM"] = "false"
-        warnings.filterwarnings("ignore", message=".*torch.classes.*_path.*")
-
-        logger.info("Initializing DocumentProcessor")
-        self.processor = DocumentProcessor()
-        logger.info("Initializing RAGModel")
-        self.model = RAGModel(self.api_key)
-        self.vectorstore = None
+        # Models and the index are shared across sessions and load in the
+        # background; queries always run against the processor's latest index
+        self.loader = get_shared_loader()
         logger.info("RAGApp initialization complete")
 
+    @property
+    def processor(self) -> "DocumentProcessor":
+        """The shared DocumentProcessor; blocks until it is loaded."""
+        return get_shared_processor()
+
+    @property
+    def model(self) -> "RAGModel":
+        """The shared RAGModel; blocks until the processor is loaded."""
+        return get_shared_model(self.api_key)
+
+    def wait_until_ready(self) -> bool:
+        """Show loading status in the sidebar and wait for the shared resources.
+
+        Called after the UI has rendered, so the page paints while the
+        embedding model and index are still loading.
+
+        Returns:
+            True if the processor loaded, False if loading failed.
+        """
+        status = st.sidebar.empty()
+        if self.loader.status == "loading":
+            with status, st.spinner("Loading embedding model and index..."):
+                self.loader.join()
+        if self.loader.status == "failed":
+            status.error(f"Failed to load the embedding model: {self.loader.error}")
+            return False
+
+        status.success("Embedding model ready")
+        return True
+
     def load_styles(self) -> None:
         """Load custom CSS styles for the Streamlit app.
         
@@ -97,21 +151,30 @@ class RAGApp:
     def prepare_vectorstore(self) -> None:
         """Embed and cache documents.
         
-        Loads documents, creates embeddings, and stores them in a vector store.
-        The vector store is cached in the Streamlit session state for subsequent queries.
+        Brings the shared vector store up to date with the PDFs on disk. Only
+        new or modified documents are embedded, so clicking again after the
+        persisted index was loaded is cheap when nothing changed.
         """
         logger.info("Preparing vector store")
-        if "vectorstore" in st.session_state:
-            logger.info("Vector store already exists in session state")
-            st.warning("Vector Store DB is already prepared. Please ask your questions.")
-        else:
-            logger.info("Starting document embedding process")
-            st.info("Preparing Document Embeddings. Please wait...")
-            with st.spinner("Loading and embedding documents..."):
-                self.vectorstore = self.processor.load_and_embed()
-                st.session_state["vectorstore"] = self.vectorstore
-                logger.info("Documents loaded and embedded successfully")
-                st.success("Documents loaded and embedded successfully!")
+        logger.info("Starting document embedding process")
+        st.info("Preparing Document Embeddings. Please wait...")
+        with st.spinner("Loading and embedding documents..."):
+            progress = st.progress(0.0)
+
+            def report(files_done: int, files_total: int, chunks: int) -> None:
+                progress.progress(
+                    files_done / files_total if files_total else 1.0,
+                    text=f"Embedded {chunks} chunks from {files_done}/{files_total} documents",
+                )
+
+            stats = self.processor.update_index(progress_callback=report)
+            progress.empty()
+            logger.info("Documents loaded and embedded successfully")
+            st.success(
+                "Documents loaded and embedded successfully! "
+                f"({stats['added']} added, {stats['updated']} updated, "
+                f"{stats['removed']} removed chunks)"
+            )
 
     def query_documents(self, prompt: str) -> None:
         """Run query against the vector store.
@@ -120,46 +183,99 @@ class RAGApp:
             prompt: The user's question or query string.
             
         Note:
-            This method requires the vector store to be prepared first using prepare_vectorstore().
+            This method requires an index, either persisted from an earlier run or
+            built with prepare_vectorstore(). Every query runs against the latest
+            index any session or the watcher has swapped in.
         """
         logger.info(f"Processing query: {prompt}")
-        if "vectorstore" not in st.session_state:
+        # Read the version before the store: if an update is swapped in between,
+        # answers are cached under the old version and invalidated on the next query
+        index_version = self.processor.index_version
+        vectorstore = self.processor.vectorstore
+        if vectorstore is None:
             logger.warning("Vector store not prepared")
             st.warning("Please click 'Document Embeddings' first to prepare the data.")
             return
 
         try:
-            logger.info("Creating retriever from vector store")
-            retriever = st.session_state["vectorstore"].as_retriever()
+            retriever = self.model.retriever_for(vectorstore, self.processor.get_retriever)
             if retriever is None:
                 logger.error("Failed to create retriever")
                 st.error("Failed to create retriever. Please try preparing the documents again.")
                 return
 
+            self.model.set_index_version(index_version)
+            if config['app']['ui'].get('stream_response'):
+                self.stream_query(retriever, prompt)
+                return
+
             st.info("Processing your query. Please wait...")
-            start = time.process_time()
             logger.info("Getting response from model")
 
-            response = self.model.get_response(retriever, prompt)
-            if not response or "answer" not in response:
-                logger.error("Failed to get response from model")
-                st.error("Failed to get response from the model. Please try again.")
-                return
+            with metrics.track_query(streamed=False) as timings:
+                response = self.model.get_response(retriever, prompt)
+                if not response or "answer" not in response:
+                    logger.error("Failed to get response from model")
+                    st.error("Failed to get response from the model. Please try again.")
+                    return
 
-            response_time = time.process_time() - start
-            logger.info(f"Query processed successfully in {response_time:.2f} seconds")
-            st.success("Query processed successfully!")
-            st.write("### Response:")
-            st.write(f"Response time: {response_time:.2f} seconds")
-            st.write(response["answer"])
+                response_time = timings.elapsed()
+                logger.info(f"Query processed successfully in {response_time:.2f} seconds")
+                with metrics.stage("render"):
+                    st.success("Query processed successfully!")
+                    st.write("### Response:")
+                    st.write(f"Response time: {response_time:.2f} seconds")
+                    st.write(response["answer"])
 
-            self.display_similarity_results(response.get("context", []))
+                    self.display_similarity_results(response.get("context", []))
 
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}", exc_info=True)
             st.error(f"An error occurred while processing your query: {str(e)}")
             st.info("Please try preparing the documents again or check your internet connection.")
 
+    def stream_query(self, retriever: Any, prompt: str) -> None:
+        """Render the answer token by token as the model generates it.
+        
+        Time to first token and total latency are measured on the wall clock
+        and shown separately.
+        
+        Args:
+            retriever: The document retriever to use for context retrieval.
+            prompt: The user's question or query string.
+        """
+        logger.info("Streaming response from model")
+        with metrics.track_query(streamed=True) as timings:
+            stream = self.model.stream_response(retriever, prompt)
+            context_docs = next(stream).get("context", [])
+            first_token_time: Optional[float] = None
+
+            def answer_tokens() -> Iterator[str]:
+                nonlocal first_token_time
+                for part in stream:
+                    if "answer" in part:
+                        if first_token_time is None:
+                            first_token_time = timings.elapsed()
+                            metrics.record("time_to_first_token", first_token_time)
+                        yield part["answer"]
+
+            st.write("### Response:")
+            timing = st.empty()
+            st.write_stream(answer_tokens())
+            total_time = timings.elapsed()
+            first_token_time = first_token_time if first_token_time is not None else total_time
+
+            logger.info(
+                f"Query streamed successfully: first token after {first_token_time:.2f} seconds, "
+                f"completed in {total_time:.2f} seconds"
+            )
+            with metrics.stage("render"):
+                timing.write(
+                    f"Time to first token: {first_token_time:.2f} seconds | "
+                    f"Response time: {total_time:.2f} seconds"
+                )
+                self.display_similarity_results(context_docs)
+
     def display_similarity_results(self, context_docs: List[Any]) -> None:
         """Display document context from similarity search.
         
@@ -177,6 +293,26 @@ class RAGApp:
             logger.info("No relevant documents found")
             st.write("No relevant documents found.")
 
+    def display_latency_metrics(self) -> None:
+        """Show rolling p50/p95/p99 wall-clock latency per pipeline stage in the sidebar."""
+        summary = metrics.latency.summary()
+        if not summary:
+            return
+        st.sidebar.markdown("## Latency")
+        st.sidebar.dataframe(
+            [
+                {
+                    "stage": stage,
+                    "n": values["count"],
+                    "p50 ms": round(values["p50"] * 1000, 1),
+                    "p95 ms": round(values["p95"] * 1000, 1),
+                    "p99 ms": round(values["p99"] * 1000, 1),
+                }
+                for stage, values in summary.items()
+            ],
+            hide_index=True,
+        )
+
     def display_main_ui(self) -> Optional[str]:
         """Display main header and prompt box.
         
@@ -213,5 +349,7 @@ class RAGApp:
         self.setup_sidebar()
 
         prompt = self.display_main_ui()
-        self.handle_user_input(prompt)
+        if self.wait_until_ready():
+            self.handle_user_input(prompt)
+        self.display_latency_metrics()
         logger.info("RAGApp running")
@@ -0,0 +1,191 @@
+"""Batch question answering for the RAG system.
+
+Runs a file of questions against the indexed job descriptions and writes one
+JSON line per answer, e.g. for reporting on standard questions such as "List
+the required certifications" across every role. All questions are retrieved
+in one batch and the LLM is called concurrently, with retries on rate limits.
+
+Run it with:
+    python -m rag_app.batch questions.txt --output answers.jsonl --per-document
+
+The question file is either plain text with one question per line, or JSONL
+with a "question" and optional "filters" per line, e.g.
+    {"question": "What is the salary range?", "filters": {"department": ["Finance"]}}
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from rag_app.config.loader import load_config, setup_logging
+from rag_app.document_processor import DocumentProcessor
+from rag_app.metadata import FIELDS
+from rag_app.rag_model import RAGModel
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path: str) -> List[Dict[str, Any]]:
+    """Read questions from a text or JSONL file.
+
+    Args:
+        path: File with one question per line, or one {"question", "filters"}
+            object per line if it ends in .jsonl.
+
+    Returns:
+        One {"question", "filters"} dict per non-empty line.
+
+    Raises:
+        ValueError: If a line has no question or filters on unknown fields.
+    """
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                item = json.loads(line)
+            else:
+                item = {"question": line}
+            if not item.get("question"):
+                raise ValueError(f"{path}:{number}: missing question")
+            unknown = set(item.get("filters") or {}) - set(FIELDS)
+            if unknown:
+                raise ValueError(
+                    f"{path}:{number}: unknown filter fields {sorted(unknown)}"
+                )
+            items.append(
+                {"question": item["question"], "filters": item.get("filters")}
+            )
+    return items
+
+
+def per_document(
+    items: List[Dict[str, Any]], documents: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Ask every question once per document, restricted to that document.
+
+    Args:
+        items: Questions as returned by read_questions.
+        documents: Rows of the metadata table.
+
+    Returns:
+        One item per question and document, with the document's source added
+        to the question's filters.
+    """
+    return [
+        {
+            "question": item["question"],
+            "filters": {**(item["filters"] or {}), "source": [doc["source"]]},
+        }
+        for item in items
+        for doc in documents
+    ]
+
+
+def run_batch(
+    model: RAGModel,
+    retriever: Any,
+    items: List[Dict[str, Any]],
+    output: Any,
+    concurrency: Optional[int] = None,
+) -> int:
+    """Answer questions and write one JSON line per answer as it completes.
+
+    Args:
+        model: RAGModel used to answer.
+        retriever: The document retriever.
+        items: {"question", "filters"} dicts.
+        output: Text file the JSON lines are written to.
+        concurrency: Maximum number of LLM calls in flight.
+
+    Returns:
+        Number of questions that failed.
+    """
+    failed = 0
+
+    def write(i: int, response: Dict[str, Any]) -> None:
+        nonlocal failed
+        failed += "error" in response
+        line = {
+            "id": i,
+            "question": items[i]["question"],
+            "filters": items[i]["filters"],
+            "answer": response.get("answer"),
+            "sources": sorted({
+                doc.metadata.get("source") for doc in response.get("context", [])
+                if doc.metadata.get("source")
+            }),
+        }
+        if "error" in response:
+            line["error"] = response["error"]
+        output.write(json.dumps(line, ensure_ascii=False) + "\n")
+        output.flush()
+
+    model.batch_responses(
+        retriever,
+        [item["question"] for item in items],
+        filters=[item["filters"] for item in items],
+        concurrency=concurrency,
+        on_result=write,
+    )
+    return failed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run batch question answering from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "questions", help="question file (.txt, or .jsonl with filters)"
+    )
+    parser.add_argument(
+        "--output", help="JSONL answer file (default: standard output)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="LLM calls in flight (default: rag_model.batch.concurrency)",
+    )
+    parser.add_argument(
+        "--per-document",
+        action="store_true",
+        help="ask every question about every document",
+    )
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        logger.error("GROQ_API_KEY is not set in environment variables")
+        print("GROQ_API_KEY is not set in the environment variables.", file=sys.stderr)
+        return 2
+
+    items = read_questions(args.questions)
+    processor = DocumentProcessor()
+    processor.load_and_embed()
+    if args.per_document:
+        items = per_document(items, processor.metadata.documents())
+    model = RAGModel(api_key, embeddings=processor.embeddings)
+    model.set_index_version(processor.index_version)
+    retriever = processor.get_retriever()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        failed = run_batch(model, retriever, items, output, args.concurrency)
+    finally:
+        if args.output:
+            output.close()
+    logger.info(f"Answered {len(items) - failed} of {len(items)} questions")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
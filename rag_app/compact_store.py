@@ -0,0 +1,283 @@
+"""Memory-mapped chunk storage for the RAG system.
+
+The in-memory docstore keeps every chunk's text and metadata as Python
+objects, which dominates the resident memory of large corpora and is
+duplicated by every app process. MmapDocstore instead appends each chunk as
+an encoded record to a file in the index directory and keeps only the record
+offsets in memory. The file is memory-mapped read-only, so its pages live in
+the shared OS page cache, and a chunk is decoded only when it is looked up,
+i.e. for the top-k retrieval hits.
+
+Records are never rewritten in place: deletions only drop offsets, and
+compaction writes the live records to a new file. A file that a saved index
+refers to is therefore never modified, and readers in other processes keep
+a consistent view until they reload.
+"""
+import os
+import json
+import mmap
+import uuid
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+FILE_PREFIX = "chunks-"
+FILE_SUFFIX = ".bin"
+
+
+class MmapDocstore(Docstore, AddableMixin):
+    """Docstore keeping chunks in an append-only, memory-mapped file of records.
+
+    Pickling stores the file name and the offsets, not the chunks, so the
+    store is persisted by FAISS.save_local like the in-memory docstore. After
+    unpickling, open() must be called with the directory holding the file.
+
+    Attributes:
+        directory: Directory holding the record file
+        file_name: Name of the record file within the directory
+        offsets: Mapping of chunk ID to the offset and length of its record
+        garbage: Bytes of deleted records still in the file
+    """
+
+    def __init__(self, directory: str, file_name: Optional[str] = None) -> None:
+        """Create a store with a new, empty record file.
+
+        Args:
+            directory: Directory for the record file; created if missing.
+            file_name: Name of the record file. Defaults to a new unique name,
+                so a rebuild never truncates a file another process has mapped.
+        """
+        self.file_name = file_name or f"{FILE_PREFIX}{uuid.uuid4().hex}{FILE_SUFFIX}"
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.garbage = 0
+        os.makedirs(directory, exist_ok=True)
+        Path(directory, self.file_name).touch()
+        self._init_handles()
+        self.open(directory)
+
+    def open(self, directory: str) -> None:
+        """Attach the store to the directory holding its record file.
+
+        Args:
+            directory: Directory holding the record file.
+
+        Raises:
+            FileNotFoundError: If the record file does not exist.
+        """
+        path = os.path.join(directory, self.file_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Chunk file {path} not found")
+        with self._lock:
+            self.close()
+            self.directory = directory
+
+    @property
+    def path(self) -> str:
+        """Path of the record file."""
+        return os.path.join(self.directory, self.file_name)
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """Append chunks to the record file.
+
+        Args:
+            texts: Mapping of chunk ID to chunk.
+
+        Raises:
+            ValueError: If any of the IDs is already stored.
+        """
+        overlapping = set(texts).intersection(self.offsets)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        with self._lock:
+            writer = self._open_writer()
+            offset = writer.tell()
+            records = []
+            offsets = {}
+            for chunk_id, doc in texts.items():
+                record = _encode(doc)
+                records.append(record)
+                offsets[chunk_id] = (offset, len(record))
+                offset += len(record)
+            writer.write(b"".join(records))
+            writer.flush()
+            self.offsets.update(offsets)
+
+    def delete(self, ids: List) -> None:
+        """Forget chunks; their records stay in the file until compaction.
+
+        Args:
+            ids: IDs of the chunks to delete.
+
+        Raises:
+            ValueError: If none of the IDs is stored.
+        """
+        if not set(ids).intersection(self.offsets):
+            raise ValueError(f"Tried to delete ids that do not exist: {ids}")
+        for chunk_id in ids:
+            entry = self.offsets.pop(chunk_id, None)
+            if entry is not None:
+                self.garbage += entry[1]
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Decode a chunk by ID.
+
+        Args:
+            search: ID of the chunk.
+
+        Returns:
+            The chunk, or an error message if the ID is not stored.
+        """
+        entry = self.offsets.get(search)
+        if entry is None:
+            return f"ID {search} not found."
+        offset, length = entry
+        view = self._map
+        if view is None or offset + length > len(view):
+            view = self._remap()
+        record = json.loads(view[offset:offset + length])
+        return Document(
+            id=search, page_content=record["text"], metadata=record["metadata"]
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def copy(self) -> "MmapDocstore":
+        """Return a store sharing the record file, for copy-on-write index updates.
+
+        Records added to the copy are appended to the shared file and never
+        seen by this store. This store's file is mapped first, so it stays
+        readable even after the copy compacts and the file is deleted.
+
+        Returns:
+            The copy, with its own offsets.
+        """
+        if self.offsets and self._map is None:
+            self._remap()
+        clone = MmapDocstore.__new__(MmapDocstore)
+        clone.__setstate__({**self.__getstate__(), "offsets": dict(self.offsets)})
+        clone.open(self.directory)
+        return clone
+
+    def garbage_ratio(self) -> float:
+        """Fraction of the record file taken by deleted records."""
+        live = sum(length for _, length in self.offsets.values())
+        total = live + self.garbage
+        return self.garbage / total if total else 0.0
+
+    def compact(self) -> str:
+        """Copy the live records to a new file and switch to it.
+
+        The old file is left in place for readers of the last saved index;
+        remove_stale_files deletes it once the index is saved again.
+
+        Returns:
+            Name of the old record file.
+        """
+        with self._lock:
+            old_name, old_path = self.file_name, self.path
+            new_name = f"{FILE_PREFIX}{uuid.uuid4().hex}{FILE_SUFFIX}"
+            offsets = {}
+            position = 0
+            new_path = os.path.join(self.directory, new_name)
+            records = sorted(self.offsets.items(), key=lambda item: item[1][0])
+            with open(old_path, "rb") as source, open(new_path, "wb") as target:
+                for chunk_id, (offset, length) in records:
+                    source.seek(offset)
+                    target.write(source.read(length))
+                    offsets[chunk_id] = (position, length)
+                    position += length
+            self.close()
+            self.file_name, self.offsets, self.garbage = new_name, offsets, 0
+        logger.info(
+            f"Compacted chunk file {old_name} into {new_name} "
+            f"({len(offsets)} records)"
+        )
+        return old_name
+
+    def close(self) -> None:
+        """Close the writer and drop the mapping; both reopen on demand."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        # Readers may still slice the old mapping, so it is not closed
+        # explicitly; it is unmapped once no longer referenced
+        self._map = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        if self._writer is not None:
+            self._writer.flush()
+        return {
+            "file_name": self.file_name,
+            "offsets": self.offsets,
+            "garbage": self.garbage,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._init_handles()
+
+    def _init_handles(self) -> None:
+        """Reset the file handles and the lock."""
+        self.directory: Optional[str] = None
+        self._lock = threading.Lock()
+        self._writer: Optional[Any] = None
+        self._map: Optional[mmap.mmap] = None
+
+    def _open_writer(self) -> Any:
+        """Open the record file for appending, if not open yet."""
+        if self.directory is None:
+            raise RuntimeError("MmapDocstore.open() must be called before use")
+        if self._writer is None:
+            self._writer = open(self.path, "ab")
+        return self._writer
+
+    def _remap(self) -> mmap.mmap:
+        """Map the record file again to cover records appended since it was mapped."""
+        with self._lock:
+            if self.directory is None:
+                raise RuntimeError("MmapDocstore.open() must be called before use")
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map
+
+
+def remove_stale_files(directory: str, keep: str) -> List[str]:
+    """Delete the record files of earlier builds from an index directory.
+
+    Processes that still have an old file mapped keep reading it until they
+    reload; the OS frees it afterwards.
+
+    Args:
+        directory: Index directory.
+        keep: Name of the record file in use.
+
+    Returns:
+        Names of the deleted files.
+    """
+    removed = []
+    for path in Path(directory).glob(f"{FILE_PREFIX}*{FILE_SUFFIX}"):
+        if path.name != keep:
+            path.unlink()
+            removed.append(path.name)
+    if removed:
+        logger.info(f"Removed {len(removed)} stale chunk files from {directory}")
+    return removed
+
+
+def _encode(doc: Document) -> bytes:
+    """Encode a chunk as a JSON record."""
+    return json.dumps(
+        {"text": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False
+    ).encode("utf-8")
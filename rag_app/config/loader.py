@@ -40,4 +40,14 @@ def setup_logging(config: Dict[str, Any]) -> None:
         level=getattr(logging, config['logging']['level']),
         format=config['logging']['format'],
         handlers=handlers
-    ) 
\ No newline at end of file
+    )
+
+    # Per-query metrics go to their own file as one JSON object per line
+    metrics_file = config['logging'].get('metrics_file')
+    metrics_logger = logging.getLogger("rag_app.metrics.queries")
+    if metrics_file and not metrics_logger.handlers:
+        handler = logging.FileHandler(metrics_file)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        metrics_logger.addHandler(handler)
+        metrics_logger.setLevel(logging.INFO)
+        metrics_logger.propagate = False
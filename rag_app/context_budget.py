@@ -0,0 +1,193 @@
+"""Context budget management for the RAG system.
+
+This module sits between retrieval and prompt assembly. Adjacent chunks of the
+same page repeat up to chunk_overlap characters of each other, and hybrid or
+multi-query retrieval can return near-identical chunks, so the retrieved
+chunks are merged where they overlap, near-duplicates are dropped, and the
+most relevant content is packed into a fixed token budget.
+"""
+import re
+import logging
+from typing import List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+# Minimum number of shared characters for two chunks to be merged
+MIN_OVERLAP = 20
+
+
+class ContextBudget:
+    """Merges, deduplicates and trims retrieved chunks to a token budget.
+
+    Tokens are estimated from the character count, which is close enough for
+    budgeting English text and needs no tokenizer for the hosted model.
+
+    Attributes:
+        max_tokens: Token budget of the context placed in the prompt
+        chars_per_token: Characters per token used for the estimate
+        dedup_threshold: Shingle Jaccard similarity above which a chunk is a
+            near-duplicate
+        min_tokens: Smallest truncated chunk worth adding when the budget runs out
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1500,
+        chars_per_token: float = 4.0,
+        dedup_threshold: float = 0.8,
+        min_tokens: int = 50,
+    ) -> None:
+        """Initialize the budget.
+
+        Args:
+            max_tokens: Token budget of the context placed in the prompt.
+            chars_per_token: Characters per token used for the estimate.
+            dedup_threshold: Shingle Jaccard similarity above which a chunk is
+                dropped as a near-duplicate of a more relevant one.
+            min_tokens: Smallest truncated chunk worth adding when the budget runs out.
+        """
+        self.max_tokens = max_tokens
+        self.chars_per_token = chars_per_token
+        self.dedup_threshold = dedup_threshold
+        self.min_tokens = min_tokens
+
+    def estimate_tokens(self, text: str) -> int:
+        """Estimate the number of tokens of a text."""
+        return int(len(text) / self.chars_per_token) + 1
+
+    def pack(self, docs: List[Document]) -> List[Document]:
+        """Fit retrieved chunks into the token budget.
+
+        Args:
+            docs: Retrieved chunks, most relevant first.
+
+        Returns:
+            Merged, deduplicated chunks within the budget, most relevant first.
+        """
+        merged = merge_overlapping(docs)
+        unique = remove_near_duplicates(merged, self.dedup_threshold)
+
+        packed = []
+        remaining = self.max_tokens
+        for doc in unique:
+            tokens = self.estimate_tokens(doc.page_content)
+            if tokens <= remaining:
+                packed.append(doc)
+                remaining -= tokens
+                continue
+            if remaining >= self.min_tokens:
+                packed.append(_truncate(doc, int(remaining * self.chars_per_token)))
+            break
+
+        before = sum(self.estimate_tokens(doc.page_content) for doc in docs)
+        after = sum(self.estimate_tokens(doc.page_content) for doc in packed)
+        logger.info(
+            f"Packed {len(docs)} chunks (~{before} tokens) into "
+            f"{len(packed)} chunks (~{after} tokens)"
+        )
+        return packed
+
+
+def merge_overlapping(docs: List[Document]) -> List[Document]:
+    """Merge chunks of the same source and page whose texts overlap.
+
+    A merged chunk takes the position of its most relevant part. Chunks
+    contained in another chunk are dropped.
+
+    Args:
+        docs: Chunks, most relevant first.
+
+    Returns:
+        Merged chunks, most relevant first.
+    """
+    merged: List[Tuple[int, Document]] = []
+    for rank, doc in enumerate(docs):
+        current = (rank, doc)
+        # A merged chunk may now overlap chunks it did not overlap before
+        changed = True
+        while changed:
+            changed = False
+            for i, kept in enumerate(merged):
+                if _page_key(kept[1]) != _page_key(current[1]):
+                    continue
+                text = _merge_texts(kept[1].page_content, current[1].page_content)
+                if text is not None:
+                    best = min(kept, current, key=lambda item: item[0])
+                    current = (best[0], Document(
+                        page_content=text, metadata=best[1].metadata, id=best[1].id
+                    ))
+                    del merged[i]
+                    changed = True
+                    break
+        merged.append(current)
+    return [doc for _, doc in sorted(merged, key=lambda item: item[0])]
+
+
+def remove_near_duplicates(docs: List[Document], threshold: float) -> List[Document]:
+    """Drop chunks whose word shingles mostly repeat a more relevant chunk.
+
+    Args:
+        docs: Chunks, most relevant first.
+        threshold: Jaccard similarity at or above which a chunk is dropped.
+
+    Returns:
+        The remaining chunks, in order.
+    """
+    kept: List[Tuple[Document, Set[Tuple[str, ...]]]] = []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(_jaccard(shingles, other) >= threshold for _, other in kept):
+            continue
+        kept.append((doc, shingles))
+    return [doc for doc, _ in kept]
+
+
+def _page_key(doc: Document) -> Tuple[Optional[str], Optional[int]]:
+    """Source and page a chunk was split from."""
+    return doc.metadata.get("source"), doc.metadata.get("page")
+
+
+def _merge_texts(first: str, second: str) -> Optional[str]:
+    """Join two texts that overlap or contain each other, or return None."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    for head, tail in ((first, second), (second, first)):
+        # The splitter repeats the end of a chunk at the start of the next one
+        start = head.find(tail[:MIN_OVERLAP])
+        while start != -1:
+            if tail.startswith(head[start:]):
+                return head[:start] + tail
+            start = head.find(tail[:MIN_OVERLAP], start + 1)
+    return None
+
+
+def _shingles(text: str, size: int = 5) -> Set[Tuple[str, ...]]:
+    """Word n-grams of a text, lowercased."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a: Set[Tuple[str, ...]], b: Set[Tuple[str, ...]]) -> float:
+    """Jaccard similarity of two sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _truncate(doc: Document, max_chars: int) -> Document:
+    """Cut a chunk to at most max_chars characters at a word boundary."""
+    text = doc.page_content[:max_chars]
+    if len(text) < len(doc.page_content) and " " in text:
+        text = text.rsplit(" ", 1)[0]
+    return Document(page_content=text, metadata=doc.metadata, id=doc.id)
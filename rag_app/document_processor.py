@@ -1,38 +1,110 @@
 """Document processing module for the RAG system."""
 import os
+import copy
+import json
+import pickle
+import hashlib
 import logging
-from typing import Any
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+)
 
+import faiss
+import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 
+from rag_app import index_factory
+from rag_app.compact_store import MmapDocstore, remove_stale_files
 from rag_app.config.loader import load_config, setup_logging
+from rag_app.embedding_backends import build_embeddings
+from rag_app.embedding_cache import CachedEmbeddings
+from rag_app.metadata import MetadataTable, extract_metadata
+from rag_app.reranker import candidates
+from rag_app.retrievers import BM25Index, HybridRetriever
 
 # Load configuration and setup logging
 config = load_config()
 setup_logging(config)
 logger = logging.getLogger(__name__)
 
+MANIFEST_FILE = "manifest.json"
+BM25_FILE = "bm25.pkl"
+
+
 class DocumentProcessor:
     """Handles document loading, splitting, and embedding."""
 
-    def __init__(self, path: str = config['document']['default_path']) -> None:
+    def __init__(
+        self,
+        path: str = config['document']['default_path'],
+        index_path: Optional[str] = config['document'].get('index_path'),
+        embeddings: Optional[Embeddings] = None,
+        ingest_workers: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+    ) -> None:
         """Initialize the DocumentProcessor with the path to the directory containing PDF documents.
 
         Args:
             path: Path to the directory containing PDF documents. Defaults to "./job_descriptions".
+            index_path: Directory where the FAISS index, docstore and manifest are persisted.
+                Persistence is disabled when None.
+            embeddings: Embeddings instance to use instead of the configured HuggingFace model.
+            ingest_workers: Number of processes used to parse PDFs. Defaults to
+                document.ingest_workers; 1 parses in the current process.
+            embed_batch_size: Number of chunks embedded per batch. Defaults to
+                document.embed_batch_size.
         """
         self.path = path
-        self.loader = PyPDFDirectoryLoader(self.path)
-        
+        self.index_path = index_path
+        self.ingest_workers = (
+            ingest_workers if ingest_workers is not None
+            else config['document'].get('ingest_workers', 1)
+        )
+        self.embed_batch_size = (
+            embed_batch_size if embed_batch_size is not None
+            else config['document'].get('embed_batch_size', 64)
+        )
+        self.vectorstore: Optional[Any] = None
+        self.indexed_files: Dict[str, Dict[str, Any]] = {}
+        self.index_version: Optional[str] = None
+        self.bm25 = BM25Index()
+        self.metadata = MetadataTable()
+        self._lock = threading.RLock()
+        # Guards the index attributes while an update is swapped in
+        self._swap_lock = threading.Lock()
+
+        if embeddings is not None:
+            self.embeddings = embeddings
+            return
+
         # Initialize embeddings with proper device handling
         try:
             logger.info("Initializing embeddings model")
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=config['document']['embedding_model']
+            cache_config = config['document'].get('embedding_cache', {})
+            self.embeddings = build_embeddings(
+                config['document']['embedding_model'],
+                config['document'].get('embeddings'),
+                record_dir=cache_config['path'] if cache_config.get('enabled') else None,
             )
+            if cache_config.get('enabled'):
+                logger.info(f"Caching embeddings in {cache_config['path']}")
+                self.embeddings = CachedEmbeddings(
+                    self.embeddings,
+                    model_name=_embedding_key(config['document']),
+                    cache_dir=cache_config['path'],
+                    max_entries=cache_config['max_entries'],
+                )
         except Exception as e:
             logger.error(f"Error initializing embeddings model: {str(e)}")
             raise
@@ -40,28 +112,643 @@ class DocumentProcessor:
     def load_and_embed(self) -> Any:
         """Load documents from the specified directory and create embeddings.
 
+        The persisted index is loaded when available and brought up to date
+        incrementally, so only new or modified PDFs are embedded.
+
         Returns:
             FAISS vector store containing the document embeddings.
         """
         try:
-            # Load documents
-            logger.info("Loading documents...")
-            docs = self.loader.load()
-            
-            # Split documents
-            logger.info("Splitting documents into chunks...")
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=config['document']['chunk_size'],
-                chunk_overlap=config['document']['chunk_overlap']
-            )
-            chunks = splitter.split_documents(docs)
-            
-            # Create vector store
-            logger.info("Creating vector store...")
-            vectorstore = FAISS.from_documents(chunks, self.embeddings)
-            logger.info("Vector store created successfully")
-            
-            return vectorstore
+            self.update_index()
+            return self.vectorstore
         except Exception as e:
             logger.error(f"Error in load_and_embed: {str(e)}")
             raise
+
+    def load_persisted_index(self) -> bool:
+        """Load the persisted index without scanning the document directory.
+
+        Lets queries run against the last built index right after start-up;
+        update_index() later brings it up to date with the PDFs on disk.
+
+        Returns:
+            True if a vector store is available.
+        """
+        with self._lock:
+            if self.vectorstore is None:
+                settings = self._index_settings()
+                staging = copy.copy(self)
+                staging.vectorstore, staging.indexed_files = staging._load_index(settings)
+                if staging.vectorstore is None:
+                    return False
+                staging.bm25 = staging._load_bm25()
+                staging.index_version = _index_version(settings, staging.indexed_files)
+                staging.metadata = MetadataTable()
+                staging.metadata.update(
+                    staging.indexed_files, staging.vectorstore.index_to_docstore_id
+                )
+                self._publish(staging)
+            return True
+
+    def update_index(
+        self, progress_callback: Optional[Callable[[int, int, int], None]] = None
+    ) -> Dict[str, int]:
+        """Bring the vector store in line with the PDFs on disk.
+
+        Files are compared against the last indexed state by size and mtime,
+        falling back to the content hash when those differ. New and modified
+        files are loaded, split and embedded; the chunks of modified and
+        deleted files are removed from the store by their stable chunk IDs.
+
+        The update is applied copy-on-write to a staging copy of the index and
+        swapped in when complete, so queries keep running against the
+        previous version meanwhile and in-flight queries finish on it.
+
+        Args:
+            progress_callback: Called after every embedded batch with the number
+                of files parsed, the number of files to parse and the number of
+                chunks embedded so far.
+
+        Returns:
+            Dict with the number of "added", "updated" and "removed" chunks.
+
+        Raises:
+            ValueError: If there is no index yet and no PDFs to build one from.
+        """
+        # Sessions share one processor, so only one of them may update it at a time
+        with self._lock:
+            staging = copy.copy(self)
+            stats = staging._update_index(progress_callback)
+            self._publish(staging)
+            return stats
+
+    def _update_index(
+        self, progress_callback: Optional[Callable[[int, int, int], None]]
+    ) -> Dict[str, int]:
+        """Apply the incremental update described in update_index() to this staging copy."""
+        settings = self._index_settings()
+        published = self.vectorstore is not None
+        if self.vectorstore is None:
+            self.vectorstore, self.indexed_files = self._load_index(settings)
+            self.bm25 = self._load_bm25() if self.vectorstore is not None else BM25Index()
+
+        indexed = self.indexed_files
+        current = self._scan_files(indexed)
+        added = [f for f in current if f not in indexed]
+        changed = [
+            f for f in current
+            if f in indexed and current[f]["sha256"] != indexed[f]["sha256"]
+        ]
+        removed = [f for f in indexed if f not in current]
+        logger.info(
+            f"Index diff: {len(added)} added, {len(changed)} changed, "
+            f"{len(removed)} removed files"
+        )
+
+        # Drop the chunks of files that were modified or deleted
+        stale_ids = [
+            chunk_id for f in changed + removed for chunk_id in indexed[f]["chunk_ids"]
+        ]
+        if published and (stale_ids or added or changed):
+            # Never modify the index queries are searching
+            self.vectorstore = _copy_vectorstore(self.vectorstore)
+            self.bm25 = self.bm25.copy()
+        if stale_ids and self.vectorstore is not None:
+            logger.info(f"Removing {len(stale_ids)} stale chunks from vector store")
+            if not index_factory.supports_remove(self.vectorstore.index):
+                # HNSW graphs cannot delete nodes; fall back to a flat index
+                # and rebuild the HNSW one after the update
+                self.vectorstore.index = _flat_index(self._stored_vectors())
+            _delete_chunks(self.vectorstore, stale_ids)
+            self.bm25.remove(stale_ids)
+
+        stats = {"added": 0, "updated": 0, "removed": 0}
+        for f in removed:
+            stats["removed"] += len(indexed[f]["chunk_ids"])
+
+        # Load, split and embed only new or modified files. Parsed files stream
+        # into the embedding stage, which works in fixed-size batches
+        to_parse = added + changed
+        files_done = 0
+
+        def new_chunks() -> Iterator[Tuple[str, Document]]:
+            nonlocal files_done
+            for f, file_chunks in self._iter_split_files(to_parse):
+                ids = [_chunk_id(f, i) for i in range(len(file_chunks))]
+                doc_metadata = extract_metadata(
+                    f, file_chunks[0].page_content if file_chunks else None
+                )
+                for chunk in file_chunks:
+                    chunk.metadata.update(
+                        {field: doc_metadata[field] for field in ("title", "department", "seniority")}
+                    )
+                current[f]["chunk_ids"] = ids
+                current[f]["metadata"] = doc_metadata
+                stats["added" if f in added else "updated"] += len(file_chunks)
+                files_done += 1
+                yield from zip(ids, file_chunks)
+
+        def report(chunks_embedded: int) -> None:
+            if progress_callback is not None:
+                progress_callback(files_done, len(to_parse), chunks_embedded)
+
+        embedded = self.add_chunks(new_chunks(), on_batch=report)
+
+        if self.vectorstore is None:
+            raise ValueError(f"No PDF documents found in {self.path}")
+
+        index_changed = bool(embedded or stale_ids)
+        if index_changed and index_factory.is_flat(self.vectorstore.index):
+            self._build_ann_index()
+        if index_changed or current != indexed:
+            self._save_index(settings, current, save_vectors=index_changed)
+        self.indexed_files = current
+        self.index_version = _index_version(settings, current)
+        self.metadata = MetadataTable()
+        self.metadata.update(current, self.vectorstore.index_to_docstore_id)
+        logger.info(
+            f"Vector store up to date: {stats['added']} added, "
+            f"{stats['updated']} updated, {stats['removed']} removed chunks"
+        )
+        if isinstance(self.embeddings, CachedEmbeddings):
+            logger.info(f"Embedding cache: {self.embeddings.stats()}")
+        return stats
+
+    def get_retriever(self, vectorstore: Any = None) -> Any:
+        """Create the configured retriever over a vector store.
+
+        The processor's own vector store gets a HybridRetriever, which filters
+        by document metadata and, in "hybrid" mode, fuses BM25 and vector
+        rankings. Other vector stores have no BM25 index or metadata table and
+        get a plain similarity retriever.
+
+        Args:
+            vectorstore: Vector store to retrieve from. Defaults to the processor's.
+
+        Returns:
+            A retriever returning retrieval.k chunks, or retrieval.rerank.candidates
+            chunks for the reranker when reranking is enabled.
+        """
+        retrieval = config['retrieval']
+        k = candidates(retrieval['k'])
+        with self._swap_lock:
+            current, bm25, metadata = self.vectorstore, self.bm25, self.metadata
+        if vectorstore is None:
+            vectorstore = current
+        if vectorstore is current:
+            logger.info(f"Creating {retrieval['mode']} retriever")
+            return HybridRetriever(
+                vectorstore=vectorstore,
+                bm25=bm25 if retrieval['mode'] == 'hybrid' else None,
+                metadata_table=metadata,
+                auto_filter=retrieval.get('auto_filter', True),
+                k=k,
+                fetch_k=max(retrieval['fetch_k'], k),
+                rrf_k=retrieval['rrf_k'],
+                vector_weight=retrieval['vector_weight'],
+                bm25_weight=retrieval['bm25_weight'],
+            )
+        return vectorstore.as_retriever(search_kwargs={"k": k})
+
+    def _publish(self, staging: "DocumentProcessor") -> None:
+        """Swap in the index of a finished load or update.
+
+        Retrievers created earlier keep the previous vector store, BM25 index
+        and metadata table, so queries in flight finish on the old version.
+
+        Args:
+            staging: Copy of this processor holding the new index.
+        """
+        with self._swap_lock:
+            self.vectorstore = staging.vectorstore
+            self.bm25 = staging.bm25
+            self.metadata = staging.metadata
+            self.indexed_files = staging.indexed_files
+            self.index_version = staging.index_version
+        logger.info(f"Published index version {self.index_version}")
+
+    def _build_ann_index(self) -> None:
+        """Replace the flat index with the configured approximate or compact index.
+
+        Logs recall@k against the flat index when document.index.recall_queries
+        is set.
+        """
+        index_config = config['document'].get('index', {})
+        if not index_factory.is_compact(index_config):
+            return
+        vectors = index_factory.reconstruct_all(self.vectorstore.index)
+        index = index_factory.build_index(vectors, index_config)
+        if index_factory.is_flat(index):
+            return
+        n_queries = index_config.get('recall_queries', 0)
+        if n_queries:
+            recall = index_factory.recall_at_k(
+                index, vectors, k=config['retrieval']['k'], n_queries=n_queries
+            )
+            logger.info(f"Index recall@{config['retrieval']['k']} vs flat: {recall:.3f}")
+        self.vectorstore.index = index
+
+    def _stored_vectors(self) -> np.ndarray:
+        """Return the vectors of the stored chunks in index order.
+
+        Used when an HNSW index has to be rebuilt after deleting chunks. 8-bit
+        codes only hold approximations, so those chunks are embedded again,
+        which the embedding cache serves without the model.
+        """
+        index = self.vectorstore.index
+        if index_factory.is_lossless(index):
+            return index_factory.reconstruct_all(index)
+        docstore = self.vectorstore.docstore
+        ids = [self.vectorstore.index_to_docstore_id[i] for i in range(index.ntotal)]
+        vectors = []
+        for batch in _batched(ids, self.embed_batch_size):
+            texts = [docstore.search(chunk_id).page_content for chunk_id in batch]
+            vectors.extend(self.embeddings.embed_documents(texts))
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _index_settings(self) -> Dict[str, Any]:
+        """Settings that invalidate every stored vector when they change."""
+        doc_config = config['document']
+        settings = {
+            "embedding_model": _embedding_key(doc_config),
+            "chunk_size": doc_config['chunk_size'],
+            "chunk_overlap": doc_config['chunk_overlap'],
+            "index": index_factory.index_settings(doc_config.get('index', {})),
+        }
+        # Recorded only when not the default, so existing indexes stay valid
+        docstore = doc_config.get('storage', {}).get('docstore', 'memory')
+        if docstore != 'memory':
+            settings["docstore"] = docstore
+        return settings
+
+    def _new_docstore(self) -> Any:
+        """Create the configured docstore for a new vector store.
+
+        The memory-mapped docstore lives in the index directory, so without
+        persistence chunks are kept in memory.
+        """
+        docstore = config['document'].get('storage', {}).get('docstore', 'memory')
+        if docstore not in ('memory', 'mmap'):
+            raise ValueError(f"Unknown docstore {docstore!r}, expected 'memory' or 'mmap'")
+        if docstore == 'mmap':
+            if self.index_path:
+                return MmapDocstore(self.index_path)
+            logger.warning("The mmap docstore needs document.index_path; keeping chunks in memory")
+        return InMemoryDocstore()
+
+    def _list_pdfs(self) -> List[str]:
+        """List visible PDF files below the document directory as sorted relative paths."""
+        root = Path(self.path)
+        return sorted(
+            p.relative_to(root).as_posix()
+            for p in root.rglob("*.pdf")
+            if p.is_file() and not any(
+                part.startswith(".") for part in p.relative_to(root).parts
+            )
+        )
+
+    def _scan_files(self, indexed: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Fingerprint the PDFs on disk, reusing stored hashes for untouched files.
+
+        Args:
+            indexed: Per-file state recorded in the manifest of the last index build.
+
+        Returns:
+            Mapping of relative path to its size, mtime, SHA-256 hash and chunk IDs.
+        """
+        files = {}
+        for rel_path in self._list_pdfs():
+            stat = os.stat(os.path.join(self.path, rel_path))
+            previous = indexed.get(rel_path)
+            if (
+                previous is not None
+                and previous["size"] == stat.st_size
+                and previous["mtime"] == stat.st_mtime
+            ):
+                sha256 = previous["sha256"]
+            else:
+                sha256 = _file_hash(os.path.join(self.path, rel_path))
+            files[rel_path] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": sha256,
+                "chunk_ids": previous["chunk_ids"] if previous else [],
+                "metadata": previous.get("metadata") if previous else None,
+            }
+        return files
+
+    def _split_file(self, rel_path: str) -> List[Document]:
+        """Load a single PDF and split it into chunks.
+
+        Args:
+            rel_path: Path of the PDF relative to the document directory.
+
+        Returns:
+            List of chunks with "source" and "page" metadata.
+        """
+        return _load_and_split(
+            str(Path(self.path) / rel_path),
+            config['document']['chunk_size'],
+            config['document']['chunk_overlap'],
+        )
+
+    def _iter_split_files(self, rel_paths: List[str]) -> Iterator[Tuple[str, List[Document]]]:
+        """Parse and chunk PDFs, in a process pool when more than one worker is configured.
+
+        Results are yielded in the order of rel_paths as soon as each file is
+        ready, so chunk order and metadata do not depend on worker scheduling.
+
+        Args:
+            rel_paths: Paths of the PDFs relative to the document directory.
+
+        Yields:
+            Tuples of relative path and the chunks of that file.
+        """
+        if self.ingest_workers <= 1 or len(rel_paths) <= 1:
+            for rel_path in rel_paths:
+                yield rel_path, self._split_file(rel_path)
+            return
+
+        workers = min(self.ingest_workers, len(rel_paths))
+        logger.info(f"Parsing {len(rel_paths)} PDFs with {workers} worker processes")
+        # Spawn rather than fork so workers do not inherit torch's thread pools
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            # Keep a bounded window of files in flight so parsed chunks never
+            # pile up faster than the embedding stage consumes them
+            pending: Deque[Tuple[str, Future]] = deque()
+            paths = iter(rel_paths)
+            for rel_path in islice(paths, 2 * workers):
+                pending.append((rel_path, self._submit_split(executor, rel_path)))
+            while pending:
+                rel_path, future = pending.popleft()
+                for next_path in islice(paths, 1):
+                    pending.append((next_path, self._submit_split(executor, next_path)))
+                yield rel_path, future.result()
+
+    def _submit_split(self, executor: ProcessPoolExecutor, rel_path: str) -> Future:
+        """Schedule a PDF to be parsed and chunked in a worker process."""
+        return executor.submit(
+            _load_and_split,
+            str(Path(self.path) / rel_path),
+            config['document']['chunk_size'],
+            config['document']['chunk_overlap'],
+        )
+
+    def add_chunks(
+        self,
+        chunks: Iterable[Tuple[str, Document]],
+        on_batch: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Embed chunks in fixed-size batches and add them to the vector store.
+
+        Chunks are pulled lazily from the iterable, so at most one batch of
+        texts and vectors is held in memory at a time.
+
+        Args:
+            chunks: Iterable of (chunk ID, chunk) pairs.
+            on_batch: Called after each batch with the number of chunks embedded so far.
+
+        Returns:
+            Number of chunks embedded.
+        """
+        embedded = 0
+        for batch in _batched(chunks, self.embed_batch_size):
+            ids = [chunk_id for chunk_id, _ in batch]
+            texts = [doc.page_content for _, doc in batch]
+            metadatas = [doc.metadata for _, doc in batch]
+            text_embeddings = list(zip(texts, self.embeddings.embed_documents(texts)))
+            if self.vectorstore is None:
+                self.vectorstore = FAISS.from_embeddings(
+                    text_embeddings, self.embeddings, metadatas=metadatas, ids=ids,
+                    docstore=self._new_docstore(),
+                )
+            else:
+                self.vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+            for chunk_id, text in zip(ids, texts):
+                self.bm25.add(chunk_id, text)
+            embedded += len(batch)
+            logger.info(f"Embedded {embedded} chunks")
+            if on_batch is not None:
+                on_batch(embedded)
+        return embedded
+
+    def _load_index(
+        self, settings: Dict[str, Any]
+    ) -> Tuple[Optional[Any], Dict[str, Dict[str, Any]]]:
+        """Load the persisted index if it was built with the given settings.
+
+        Args:
+            settings: Embedding model and chunking parameters currently configured.
+
+        Returns:
+            Tuple of the persisted FAISS vector store and its per-file manifest
+            entries, or (None, {}) if the index is missing, unreadable or stale.
+        """
+        if not self.index_path:
+            return None, {}
+        manifest_path = os.path.join(self.index_path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            logger.info(f"No persisted index found at {self.index_path}")
+            return None, {}
+
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("settings") != settings:
+                logger.info("Persisted index was built with other settings, rebuilding")
+                return None, {}
+
+            logger.info(f"Loading persisted index from {self.index_path}")
+            vectorstore = FAISS.load_local(
+                self.index_path,
+                self.embeddings,
+                allow_dangerous_deserialization=True,
+            )
+            if isinstance(vectorstore.docstore, MmapDocstore):
+                vectorstore.docstore.open(self.index_path)
+            index_factory.configure_search(
+                vectorstore.index, config['document'].get('index', {})
+            )
+            return vectorstore, manifest["files"]
+        except Exception as e:
+            logger.warning(f"Could not load persisted index, rebuilding: {str(e)}")
+            return None, {}
+
+    def _load_bm25(self) -> BM25Index:
+        """Load the persisted BM25 index, rebuilding it from the docstore if missing."""
+        bm25_path = os.path.join(self.index_path, BM25_FILE) if self.index_path else None
+        if bm25_path and os.path.exists(bm25_path):
+            try:
+                with open(bm25_path, "rb") as f:
+                    return pickle.load(f)
+            except Exception as e:
+                logger.warning(f"Could not load BM25 index, rebuilding: {str(e)}")
+
+        logger.info("Rebuilding BM25 index from docstore")
+        bm25 = BM25Index()
+        for chunk_id in self.vectorstore.index_to_docstore_id.values():
+            bm25.add(chunk_id, self.vectorstore.docstore.search(chunk_id).page_content)
+        return bm25
+
+    def _save_index(
+        self,
+        settings: Dict[str, Any],
+        files: Dict[str, Dict[str, Any]],
+        save_vectors: bool = True,
+    ) -> None:
+        """Persist the index and docstore, then write the manifest last.
+
+        Args:
+            settings: Embedding model and chunking parameters the index was built with.
+            files: Per-file state of the documents in the index.
+            save_vectors: Whether the FAISS index and docstore changed and must be written.
+        """
+        if not self.index_path:
+            return
+        manifest_path = os.path.join(self.index_path, MANIFEST_FILE)
+        if save_vectors:
+            logger.info(f"Saving index to {self.index_path}")
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            docstore = self.vectorstore.docstore
+            compact_ratio = config['document'].get('storage', {}).get('compact_ratio', 0.5)
+            if isinstance(docstore, MmapDocstore) and docstore.garbage_ratio() > compact_ratio:
+                docstore.compact()
+            self.vectorstore.save_local(self.index_path)
+            with open(os.path.join(self.index_path, BM25_FILE), "wb") as f:
+                pickle.dump(self.bm25, f)
+            if isinstance(docstore, MmapDocstore):
+                remove_stale_files(self.index_path, keep=docstore.file_name)
+
+        # Write the manifest atomically so a crash never leaves a valid
+        # manifest next to a partially written index
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"settings": settings, "files": files}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield lists of up to size consecutive items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _load_and_split(source: str, chunk_size: int, chunk_overlap: int) -> List[Document]:
+    """Load a PDF and split it into chunks.
+
+    Defined at module level so it can run in worker processes.
+
+    Args:
+        source: Path of the PDF, stored as the "source" metadata of every chunk.
+        chunk_size: Maximum number of characters per chunk.
+        chunk_overlap: Number of characters shared by consecutive chunks.
+
+    Returns:
+        List of chunks with "source" and "page" metadata.
+    """
+    docs = PyPDFLoader(source).load()
+    for doc in docs:
+        doc.metadata["source"] = source
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    return splitter.split_documents(docs)
+
+
+def _index_version(settings: Dict[str, Any], files: Dict[str, Dict[str, Any]]) -> str:
+    """Derive a version string that changes whenever the indexed content does."""
+    content = {
+        "settings": settings,
+        "files": {rel_path: entry["sha256"] for rel_path, entry in files.items()},
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _embedding_key(doc_config: Dict[str, Any]) -> str:
+    """Model name qualified by the embedding backend, unless it is the torch reference.
+
+    Quantized backends produce slightly different vectors, so they must not
+    share cached vectors or an index with the reference model.
+    """
+    embedding_config = doc_config.get('embeddings') or {}
+    backend = embedding_config.get('backend', 'torch')
+    if backend == 'torch':
+        return doc_config['embedding_model']
+    key = f"{doc_config['embedding_model']}@{backend}"
+    if backend == 'onnx' and embedding_config.get('onnx_file'):
+        key += f":{embedding_config['onnx_file']}"
+    return key
+
+
+def _chunk_id(rel_path: str, index: int) -> str:
+    """Build the stable ID of the index-th chunk of a document."""
+    return f"{rel_path}::{index}"
+
+
+def _file_hash(path: str) -> str:
+    """Compute the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _copy_vectorstore(vectorstore: Any) -> Any:
+    """Copy a FAISS vector store so that updates leave the original untouched.
+
+    The index and the ID mapping are copied; the in-memory docstore is copied
+    by reference to its chunks and the memory-mapped one shares its file.
+    """
+    docstore = vectorstore.docstore
+    if isinstance(docstore, MmapDocstore):
+        docstore = docstore.copy()
+    else:
+        docstore = InMemoryDocstore(dict(docstore._dict))
+    return FAISS(
+        vectorstore.embedding_function,
+        faiss.clone_index(vectorstore.index),
+        docstore,
+        dict(vectorstore.index_to_docstore_id),
+        relevance_score_fn=vectorstore.override_relevance_score_fn,
+        normalize_L2=vectorstore._normalize_L2,
+        distance_strategy=vectorstore.distance_strategy,
+    )
+
+
+def _delete_chunks(vectorstore: Any, chunk_ids: List[str]) -> None:
+    """Delete chunks from a FAISS vector store in place.
+
+    FAISS.delete assumes that removal shifts the remaining vectors down, which
+    only holds for flat indexes; index_factory.remove_positions also keeps IVF
+    positions aligned with index_to_docstore_id.
+    """
+    stale = set(chunk_ids)
+    positions = {
+        i for i, chunk_id in vectorstore.index_to_docstore_id.items()
+        if chunk_id in stale
+    }
+    index_factory.remove_positions(
+        vectorstore.index, np.fromiter(positions, dtype=np.int64)
+    )
+    vectorstore.docstore.delete(chunk_ids)
+    remaining = [
+        chunk_id for i, chunk_id in sorted(vectorstore.index_to_docstore_id.items())
+        if i not in positions
+    ]
+    vectorstore.index_to_docstore_id = dict(enumerate(remaining))
+
+
+def _flat_index(vectors: np.ndarray) -> Any:
+    """Build an exact flat L2 index over vectors, in order."""
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    return index
@@ -0,0 +1,303 @@
+"""CPU embedding backends for the RAG system.
+
+This module builds the embeddings model selected by document.embeddings in
+config.yml. The same sentence-transformers model can run as:
+
+- "torch": the PyTorch reference, through HuggingFaceEmbeddings
+- "torch_int8": PyTorch with the Linear layers dynamically quantized to int8
+- "onnx": ONNX Runtime, optionally with a pre-quantized ONNX file of the model
+
+The optimized backends embed length-sorted batches so short chunks are not
+padded to the length of long ones, run with an explicit number of intra-op
+threads, and are checked against the reference for parity the first time
+they load. Passed checks are recorded next to the embedding cache, so later
+start-ups skip loading the reference model.
+"""
+import os
+import json
+import logging
+from importlib import metadata
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch_int8", "onnx")
+PARITY_FILE = "parity.json"
+
+# Texts used by the start-up parity check
+PARITY_TEXTS = [
+    "Senior Financial Analyst",
+    "What is the salary range for the Marketing Coordinator role?",
+    "Key Responsibilities: design, build and maintain scalable data pipelines "
+    "in Python and SQL, and work with stakeholders to define requirements.",
+    "Qualifications: Bachelor's degree in Computer Science or a related field.",
+]
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """Embeddings from a sentence-transformers model, embedded in length-sorted batches.
+
+    Attributes:
+        client: The SentenceTransformer model
+        batch_size: Number of texts encoded per forward pass
+        normalize: Whether vectors are normalized to unit length
+    """
+
+    def __init__(
+        self, client: Any, batch_size: int = 32, normalize: bool = False
+    ) -> None:
+        """Initialize the embeddings.
+
+        Args:
+            client: A SentenceTransformer, or any object with the same encode method.
+            batch_size: Number of texts encoded per forward pass.
+            normalize: Normalize vectors to unit length. HuggingFaceEmbeddings
+                does not by default, so neither does this class.
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.normalize = normalize
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, batching texts of similar length together.
+
+        Args:
+            texts: Texts to embed.
+
+        Returns:
+            One vector per text, in the order of texts.
+        """
+        # Same preprocessing as HuggingFaceEmbeddings, so vectors stay comparable
+        texts = [text.replace("\n", " ") for text in texts]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self.client.encode(
+                [texts[i] for i in batch],
+                batch_size=len(batch),
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize,
+                show_progress_bar=False,
+            )
+            for i, vector in zip(batch, encoded):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query."""
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries; this model embeds queries like documents."""
+        return self.embed_documents(texts)
+
+
+def build_embeddings(
+    model_name: str,
+    embedding_config: Optional[Dict[str, Any]] = None,
+    record_dir: Optional[str] = None,
+) -> Embeddings:
+    """Build the embeddings model for the configured backend.
+
+    Args:
+        model_name: Name of the sentence-transformers model.
+        embedding_config: The document.embeddings section of config.yml.
+        record_dir: Directory in which passed parity checks are recorded, so
+            each model, backend, ONNX file and library version is checked
+            once. None checks on every call.
+
+    Returns:
+        The embeddings model.
+
+    Raises:
+        ValueError: If the backend is unknown or fails the parity check.
+        ImportError: If the ONNX backend is selected without onnxruntime
+            and optimum.
+    """
+    embedding_config = embedding_config or {}
+    backend = embedding_config.get('backend', 'torch')
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}"
+        )
+    threads = embedding_config.get('intra_op_threads', 0)
+    batch_size = embedding_config.get('batch_size', 32)
+
+    # Set before the tokenizer loads; PDF workers are spawned, not forked,
+    # so parallel tokenization cannot deadlock them
+    os.environ.setdefault(
+        "TOKENIZERS_PARALLELISM",
+        "true" if embedding_config.get('tokenizers_parallelism', True) else "false",
+    )
+    if backend != "onnx" and threads:
+        import torch
+
+        torch.set_num_threads(threads)
+
+    logger.info(f"Loading embedding model {model_name} with the {backend} backend")
+    if backend == "torch":
+        return _reference_embeddings(model_name, batch_size)
+
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch_int8":
+        client = quantize_int8(SentenceTransformer(model_name, device="cpu"))
+    else:
+        client = SentenceTransformer(
+            model_name,
+            device="cpu",
+            backend="onnx",
+            model_kwargs=_onnx_kwargs(embedding_config.get('onnx_file'), threads),
+        )
+    embeddings = SentenceTransformerEmbeddings(client, batch_size=batch_size)
+
+    if embedding_config.get('parity_check', True):
+        tolerance = embedding_config.get('parity_tolerance', 0.99)
+        check = _parity_key(model_name, backend, embedding_config.get('onnx_file'))
+        similarity = _recorded_parity(record_dir, check)
+        if similarity is None or similarity < tolerance:
+            reference = _reference_embeddings(model_name, batch_size)
+            similarity = check_parity(embeddings, reference, tolerance=tolerance)
+            _record_parity(record_dir, check, similarity)
+        logger.info(
+            f"{backend} embeddings match the torch reference "
+            f"(min cosine {similarity:.4f})"
+        )
+    return embeddings
+
+
+def quantize_int8(model: Any) -> Any:
+    """Dynamically quantize the Linear layers of a model to int8 for CPU inference.
+
+    Args:
+        model: A torch module, e.g. a SentenceTransformer.
+
+    Returns:
+        The quantized model.
+    """
+    import torch
+
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def check_parity(
+    candidate: Embeddings,
+    reference: Embeddings,
+    texts: Optional[List[str]] = None,
+    tolerance: float = 0.99,
+) -> float:
+    """Check that a backend's embeddings stay close to the reference embeddings.
+
+    Args:
+        candidate: Embeddings under test.
+        reference: Reference embeddings, normally the PyTorch model.
+        texts: Texts to compare on. Defaults to PARITY_TEXTS.
+        tolerance: Minimum cosine similarity between the two vectors of a text.
+
+    Returns:
+        The lowest cosine similarity over the texts.
+
+    Raises:
+        ValueError: If any text's similarity is below the tolerance.
+    """
+    texts = texts or PARITY_TEXTS
+    a = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    b = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    if a.shape != b.shape:
+        raise ValueError(f"Embedding shapes differ: {a.shape} vs {b.shape}")
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    similarity = float(np.min(np.sum(a * b, axis=1) / np.maximum(norms, 1e-12)))
+    if similarity < tolerance:
+        raise ValueError(
+            f"Embeddings deviate from the reference: min cosine similarity "
+            f"{similarity:.4f} < {tolerance}"
+        )
+    return similarity
+
+
+def _reference_embeddings(model_name: str, batch_size: int) -> Embeddings:
+    """The PyTorch reference model."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=model_name, encode_kwargs={"batch_size": batch_size}
+    )
+
+
+def _parity_key(model_name: str, backend: str, onnx_file: Optional[str]) -> str:
+    """Identify a parity check by model, backend, ONNX file and library versions."""
+    packages = ["sentence-transformers", "torch"]
+    if backend == "onnx":
+        packages.append("onnxruntime")
+    versions = []
+    for package in packages:
+        try:
+            versions.append(f"{package}=={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            versions.append(package)
+    return "|".join([model_name, backend, onnx_file or "", *versions])
+
+
+def _recorded_parity(record_dir: Optional[str], check: str) -> Optional[float]:
+    """The similarity recorded for a passed parity check, or None."""
+    if record_dir is None:
+        return None
+    try:
+        with open(os.path.join(record_dir, PARITY_FILE)) as f:
+            return json.load(f).get(check)
+    except (OSError, ValueError):
+        return None
+
+
+def _record_parity(record_dir: Optional[str], check: str, similarity: float) -> None:
+    """Record a passed parity check; failing to record it is only logged."""
+    if record_dir is None:
+        return
+    path = os.path.join(record_dir, PARITY_FILE)
+    try:
+        os.makedirs(record_dir, exist_ok=True)
+        try:
+            with open(path) as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            records = {}
+        records[check] = similarity
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(records, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not record the embedding parity check: {str(e)}")
+
+
+def _onnx_kwargs(onnx_file: Optional[str], threads: int) -> Dict[str, Any]:
+    """Keyword arguments for loading the model with ONNX Runtime."""
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError(
+            "The onnx embedding backend needs onnxruntime and optimum: "
+            "pip install 'sentence-transformers[onnx]'"
+        ) from e
+    options = onnxruntime.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+    kwargs: Dict[str, Any] = {
+        "provider": "CPUExecutionProvider", "session_options": options
+    }
+    if onnx_file:
+        # e.g. "onnx/model_qint8_avx512_vnni.onnx" for a pre-quantized export
+        kwargs["file_name"] = onnx_file
+    return kwargs
@@ -0,0 +1,349 @@
+"""Persistent embedding cache for the RAG system.
+
+This module wraps an embeddings model with a local cache keyed by the embedding
+model name and a hash of the normalized text. Vectors, their keys and their
+last use live in memory-mapped arrays on disk, so identical chunk texts and
+repeated queries are only embedded once, across index rebuilds and chunking
+configurations. A new entry is persisted by writing its own row; nothing is
+rewritten in full. Processes sharing the cache directory, e.g. the Streamlit
+app and the query service, allocate rows under a lock on the directory.
+"""
+import os
+import json
+import fcntl
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+KEYS_FILE = "keys.npy"
+TICKS_FILE = "ticks.npy"
+# Next unused row and the use clock, shared by all processes using the cache
+STATE_FILE = "state.npy"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from an on-disk cache.
+
+    Entries are evicted in least-recently-used order once the cache holds
+    max_entries vectors; the row of the evicted entry is reused. Each row
+    records its key and when it was last used, from which the key-to-row index
+    is rebuilt on load. Rows are allocated and written while holding a lock on
+    the cache directory, so processes sharing it never write the same row at
+    once. Readers check a row's key before and after copying its vector, so a
+    row being rewritten is never taken for a hit.
+
+    Attributes:
+        embeddings: The wrapped embeddings model
+        model_name: Name of the wrapped model, part of every cache key
+        hits: Number of texts served from the cache
+        misses: Number of texts that had to be embedded
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        cache_dir: str,
+        max_entries: int = 50000,
+    ) -> None:
+        """Initialize the cache, loading any entries persisted in cache_dir.
+
+        Args:
+            embeddings: Embeddings model used on cache misses.
+            model_name: Name of the embeddings model.
+            cache_dir: Directory holding the vector, key and last-use arrays.
+            max_entries: Maximum number of cached vectors.
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._ticks: Optional[np.memmap] = None
+        self._state: Optional[np.memmap] = None
+        self._lock_file: Optional[IO[str]] = None
+        self._load()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, computing only those missing from the cache in one call.
+
+        Args:
+            texts: Texts to embed.
+
+        Returns:
+            One embedding per text, in input order.
+        """
+        results = self._embed_many(texts, self.embeddings.embed_documents)
+        # Outside the lock, so queries are not blocked while syncing
+        self.flush()
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, serving repeated queries from the cache.
+
+        Args:
+            text: Query text.
+
+        Returns:
+            The query embedding.
+        """
+        key = self._key(text)
+        with self._lock:
+            vector = self._get(key)
+            if vector is not None:
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._put_many([(key, vector)])
+        return list(vector)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries, embedding the uncached ones together.
+
+        Args:
+            texts: Query texts.
+
+        Returns:
+            One embedding per query, in input order.
+        """
+        return self._embed_many(
+            texts, lambda missing: embed_queries(self.embeddings, missing)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of cached entries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._rows),
+                "max_entries": self.max_entries,
+            }
+
+    def flush(self) -> None:
+        """Sync the memory-mapped arrays to disk.
+
+        Rows are written to shared mappings, which the OS writes back on its
+        own; syncing only protects them against a crash of the machine.
+        """
+        arrays = (self._vectors, self._keys, self._ticks, self._state)
+        if arrays[0] is not None:
+            for array in arrays:
+                array.flush()
+
+    def _embed_many(
+        self, texts: List[str], embed: Callable[[List[str]], List[List[float]]]
+    ) -> List[List[float]]:
+        """Serve texts from the cache and embed the distinct missing ones with embed."""
+        keys = [self._key(text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._get(key)
+                if vector is not None:
+                    results[i] = vector
+                else:
+                    missing.setdefault(key, []).append(i)
+            misses = sum(len(positions) for positions in missing.values())
+            self.hits += len(texts) - misses
+            self.misses += misses
+
+        if missing:
+            # Embed each distinct missing text once
+            positions = list(missing.values())
+            vectors = embed([texts[p[0]] for p in positions])
+            with self._lock:
+                self._put_many(list(zip(missing, vectors)))
+            for group, vector in zip(positions, vectors):
+                for i in group:
+                    results[i] = list(vector)
+        return results  # type: ignore[return-value]
+
+    def _key(self, text: str) -> str:
+        """Hash the model name and whitespace-normalized text into a cache key."""
+        normalized = " ".join(text.split())
+        data = f"{self.model_name}\0{normalized}".encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        """Return the cached vector for key and mark it recently used."""
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        expected = key.encode("ascii")
+        vector = None
+        if self._keys[row] == expected:
+            vector = self._vectors[row].tolist()
+        if vector is None or self._keys[row] != expected:
+            # Another process sharing the cache evicted or is rewriting the row
+            del self._rows[key]
+            return None
+        self._touch(row)
+        return vector
+
+    def _put_many(self, entries: List[Tuple[str, List[float]]]) -> None:
+        """Store vectors, evicting the least recently used entries when full."""
+        if not entries:
+            return
+        if self._vectors is None:
+            self._create(len(entries[0][1]))
+        with self._locked_directory():
+            for key, vector in entries:
+                self._put(key, vector)
+
+    def _put(self, key: str, vector: List[float]) -> None:
+        """Store a vector; the caller holds the directory lock."""
+        encoded = key.encode("ascii")
+        row = self._rows.get(key)
+        if row is not None and self._keys[row] == encoded:
+            self._touch(row)
+            return
+        next_row = int(self._state[0])
+        if next_row < self.max_entries:
+            row = next_row
+            self._state[0] = next_row + 1
+        else:
+            # Least recently used over the rows of every process
+            row = int(np.argmin(self._ticks))
+            self._rows.pop(self._keys[row].decode("ascii"), None)
+        self._keys[row] = b""
+        self._vectors[row] = vector
+        self._keys[row] = encoded
+        self._touch(row)
+        self._rows[key] = row
+
+    def _touch(self, row: int) -> None:
+        """Record a use of a row on the shared clock, for LRU eviction."""
+        tick = int(self._state[1]) + 1
+        self._state[1] = tick
+        self._ticks[row] = tick
+
+    @contextmanager
+    def _locked_directory(self) -> Iterator[None]:
+        """Hold an exclusive lock on the cache directory, across processes."""
+        if self._lock_file is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._lock_file = open(os.path.join(self.cache_dir, LOCK_FILE), "w")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _create(self, dim: int) -> None:
+        """Create empty memory-mapped arrays, or open those another process created.
+
+        The arrays are written under temporary names and renamed into place
+        while holding a lock on the cache directory. Processes that have the
+        previous files mapped keep valid mappings, and concurrent creators
+        never mix their files.
+        """
+        with self._locked_directory():
+            self._load()
+            if self._vectors is not None and self._vectors.shape[1] == dim:
+                return
+            meta_path = os.path.join(self.cache_dir, META_FILE)
+            if os.path.exists(meta_path):
+                # Without metadata no process loads the files being replaced
+                os.remove(meta_path)
+            rows = self.max_entries
+            self._vectors = self._replace_array(VECTORS_FILE, np.float32, (rows, dim))
+            self._keys = self._replace_array(KEYS_FILE, "S64", (rows,))
+            self._ticks = self._replace_array(TICKS_FILE, np.uint64, (rows,))
+            self._state = self._replace_array(STATE_FILE, np.uint64, (2,))
+            tmp_path = f"{meta_path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                json.dump({"model_name": self.model_name}, f)
+            os.replace(tmp_path, meta_path)
+        self._rows.clear()
+
+    def _replace_array(
+        self, name: str, dtype: Any, shape: Tuple[int, ...]
+    ) -> np.memmap:
+        """Create a zero-filled memory-mapped array and rename it over name."""
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+        os.replace(tmp_path, path)
+        return array
+
+    def _load(self) -> None:
+        """Open the persisted arrays and rebuild the index from their keys."""
+        meta_path = os.path.join(self.cache_dir, META_FILE)
+        paths = [
+            os.path.join(self.cache_dir, name)
+            for name in (VECTORS_FILE, KEYS_FILE, TICKS_FILE, STATE_FILE)
+        ]
+        if not all(os.path.exists(p) for p in [meta_path, *paths]):
+            return
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            vectors, keys, ticks, state = (np.load(p, mmap_mode="r+") for p in paths)
+            if (
+                meta["model_name"] != self.model_name
+                or vectors.shape[0] != self.max_entries
+                or keys.shape[0] != self.max_entries
+                or ticks.shape[0] != self.max_entries
+                or state.shape != (2,)
+            ):
+                logger.info("Embedding cache settings changed, starting a new cache")
+                return
+            filled = np.flatnonzero(keys != b"")
+            order = filled[np.argsort(ticks[filled], kind="stable")]
+            self._vectors, self._keys, self._ticks = vectors, keys, ticks
+            self._state = state
+            # Later uses win if two processes stored the same text
+            self._rows = {keys[row].decode("ascii"): int(row) for row in order}
+            logger.info(
+                f"Loaded {len(self._rows)} cached embeddings from {self.cache_dir}"
+            )
+        except Exception as e:
+            logger.warning(
+                f"Could not load embedding cache, starting a new one: {str(e)}"
+            )
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed queries through the query path of an embeddings model.
+
+    Models with an embed_queries method embed them in one call; others embed
+    one query at a time, so queries are never embedded as documents.
+
+    Args:
+        embeddings: Embeddings model.
+        texts: Query texts.
+
+    Returns:
+        One embedding per query, in input order.
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    return [embeddings.embed_query(text) for text in texts]
@@ -0,0 +1,312 @@
+"""Approximate nearest neighbour index construction for the RAG system.
+
+This module builds the FAISS index configured under document.index: an exact
+flat index, or IVF-Flat, HNSW or IVF-PQ for large corpora. IVF and PQ indexes
+are trained on a random sample of the corpus vectors, search-time parameters
+(nprobe, efSearch) are applied on every build and load, and recall@k against
+exact flat search can be measured to choose those parameters knowingly.
+Vectors can be stored as float16 or 8-bit scalar-quantized codes instead of
+float32 to halve or quarter the index memory.
+"""
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+# Vector encodings and their FAISS factory codes; IVF-PQ always uses PQ codes
+ENCODINGS = {"float32": "Flat", "fp16": "SQfp16", "sq8": "SQ8"}
+
+# Parameters that change how an index is built; search parameters are excluded
+# so tuning nprobe or efSearch never forces a rebuild
+BUILD_PARAMS = {
+    "flat": (),
+    "ivf_flat": ("nlist",),
+    "hnsw": ("hnsw_m", "ef_construction"),
+    "ivf_pq": ("nlist", "pq_m", "pq_bits"),
+}
+
+
+def index_settings(index_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the index type and the parameters its vectors are built with.
+
+    Args:
+        index_config: The document.index configuration.
+
+    Returns:
+        Dict recorded in the index manifest.
+
+    Raises:
+        ValueError: If the index type is unknown.
+    """
+    index_type = index_config.get("type", "flat")
+    if index_type not in INDEX_TYPES:
+        raise ValueError(
+            f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}"
+        )
+    settings = {"type": index_type}
+    settings.update({name: index_config[name] for name in BUILD_PARAMS[index_type]})
+    encoding = _encoding(index_config)
+    # Recorded only when compact, so existing float32 indexes stay valid
+    if encoding != "float32" and index_type != "ivf_pq":
+        settings["encoding"] = encoding
+    return settings
+
+
+def is_flat(index: Any) -> bool:
+    """Whether an index performs exact search over uncompressed vectors."""
+    return isinstance(index, faiss.IndexFlat)
+
+
+def is_lossless(index: Any) -> bool:
+    """Whether an index's vectors can be reconstructed and encoded again unchanged.
+
+    float16 codes round-trip exactly; 8-bit codes are retrained on every build,
+    so re-encoding reconstructed vectors would drift.
+    """
+    if isinstance(index, (faiss.IndexFlat, faiss.IndexHNSWFlat, faiss.IndexIVFFlat)):
+        return True
+    return _scalar_quantizer_type(index) == faiss.ScalarQuantizer.QT_fp16
+
+
+def reconstruct_all(index: Any) -> np.ndarray:
+    """Return all vectors stored in a lossless index, in index order.
+
+    Args:
+        index: A flat, HNSW or IVF index with float32 or float16 vectors.
+
+    Returns:
+        Array of shape (ntotal, d), float32.
+    """
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def supports_remove(index: Any) -> bool:
+    """Whether vectors can be removed from an index in place; HNSW graphs cannot."""
+    return not isinstance(index, faiss.IndexHNSW)
+
+
+def remove_positions(index: Any, positions: np.ndarray) -> None:
+    """Remove vectors by position, renumbering the rest to 0..ntotal-1 in order.
+
+    Flat indexes shift the remaining vectors down themselves. IVF lists keep
+    the ids their vectors were added with, so those are renumbered to match,
+    without retraining or re-encoding anything.
+
+    Args:
+        index: A flat, scalar-quantized or IVF index.
+        positions: Int64 array of the positions to remove.
+
+    Raises:
+        ValueError: If the index does not support removal.
+    """
+    if not supports_remove(index):
+        raise ValueError(f"Cannot remove vectors from a {type(index).__name__}")
+    if isinstance(index, faiss.IndexIVF):
+        # The array direct map built by reconstruct_all does not support removal
+        index.set_direct_map_type(faiss.DirectMap.NoMap)
+    index.remove_ids(positions)
+    if isinstance(index, faiss.IndexIVF):
+        _renumber_lists(index)
+
+
+def build_index(vectors: np.ndarray, index_config: Dict[str, Any]) -> Any:
+    """Build and fill the configured index over a set of vectors.
+
+    Corpora smaller than min_vectors keep an exact flat index: approximate
+    search only pays off at scale and IVF/PQ training needs enough samples.
+    nlist is capped so that every IVF list gets enough training points.
+
+    A compact encoding (document.index.encoding) applies to flat, IVF and
+    HNSW indexes alike, including flat indexes kept below min_vectors.
+
+    Args:
+        vectors: Float32 array of shape (n, d), in docstore order.
+        index_config: The document.index configuration.
+
+    Returns:
+        The FAISS index containing the vectors, with search parameters applied.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index_type = index_config.get("type", "flat")
+    codes = ENCODINGS[_encoding(index_config)]
+    if index_type == "flat" or n < index_config.get("min_vectors", 0):
+        if index_type != "flat":
+            logger.info(
+                f"Keeping a flat index for {n} vectors (min_vectors not reached)"
+            )
+        if codes == "Flat":
+            index = faiss.IndexFlatL2(dim)
+            index.add(vectors)
+            return index
+        description = codes
+    else:
+        nlist = max(1, min(index_config["nlist"], n // 39))
+        if index_type == "ivf_flat":
+            description = f"IVF{nlist},{codes}"
+        elif index_type == "hnsw":
+            description = f"HNSW{index_config['hnsw_m']}"
+            if codes != "Flat":
+                description += f"_{codes}"
+        else:
+            pq = f"PQ{index_config['pq_m']}x{index_config['pq_bits']}"
+            description = f"IVF{nlist},{pq}"
+    logger.info(f"Building {description} index over {n} vectors")
+
+    index = faiss.index_factory(dim, description, faiss.METRIC_L2)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = index_config["ef_construction"]
+    if not index.is_trained:
+        train_size = min(n, index_config.get("train_size", n))
+        sample = np.random.default_rng(0).choice(n, size=train_size, replace=False)
+        index.train(vectors[np.sort(sample)])
+    index.add(vectors)
+    configure_search(index, index_config)
+    return index
+
+
+def is_compact(index_config: Dict[str, Any]) -> bool:
+    """Whether the configured index stores anything but float32 flat vectors."""
+    return (
+        index_config.get("type", "flat") != "flat"
+        or _encoding(index_config) != "float32"
+    )
+
+
+def configure_search(index: Any, index_config: Dict[str, Any]) -> None:
+    """Apply the configured nprobe or efSearch to an index.
+
+    Args:
+        index: Index to tune; flat indexes are left unchanged.
+        index_config: The document.index configuration.
+    """
+    params = faiss.ParameterSpace()
+    if isinstance(index, faiss.IndexIVF):
+        params.set_index_parameter(index, "nprobe", index_config["nprobe"])
+    elif isinstance(index, faiss.IndexHNSW):
+        params.set_index_parameter(index, "efSearch", index_config["ef_search"])
+
+
+def recall_at_k(
+    index: Any, vectors: np.ndarray, k: int = 4, n_queries: int = 200, seed: int = 0
+) -> Optional[float]:
+    """Measure recall@k of an index against exact flat search.
+
+    Queries are corpus vectors sampled at random, a proxy for questions that
+    land near the indexed chunks.
+
+    Args:
+        index: Index to evaluate, containing exactly the given vectors.
+        vectors: Float32 array of shape (n, d), in index order.
+        k: Number of neighbours compared.
+        n_queries: Number of sampled queries.
+        seed: Seed of the query sample.
+
+    Returns:
+        Fraction of the exact top-k neighbours found by the index, or None if
+        there are no vectors.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n = len(vectors)
+    if n == 0:
+        return None
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n, size=min(n_queries, n), replace=False)]
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, expected = exact.search(queries, k)
+    _, found = index.search(queries, k)
+    hits = sum(len(set(e) & set(f)) for e, f in zip(expected, found))
+    return hits / expected.size
+
+
+def search_subset(
+    index: Any, query: np.ndarray, k: int, positions: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Search only the given index positions, for every query row at once.
+
+    Flat and IVF indexes skip every other vector through an ID selector. HNSW
+    graph traversal loses neighbours under selective filters, so its candidate
+    vectors are compared exactly instead.
+
+    Args:
+        index: Index to search.
+        query: Float32 array of shape (n, d).
+        k: Number of neighbours.
+        positions: Int64 array of the allowed positions.
+
+    Returns:
+        Tuple of distances and positions of shape (n, k), padded with -1
+        positions.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        vectors = index.reconstruct_batch(positions)
+        distances = faiss.pairwise_distances(query, vectors)
+        order = np.argsort(distances, axis=1)[:, :k]
+        count = order.shape[1]
+        found = np.full((len(query), k), -1, dtype=np.int64)
+        found[:, :count] = positions[order]
+        result = np.full((len(query), k), np.finfo(np.float32).max, dtype=np.float32)
+        result[:, :count] = np.take_along_axis(distances, order, axis=1)
+        return result, found
+
+    # The parameters do not own the selector, so keep it referenced during the search
+    selector = faiss.IDSelectorBatch(positions)
+    if isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(query, k, params=params)
+
+
+def _renumber_lists(index: Any) -> None:
+    """Replace the ids in an IVF index's lists by their rank among all ids."""
+    invlists = index.invlists
+    lists = [
+        faiss.rev_swig_ptr(invlists.get_ids(i), invlists.list_size(i))
+        for i in range(index.nlist)
+        if invlists.list_size(i)
+    ]
+    if not lists:
+        return
+    remaining = np.sort(np.concatenate(lists))
+    for ids in lists:
+        # The arrays are views of the lists' memory
+        ids[:] = np.searchsorted(remaining, ids)
+
+
+def _encoding(index_config: Dict[str, Any]) -> str:
+    """The configured vector encoding.
+
+    Raises:
+        ValueError: If the encoding is unknown.
+    """
+    encoding = index_config.get("encoding", "float32")
+    if encoding not in ENCODINGS:
+        raise ValueError(
+            f"Unknown vector encoding {encoding!r}, "
+            f"expected one of {tuple(ENCODINGS)}"
+        )
+    return encoding
+
+
+def _scalar_quantizer_type(index: Any) -> Optional[int]:
+    """The scalar quantizer type of an index, or None if it has none."""
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return index.sq.qtype
+    return None
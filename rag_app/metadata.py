@@ -0,0 +1,241 @@
+"""Document metadata extraction and filtering for the RAG system.
+
+This module extracts structured metadata (title, department, seniority, job
+code) from every job description at ingest and keeps it in a columnar side
+table: one row per document plus an array mapping every FAISS position to its
+document. Filters, given explicitly or detected from job titles mentioned in
+the question, resolve to the FAISS positions of the matching documents, so
+retrieval can restrict its candidates to them, or boost them, before
+similarity scoring.
+"""
+import re
+import logging
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+FIELDS = ("source", "title", "department", "seniority", "job_code")
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Checked in order; the first level with a matching pattern wins
+SENIORITY_PATTERNS = [
+    ("executive", r"\b(chief|c[a-z]o|vp|vice president|president|head of)\b"),
+    ("director", r"\bdirector\b"),
+    ("manager", r"\bmanager\b"),
+    ("senior", r"\b(senior|sr|lead|principal|staff|iii)\b"),
+    ("mid", r"\b(mid-level|mid level|ii)\b"),
+    (
+        "entry",
+        r"\b(entry-level|entry level|junior|jr|associate|assistant|coordinator"
+        r"|intern)\b",
+    ),
+]
+
+
+def extract_metadata(rel_path: str, first_page: Optional[str] = None) -> Dict[str, Any]:
+    """Extract the structured metadata of a job description.
+
+    The title comes from the heading of the first page when there is one and
+    from the file name otherwise; department and job code come from the
+    "Department:" and "Job Code:" fields of the first page.
+
+    Args:
+        rel_path: Path of the PDF relative to the document directory.
+        first_page: Text of the first page, if already loaded.
+
+    Returns:
+        Dict with source, title, department, seniority, job_code and the
+        aliases used to detect the document's role in questions.
+    """
+    text = " ".join(first_page.split()) if first_page else ""
+    heading = text.split("●", 1)[0].strip() if "●" in text else ""
+    heading = re.sub(r"^\d+\.\s*", "", heading)
+    title = heading or PurePosixPath(rel_path).stem
+
+    department = re.search(r"Department\s*:\s*(.+?)\s*(●|$)", text)
+    job_code = re.search(r"Job Code\s*:\s*([A-Z0-9-]+)", text)
+    return {
+        "source": rel_path,
+        "title": title,
+        "department": department.group(1) if department else None,
+        "seniority": _seniority(title),
+        "job_code": job_code.group(1) if job_code else None,
+        "aliases": _aliases(title, PurePosixPath(rel_path).stem),
+    }
+
+
+def _seniority(title: str) -> Optional[str]:
+    """Classify a job title into a seniority level."""
+    lowered = title.lower()
+    for level, pattern in SENIORITY_PATTERNS:
+        if re.search(pattern, lowered):
+            return level
+    return None
+
+
+def _aliases(title: str, stem: str) -> List[str]:
+    """Return the lowercase names a question may use for a role.
+
+    "Software Engineer II (Mid-Level)" is also known as "software engineer ii"
+    and "software engineer"; "Chief Technology Officer (CTO)" also as "cto".
+    """
+    aliases = set()
+    for name in (title, stem):
+        base = re.sub(r"\s*\(([^)]*)\)", "", name).strip()
+        aliases.update({name, base, re.sub(r"\s+(i{1,3}|iv|v)$", "", base, flags=re.I)})
+        for acronym in re.findall(r"\(([A-Z]{2,6})\)", name):
+            aliases.add(acronym)
+    return sorted({alias.lower() for alias in aliases if alias})
+
+
+class MetadataTable:
+    """Columnar document metadata aligned with the FAISS index positions.
+
+    Each field is a NumPy column with one row per document; chunk_docs holds,
+    for every FAISS position, the row of the document the chunk belongs to.
+    The table is rebuilt after every index update and swapped in atomically,
+    so retrievers holding it always see a consistent state.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty table."""
+        self._state: Dict[str, Any] = {
+            "columns": {field: np.array([], dtype=object) for field in FIELDS},
+            "chunk_docs": np.array([], dtype=np.int32),
+            "aliases": [],
+            "alias_index": {},
+        }
+
+    def __len__(self) -> int:
+        return len(self._state["columns"]["source"])
+
+    def update(
+        self,
+        files: Mapping[str, Dict[str, Any]],
+        index_to_docstore_id: Mapping[int, str],
+    ) -> None:
+        """Rebuild the table from the manifest entries and the FAISS ID mapping.
+
+        Args:
+            files: Manifest entries by relative path; entries without metadata
+                get metadata extracted from their file name.
+            index_to_docstore_id: FAISS position to chunk ID mapping.
+        """
+        sources = sorted(files)
+        metadata = [files[f].get("metadata") or extract_metadata(f) for f in sources]
+        columns = {
+            field: np.array([m.get(field) for m in metadata], dtype=object)
+            for field in FIELDS
+        }
+        rows = {source: row for row, source in enumerate(sources)}
+
+        size = max(index_to_docstore_id, default=-1) + 1
+        chunk_docs = np.full(size, -1, dtype=np.int32)
+        for position, chunk_id in index_to_docstore_id.items():
+            chunk_docs[position] = rows.get(chunk_id.rsplit("::", 1)[0], -1)
+
+        # Longest aliases first, so "software engineer ii" is matched before
+        # "software engineer"
+        aliases = sorted(
+            (
+                (alias, row)
+                for row, m in enumerate(metadata) for alias in m.get("aliases", [])
+            ),
+            key=lambda item: -len(item[0]),
+        )
+        # Aliases by their first word, so a question is only compared with the
+        # aliases starting with one of its words
+        alias_index: Dict[str, List[Tuple[int, str, int]]] = {}
+        for rank, (alias, row) in enumerate(aliases):
+            first = WORD_PATTERN.match(alias)
+            word = first.group() if first else ""
+            alias_index.setdefault(word, []).append((rank, alias, row))
+        self._state = {
+            "columns": columns, "chunk_docs": chunk_docs,
+            "aliases": aliases, "alias_index": alias_index,
+        }
+
+    def detect_filters(self, question: str) -> Optional[Dict[str, List[str]]]:
+        """Detect the documents whose role a question names.
+
+        Args:
+            question: The user's question.
+
+        Returns:
+            A {"source": [...]} filter, or None if no role is mentioned.
+        """
+        state = self._state
+        alias_index = state["alias_index"]
+        lowered = question.lower()
+        matched = set()
+        for word in WORD_PATTERN.finditer(lowered):
+            start = word.start()
+            if start and lowered[start - 1] == "-":
+                continue
+            for rank, alias, row in alias_index.get(word.group(), ()):
+                end = start + len(alias)
+                if lowered.startswith(alias, start) and not _is_word_char(
+                    lowered[end:end + 1]
+                ):
+                    matched.add((rank, row))
+        # Aliases not starting with a word character are rare; match them directly
+        for rank, alias, row in alias_index.get("", ()):
+            if re.search(rf"(?<![\w-]){re.escape(alias)}(?![\w-])", lowered):
+                matched.add((rank, row))
+
+        sources = []
+        for _, row in sorted(matched):
+            source = state["columns"]["source"][row]
+            if source not in sources:
+                sources.append(source)
+        return {"source": sources} if sources else None
+
+    def positions(self, filters: Mapping[str, Sequence[str]]) -> np.ndarray:
+        """Return the FAISS positions of the chunks of documents matching all filters.
+
+        Args:
+            filters: Field name to accepted values, compared case-insensitively.
+
+        Returns:
+            Sorted int64 array of FAISS positions.
+
+        Raises:
+            ValueError: If a filter names an unknown field.
+        """
+        state = self._state
+        columns = state["columns"]
+        matches = np.ones(len(columns["source"]), dtype=bool)
+        for field, values in filters.items():
+            if field not in columns:
+                raise ValueError(
+                    f"Unknown metadata field {field!r}, expected one of {FIELDS}"
+                )
+            if isinstance(values, str):
+                values = [values]
+            accepted = {str(v).lower() for v in values}
+            column = np.array([str(v).lower() for v in columns[field]], dtype=object)
+            matches &= np.isin(column, list(accepted))
+        rows = np.flatnonzero(matches)
+        return np.flatnonzero(np.isin(state["chunk_docs"], rows)).astype(np.int64)
+
+    def documents(self) -> List[Dict[str, Any]]:
+        """Return the table as one dict per document."""
+        columns = self._state["columns"]
+        return [
+            {field: columns[field][row] for field in FIELDS}
+            for row in range(len(columns["source"]))
+        ]
+
+
+def _is_word_char(char: str) -> bool:
+    """Whether a character continues a word, as in the alias boundary checks."""
+    return bool(char) and (char == "-" or WORD_PATTERN.match(char) is not None)
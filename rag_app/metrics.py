@@ -0,0 +1,169 @@
+"""Latency instrumentation for the RAG system.
+
+This module records wall-clock durations of the query pipeline stages (query
+embedding, vector search, prompt assembly, LLM call, rendering). Durations are
+kept in rolling windows per stage to report p50/p95/p99, and every query is
+written as one structured JSON log line to the metrics log.
+"""
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional
+
+import numpy as np
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+metrics_logger = logging.getLogger("rag_app.metrics.queries")
+
+
+class LatencyRecorder:
+    """Keeps rolling windows of stage durations and reports their percentiles.
+
+    Attributes:
+        window: Number of most recent samples kept per stage
+    """
+
+    def __init__(self, window: int = 1000) -> None:
+        """Initialize an empty recorder.
+
+        Args:
+            window: Number of most recent samples kept per stage.
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Add a duration sample for a stage.
+
+        Args:
+            stage: Name of the pipeline stage.
+            seconds: Wall-clock duration in seconds.
+        """
+        with self._lock:
+            samples = self._samples.setdefault(stage, deque(maxlen=self.window))
+            samples.append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return count, p50, p95 and p99 in seconds for every recorded stage."""
+        with self._lock:
+            snapshot = {
+                stage: list(samples) for stage, samples in self._samples.items()
+            }
+        summary = {}
+        for stage, samples in snapshot.items():
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            summary[stage] = {
+                "count": len(samples),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99),
+            }
+        return summary
+
+    def reset(self) -> None:
+        """Drop all samples."""
+        with self._lock:
+            self._samples.clear()
+
+
+class QueryTimings:
+    """Stage durations collected for a single query."""
+
+    def __init__(self, **fields: Any) -> None:
+        """Start timing a query.
+
+        Args:
+            **fields: Extra fields written to the query's JSON log line.
+        """
+        self.fields = fields
+        self.stages: Dict[str, float] = {}
+        self.start = time.perf_counter()
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Accumulate a stage duration; repeated stages are summed."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        """Wall-clock seconds since the query started."""
+        return time.perf_counter() - self.start
+
+
+latency = LatencyRecorder(config.get('metrics', {}).get('window', 1000))
+_current_query: ContextVar[Optional[QueryTimings]] = ContextVar(
+    "current_query", default=None
+)
+
+
+@contextmanager
+def track_query(**fields: Any) -> Iterator[QueryTimings]:
+    """Time a query end to end and log its stage breakdown as one JSON line.
+
+    Nested calls reuse the outer query, so the app can wrap rendering and the
+    model its own stages without producing two log lines.
+
+    Args:
+        **fields: Extra fields written to the JSON log line.
+
+    Yields:
+        The timings of the current query.
+    """
+    current = _current_query.get()
+    if current is not None:
+        current.fields.update(fields)
+        yield current
+        return
+
+    timings = QueryTimings(**fields)
+    token = _current_query.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_query.reset(token)
+        total = timings.elapsed()
+        latency.record("total", total)
+        metrics_logger.info(json.dumps({
+            "event": "query",
+            "timestamp": time.time(),
+            "total_seconds": round(total, 6),
+            "stages": {
+                stage: round(seconds, 6) for stage, seconds in timings.stages.items()
+            },
+            **timings.fields,
+        }))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage on the wall clock.
+
+    Args:
+        name: Name of the pipeline stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def record(name: str, seconds: float) -> None:
+    """Record a stage duration for the current query and the rolling percentiles.
+
+    Args:
+        name: Name of the pipeline stage.
+        seconds: Wall-clock duration in seconds.
+    """
+    latency.record(name, seconds)
+    current = _current_query.get()
+    if current is not None:
+        current.add(name, seconds)
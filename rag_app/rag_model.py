@@ -4,13 +4,27 @@ This module implements the Retrieval-Augmented Generation (RAG) model using
 the Llama3-8B model through Groq's API. It handles document retrieval and
 response generation based on the retrieved context.
 """
+import time
+import random
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
+from langchain.chains.combine_documents.base import (
+    DEFAULT_DOCUMENT_PROMPT,
+    DEFAULT_DOCUMENT_SEPARATOR,
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, format_document
+from langchain_core.vectorstores import VectorStoreRetriever
+from rag_app import metrics
+from rag_app.answer_cache import AnswerCache
+from rag_app.context_budget import ContextBudget
+from rag_app.reranker import CrossEncoderReranker
 from rag_app.config.loader import load_config, setup_logging
 
 # Load configuration and setup logging
@@ -18,6 +32,12 @@ config = load_config()
 setup_logging(config)
 logger = logging.getLogger(__name__)
 
+# Metadata field to accepted values, e.g. {"department": ["Finance"]}
+Filters = Dict[str, List[str]]
+
+# HTTP statuses of LLM API errors worth retrying: rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
 
 class RAGModel:
     """Handles the interaction with the Llama3-8B model through Groq's API.
@@ -30,13 +50,25 @@ class RAGModel:
     Attributes:
         llm: The ChatGroq language model instance
         prompt: The template for generating responses
+        answer_cache: Semantic cache of previous answers, or None if disabled
     """
 
-    def __init__(self, groq_api_key: str) -> None:
+    def __init__(
+        self,
+        groq_api_key: str,
+        embeddings: Optional[Embeddings] = None,
+        llm: Optional[BaseChatModel] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
+    ) -> None:
         """Initialize the RAGModel with the Groq API key.
         
         Args:
             groq_api_key: API key for the Groq service.
+            embeddings: Embeddings model used to match similar questions in the
+                answer cache. The cache is disabled when None.
+            llm: Chat model to use instead of ChatGroq, e.g. a local stub in tests.
+            reranker: Reranker to use instead of the one configured under
+                retrieval.rerank.
             
         Raises:
             ValueError: If the API key is invalid or the model fails to initialize.
@@ -45,32 +77,193 @@ class RAGModel:
         try:
             # Initialize model with configuration
             model_config = config['rag_model']
-            self.llm = ChatGroq(
-                groq_api_key=groq_api_key,
-                model_name=model_config['model_name'],
-                temperature=model_config['temperature'],
-                max_tokens=model_config['max_tokens']
-            )
-            logger.info(f"ChatGroq model initialized with {model_config['model_name']}")
+            if llm is not None:
+                self.llm = llm
+            else:
+                from langchain_groq import ChatGroq
+
+                self.llm = ChatGroq(
+                    groq_api_key=groq_api_key,
+                    model_name=model_config['model_name'],
+                    temperature=model_config['temperature'],
+                    max_tokens=model_config['max_tokens']
+                )
+                logger.info(f"ChatGroq model initialized with {model_config['model_name']}")
             
             # Create prompt template from configuration
             self.prompt = ChatPromptTemplate.from_template(model_config['prompt_template'])
             logger.info("Prompt template created successfully")
+
+            # The answer chain is built once and reused across queries; the
+            # retriever is rebound only when the vector store changes
+            self._lock = threading.Lock()
+            self.answer_chain = self.llm | StrOutputParser()
+            self._bound: Tuple[Any, Any] = (None, None)
+
+            self.answer_cache: Optional[AnswerCache] = None
+            cache_config = model_config.get('answer_cache', {})
+            if embeddings is not None and cache_config.get('enabled'):
+                self.answer_cache = AnswerCache(
+                    embeddings,
+                    similarity_threshold=cache_config['similarity_threshold'],
+                    ttl_seconds=cache_config['ttl_seconds'],
+                    max_entries=cache_config['max_entries'],
+                )
+                logger.info("Answer cache enabled")
+
+            self.context_budget: Optional[ContextBudget] = None
+            context_config = model_config.get('context', {})
+            if context_config.get('enabled'):
+                self.context_budget = ContextBudget(
+                    max_tokens=context_config['max_tokens'],
+                    chars_per_token=context_config['chars_per_token'],
+                    dedup_threshold=context_config['dedup_threshold'],
+                    min_tokens=context_config['min_tokens'],
+                )
+
+            self.reranker = reranker
+            rerank_config = config['retrieval'].get('rerank', {})
+            if reranker is None and rerank_config.get('enabled'):
+                self.reranker = CrossEncoderReranker(
+                    rerank_config['model_name'],
+                    top_n=config['retrieval']['k'],
+                    batch_size=rerank_config['batch_size'],
+                    max_entries=rerank_config['max_entries'],
+                )
         except Exception as e:
             logger.error(f"Error initializing RAGModel: {str(e)}", exc_info=True)
             raise
 
-    def get_response(self, retriever: Any, user_input: str) -> Dict[str, Any]:
+    def set_index_version(self, index_version: Optional[str]) -> None:
+        """Record the current vector store version, invalidating stale cached answers.
+        
+        Args:
+            index_version: Version of the vector store queries will run against.
+        """
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(index_version)
+
+    @property
+    def retriever(self) -> Any:
+        """The bound retriever, returned by retriever_for for its vector store."""
+        return self._bound[1]
+
+    def set_retriever(self, retriever: Any, vectorstore: Any = None) -> None:
+        """Bind the retriever that retriever_for returns for a vector store.
+        
+        The retriever and its vector store are swapped in with a single
+        assignment, so concurrent queries see either the old pair or the new one.
+        
+        Args:
+            retriever: The document retriever to use for context retrieval.
+            vectorstore: The vector store the retriever searches, if any.
+        """
+        logger.info("Binding retriever")
+        self._bound = (vectorstore, retriever)
+
+    def retriever_for(
+        self, vectorstore: Any, build: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """Return the bound retriever for a vector store, creating it on first use.
+        
+        Args:
+            vectorstore: The vector store to retrieve from.
+            build: Creates the retriever for a vector store. Defaults to
+                vectorstore.as_retriever().
+            
+        Returns:
+            The retriever bound to the vector store, or None if it could not be created.
+        """
+        bound_store, retriever = self._bound
+        if bound_store is vectorstore and retriever is not None:
+            return retriever
+        with self._lock:
+            bound_store, retriever = self._bound
+            if bound_store is vectorstore and retriever is not None:
+                return retriever
+            logger.info("Creating retriever from vector store")
+            retriever = build(vectorstore) if build is not None else vectorstore.as_retriever()
+            if retriever is not None:
+                self.set_retriever(retriever, vectorstore)
+            return retriever
+
+    def set_prompt(self, template: str) -> None:
+        """Replace the prompt template used for every subsequent query.
+        
+        Args:
+            template: Prompt template with {context} and {input} placeholders.
+        """
+        self.prompt = ChatPromptTemplate.from_template(template)
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+
+    def stream_response(
+        self, retriever: Any, user_input: str, filters: Optional[Filters] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the response, yielding the retrieved context before the answer tokens.
+        
+        Args:
+            retriever: The document retriever to use for context retrieval.
+            user_input: The user's question or input text.
+            filters: Metadata filters passed to the retriever, e.g. {"department": ["Finance"]}.
+            
+        Yields:
+            Dict[str, Any]: First {"context": [...]} with the retrieved document
+            chunks, then one {"answer": token} per generated token.
+            
+        Raises:
+            Exception: If the model fails to generate a response or if the retriever fails.
+        """
+        logger.info(f"Streaming response for input: {user_input}")
+        try:
+            cached = self._cached_response(user_input, filters)
+            if cached is not None:
+                yield {"context": cached.get("context", [])}
+                yield {"answer": cached["answer"]}
+                return
+
+            context = self._retrieve(retriever, user_input, filters)
+            yield {"context": context}
+            prompt_value = self._build_prompt(user_input, context)
+
+            tokens = []
+            start = time.perf_counter()
+            for token in self.answer_chain.stream(prompt_value):
+                if not tokens:
+                    metrics.record("llm_first_token", time.perf_counter() - start)
+                tokens.append(token)
+                yield {"answer": token}
+            metrics.record("llm", time.perf_counter() - start)
+
+            logger.info("Response streamed successfully")
+            if self.answer_cache is not None and not filters:
+                self.answer_cache.put(
+                    user_input,
+                    {"input": user_input, "context": context, "answer": "".join(tokens)},
+                )
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}", exc_info=True)
+            raise
+
+    def get_response(
+        self, retriever: Any, user_input: str, filters: Optional[Filters] = None
+    ) -> Dict[str, Any]:
         """Get the response from the model using the retriever and user input.
         
         This method:
-        1. Creates a retrieval chain using the provided retriever
-        2. Combines the retrieved documents with the user's question
-        3. Generates a response using the language model
+        1. Returns a cached answer if the same or a very similar question was
+           answered against the current vector store
+        2. Embeds the question and searches the vector store for relevant chunks
+        3. Combines the retrieved documents with the user's question
+        4. Generates a response using the prebuilt answer chain
+        
+        Each stage is timed on the wall clock and recorded in rag_app.metrics.
         
         Args:
             retriever: The document retriever to use for context retrieval.
             user_input: The user's question or input text.
+            filters: Metadata filters passed to the retriever, e.g. {"department": ["Finance"]}.
+                Filtered answers are not cached.
             
         Returns:
             Dict[str, Any]: A dictionary containing:
@@ -82,21 +275,326 @@ class RAGModel:
         """
         logger.info(f"Getting response for input: {user_input}")
         try:
-            logger.info("Creating retrieval chain")
-            chain = create_retrieval_chain(
-                retriever, create_stuff_documents_chain(self.llm, self.prompt)
-            )
+            with metrics.track_query():
+                cached = self._cached_response(user_input, filters)
+                if cached is not None:
+                    return cached
+
+                context = self._retrieve(retriever, user_input, filters)
+                prompt_value = self._build_prompt(user_input, context)
+
+                logger.info("Invoking answer chain")
+                with metrics.stage("llm"):
+                    answer = self.answer_chain.invoke(prompt_value)
+                response = {"input": user_input, "context": context, "answer": answer}
+
+            logger.info("Response generated successfully")
+            if self.answer_cache is not None and not filters:
+                self.answer_cache.put(user_input, response)
+            return response
+
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}", exc_info=True)
+            raise
+
+    async def aget_response(
+        self, retriever: Any, user_input: str, filters: Optional[Filters] = None
+    ) -> Dict[str, Any]:
+        """Asynchronous get_response for use from an event loop.
+        
+        The answer cache lookup and the retrieval run in the default thread pool
+        so embedding and FAISS search never block the loop; the LLM is called
+        with ainvoke.
+        
+        Args:
+            retriever: The document retriever to use for context retrieval.
+            user_input: The user's question or input text.
+            filters: Metadata filters passed to the retriever.
             
-            logger.info("Invoking chain with user input")
-            response = chain.invoke({"input": user_input})
+        Returns:
+            Dict[str, Any]: A dictionary with "input", "context" and "answer".
             
-            if not response or "answer" not in response:
-                logger.error("Invalid response format from model")
-                raise ValueError("Invalid response format from model")
-                
+        Raises:
+            Exception: If the model fails to generate a response or if the retriever fails.
+        """
+        logger.info(f"Getting async response for input: {user_input}")
+        try:
+            with metrics.track_query():
+                cached = await asyncio.to_thread(self._cached_response, user_input, filters)
+                if cached is not None:
+                    return cached
+
+                context = await asyncio.to_thread(self._retrieve, retriever, user_input, filters)
+                prompt_value = self._build_prompt(user_input, context)
+
+                with metrics.stage("llm"):
+                    answer = await self.answer_chain.ainvoke(prompt_value)
+                response = {"input": user_input, "context": context, "answer": answer}
+
             logger.info("Response generated successfully")
+            if self.answer_cache is not None and not filters:
+                await asyncio.to_thread(self.answer_cache.put, user_input, response)
             return response
-            
+
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}", exc_info=True)
             raise
+
+    async def abatch_responses(
+        self,
+        retriever: Any,
+        questions: Sequence[str],
+        filters: Optional[Sequence[Optional[Filters]]] = None,
+        concurrency: Optional[int] = None,
+        on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Answer many questions, with concurrent LLM calls.
+
+        Cached answers are reused, the remaining questions are retrieved in one
+        batch (one embedding call and one vector search over all of them where
+        the retriever supports it), and the LLM is called for up to concurrency
+        questions at once. Rate-limited and failed calls are retried with
+        exponential backoff; a question that still fails gets an "error"
+        instead of failing the whole batch.
+
+        Args:
+            retriever: The document retriever to use for context retrieval.
+            questions: The questions to answer.
+            filters: Metadata filters per question, aligned with questions.
+            concurrency: Maximum number of LLM calls in flight.
+                Defaults to rag_model.batch.concurrency.
+            on_result: Called with the position and the response of each
+                question as soon as it is answered, e.g. to stream results out.
+
+        Returns:
+            List[Dict[str, Any]]: One response per question, in order, with
+            "input", "context" and "answer", or "input" and "error".
+
+        Raises:
+            Exception: If the retriever fails.
+        """
+        batch_config = config['rag_model'].get('batch', {})
+        concurrency = concurrency or batch_config.get('concurrency', 8)
+        filters = [f or None for f in filters] if filters is not None else [None] * len(questions)
+        logger.info(f"Answering {len(questions)} questions with {concurrency} concurrent LLM calls")
+        results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+
+        def finish(i: int, response: Dict[str, Any]) -> None:
+            results[i] = response
+            if on_result is not None:
+                on_result(i, response)
+
+        try:
+            cached = await asyncio.to_thread(
+                lambda: [self._cached_response(q, f) for q, f in zip(questions, filters)]
+            )
+            pending = [i for i, response in enumerate(cached) if response is None]
+            contexts = await asyncio.to_thread(
+                self._retrieve_batch,
+                retriever,
+                [questions[i] for i in pending],
+                [filters[i] for i in pending],
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving batch: {str(e)}", exc_info=True)
+            raise
+        for i, response in enumerate(cached):
+            if response is not None:
+                finish(i, response)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def answer(i: int, context: List[Document]) -> None:
+            async with semaphore:
+                try:
+                    with metrics.track_query(source="batch"):
+                        prompt_value = self._build_prompt(questions[i], context)
+                        with metrics.stage("llm"):
+                            text = await self._ainvoke_with_retry(prompt_value, batch_config)
+                    response = {"input": questions[i], "context": context, "answer": text}
+                    if self.answer_cache is not None and not filters[i]:
+                        await asyncio.to_thread(self.answer_cache.put, questions[i], response)
+                except Exception as e:
+                    logger.error(f"Error answering {questions[i]!r}: {str(e)}")
+                    response = {"input": questions[i], "error": str(e)}
+            finish(i, response)
+
+        await asyncio.gather(*(answer(i, context) for i, context in zip(pending, contexts)))
+        logger.info("Batch answered")
+        return results
+
+    def batch_responses(
+        self,
+        retriever: Any,
+        questions: Sequence[str],
+        filters: Optional[Sequence[Optional[Filters]]] = None,
+        concurrency: Optional[int] = None,
+        on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Synchronous abatch_responses for scripts; must not be called from an event loop."""
+        return asyncio.run(
+            self.abatch_responses(retriever, questions, filters, concurrency, on_result)
+        )
+
+    def _cached_response(
+        self, user_input: str, filters: Optional[Filters] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Look the question up in the answer cache, if enabled and unfiltered."""
+        if self.answer_cache is None or filters:
+            return None
+        with metrics.stage("answer_cache"):
+            return self.answer_cache.get(user_input)
+
+    def _retrieve(
+        self, retriever: Any, user_input: str, filters: Optional[Filters] = None
+    ) -> List[Document]:
+        """Retrieve the chunks relevant to a question and fit them into the context budget.
+        
+        With a reranker, the retrieved candidates are reordered by the
+        cross-encoder and only the best are kept. Overlapping chunks are
+        merged, near-duplicates dropped and the rest trimmed to
+        rag_model.context.max_tokens before they reach the prompt.
+        
+        Args:
+            retriever: The document retriever to use for context retrieval.
+            user_input: The user's question or input text.
+            filters: Metadata filters passed to the retriever.
+            
+        Returns:
+            The document chunks to place in the prompt.
+        """
+        docs = self._search(retriever, user_input, filters)
+        if self.reranker is not None:
+            with metrics.stage("rerank"):
+                docs = self.reranker.rerank(user_input, docs)
+        if self.context_budget is None:
+            return docs
+        with metrics.stage("context_packing"):
+            return self.context_budget.pack(docs)
+
+    def _retrieve_batch(
+        self, retriever: Any, questions: Sequence[str], filters: Sequence[Optional[Filters]]
+    ) -> List[List[Document]]:
+        """Retrieve and pack the context of many questions.
+
+        Retrievers with batch_retrieve (HybridRetriever) embed and search all
+        questions at once; others are run question by question.
+
+        Args:
+            retriever: The document retriever to use for context retrieval.
+            questions: The questions.
+            filters: Metadata filters per question.
+
+        Returns:
+            The document chunks to place in the prompt of each question.
+        """
+        if not questions:
+            return []
+        if hasattr(retriever, "batch_retrieve"):
+            batches = retriever.batch_retrieve(questions, filters)
+        else:
+            batches = [self._search(retriever, q, f) for q, f in zip(questions, filters)]
+        if self.reranker is not None:
+            with metrics.stage("rerank"):
+                batches = [self.reranker.rerank(q, docs) for q, docs in zip(questions, batches)]
+        if self.context_budget is None:
+            return batches
+        with metrics.stage("context_packing"):
+            return [self.context_budget.pack(docs) for docs in batches]
+
+    async def _ainvoke_with_retry(self, prompt_value: Any, batch_config: Dict[str, Any]) -> str:
+        """Call the LLM, retrying rate limits and transient errors with exponential backoff.
+
+        Args:
+            prompt_value: The prompt to send.
+            batch_config: The rag_model.batch configuration.
+
+        Returns:
+            The generated answer.
+
+        Raises:
+            Exception: The last error, once it is not retryable or retries are exhausted.
+        """
+        max_retries = batch_config.get('max_retries', 5)
+        for attempt in range(max_retries + 1):
+            try:
+                return await self.answer_chain.ainvoke(prompt_value)
+            except Exception as e:
+                if attempt == max_retries or not _is_retryable(e):
+                    raise
+                delay = _retry_delay(
+                    e,
+                    attempt,
+                    batch_config.get('backoff_seconds', 1.0),
+                    batch_config.get('max_backoff_seconds', 30.0),
+                )
+                logger.warning(f"LLM call failed ({str(e)}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def _search(
+        self, retriever: Any, user_input: str, filters: Optional[Filters] = None
+    ) -> List[Document]:
+        """Run the retriever for a question.
+        
+        For plain similarity retrievers over a vector store, query embedding and
+        vector search are run and timed as separate stages.
+        
+        Args:
+            retriever: The document retriever to use for context retrieval.
+            user_input: The user's question or input text.
+            filters: Metadata filters passed to the retriever.
+            
+        Returns:
+            The retrieved document chunks.
+        """
+        if filters:
+            with metrics.stage("retrieval"):
+                return retriever.invoke(user_input, filters=filters)
+
+        vectorstore = getattr(retriever, "vectorstore", None)
+        embeddings = getattr(vectorstore, "embeddings", None)
+        if (
+            isinstance(retriever, VectorStoreRetriever)
+            and retriever.search_type == "similarity"
+            and embeddings is not None
+        ):
+            with metrics.stage("query_embedding"):
+                vector = embeddings.embed_query(user_input)
+            with metrics.stage("vector_search"):
+                return vectorstore.similarity_search_by_vector(vector, **retriever.search_kwargs)
+
+        with metrics.stage("retrieval"):
+            return retriever.invoke(user_input)
+
+    def _build_prompt(self, user_input: str, context: List[Document]) -> Any:
+        """Stuff the retrieved chunks and the question into the prompt template."""
+        with metrics.stage("prompt_assembly"):
+            return self.prompt.invoke({
+                "input": user_input,
+                "context": DEFAULT_DOCUMENT_SEPARATOR.join(
+                    format_document(doc, DEFAULT_DOCUMENT_PROMPT) for doc in context
+                ),
+            })
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether an LLM API error is a rate limit, server error, timeout or dropped connection."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    name = type(error).__name__
+    return isinstance(error, (TimeoutError, ConnectionError)) or "Timeout" in name or "Connection" in name
+
+
+def _retry_delay(error: Exception, attempt: int, backoff: float, max_backoff: float) -> float:
+    """Seconds to wait before a retry.
+
+    The server's Retry-After header is honoured when present; otherwise the
+    delay doubles per attempt, with jitter so concurrent calls spread out.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return min(float(headers.get("retry-after")), max_backoff)
+    except (TypeError, ValueError):
+        delay = min(backoff * 2 ** attempt, max_backoff)
+        return delay * random.uniform(0.5, 1.0)
@@ -0,0 +1,146 @@
+"""Cross-encoder reranking for the RAG system.
+
+Bi-encoder similarity ranks chunks by comparing two independently computed
+vectors, which is cheap but coarse. A cross-encoder reads the question and a
+chunk together and scores their relevance far more precisely, at the cost of
+one model pass per pair. The retriever therefore fetches a wide candidate set
+cheaply and the reranker scores it in one batch on the CPU, so only the few
+best chunks reach the prompt and k can stay small.
+
+Scores are cached per question and chunk text, so repeated and batched
+questions over the same chunks skip the model.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from rag_app.config.loader import load_config, setup_logging
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Reorders retrieved chunks by cross-encoder relevance and keeps the best.
+
+    Attributes:
+        model: The CrossEncoder, or any object with the same predict method
+        top_n: Number of chunks kept
+        batch_size: Question-chunk pairs scored per forward pass
+        max_entries: Maximum number of cached scores
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        top_n: int = 4,
+        batch_size: int = 32,
+        max_entries: int = 10000,
+        model: Optional[Any] = None,
+    ) -> None:
+        """Initialize the reranker.
+
+        Args:
+            model_name: Name of the sentence-transformers cross-encoder.
+            top_n: Number of chunks kept after reranking.
+            batch_size: Question-chunk pairs scored per forward pass.
+            max_entries: Maximum number of cached scores.
+            model: Model to use instead of loading model_name, e.g. a stub in tests.
+
+        Raises:
+            ValueError: If neither a model name nor a model is given.
+        """
+        if model is None:
+            if not model_name:
+                raise ValueError("A cross-encoder model name or model is required")
+            from sentence_transformers import CrossEncoder
+
+            logger.info(f"Loading cross-encoder {model_name}")
+            model = CrossEncoder(model_name, device="cpu")
+        self.model = model
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._scores: "OrderedDict[Tuple[str, bytes], float]" = OrderedDict()
+
+    def rerank(self, query: str, docs: List[Document]) -> List[Document]:
+        """Return the top_n chunks by cross-encoder score, best first.
+
+        Uncached pairs are scored in a single predict call.
+
+        Args:
+            query: The user's question.
+            docs: Candidate chunks from the retriever.
+
+        Returns:
+            Up to top_n of the chunks.
+        """
+        if not docs:
+            return []
+        keys = [(query, _text_key(doc.page_content)) for doc in docs]
+        scores: List[Optional[float]] = [None] * len(docs)
+        with self._lock:
+            for i, key in enumerate(keys):
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                    scores[i] = score
+            missing = [i for i, score in enumerate(scores) if score is None]
+            self.hits += len(docs) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            # Predict outside the lock so concurrent queries are not serialized
+            predicted = self.model.predict(
+                [(query, docs[i].page_content) for i in missing],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+            with self._lock:
+                for i, score in zip(missing, predicted):
+                    scores[i] = float(score)
+                    self._scores[keys[i]] = scores[i]
+                while len(self._scores) > self.max_entries:
+                    self._scores.popitem(last=False)
+
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [docs[i] for i in order[:self.top_n]]
+
+    def stats(self) -> Dict[str, int]:
+        """Return the score cache hit and miss counts and its size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._scores),
+            }
+
+
+def candidates(k: int) -> int:
+    """Number of chunks the retriever should return when reranking is enabled.
+
+    Args:
+        k: Number of chunks passed to the LLM without reranking.
+
+    Returns:
+        retrieval.rerank.candidates if reranking is enabled, otherwise k.
+    """
+    rerank_config = config['retrieval'].get('rerank', {})
+    if not rerank_config.get('enabled'):
+        return k
+    return max(k, rerank_config['candidates'])
+
+
+def _text_key(text: str) -> bytes:
+    """Digest identifying a chunk by its text, so edited chunks are scored again."""
+    return hashlib.sha1(text.encode("utf-8")).digest()
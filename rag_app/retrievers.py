@@ -0,0 +1,372 @@
+"""Retrieval components for the RAG system.
+
+This module implements an in-process BM25 inverted index over the indexed
+chunks and a hybrid retriever that fuses BM25 and vector search rankings with
+weighted reciprocal rank fusion. Exact terms such as job titles, certifications
+and tool names are matched lexically, so fewer chunks are needed per answer.
+"""
+import re
+import math
+import logging
+from collections import Counter
+from heapq import nlargest
+from typing import (
+    Any, Container, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+)
+
+import faiss
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from rag_app import index_factory, metrics
+from rag_app.config.loader import load_config, setup_logging
+from rag_app.embedding_cache import embed_queries
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase terms, keeping tokens like "c++" and "c#" intact."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index scoring chunks with Okapi BM25.
+
+    Postings are kept per term as {chunk ID: term frequency}, so chunks can be
+    added and removed incrementally alongside the vector store.
+
+    Attributes:
+        k1: Term frequency saturation parameter
+        b: Document length normalization parameter
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        """Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation parameter.
+            b: Document length normalization parameter.
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index a chunk, replacing any previous version with the same ID.
+
+        Args:
+            doc_id: Chunk ID shared with the vector store.
+            text: Chunk text.
+        """
+        if doc_id in self.doc_lengths:
+            self.remove([doc_id])
+        terms = Counter(tokenize(text))
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def copy(self) -> "BM25Index":
+        """Return an independent copy, so updates leave searches on this one alone."""
+        clone = BM25Index(self.k1, self.b)
+        clone.postings = {
+            term: dict(postings) for term, postings in self.postings.items()
+        }
+        clone.doc_lengths = dict(self.doc_lengths)
+        clone.total_length = self.total_length
+        return clone
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        """Remove chunks from the index.
+
+        Args:
+            doc_ids: IDs of the chunks to remove; unknown IDs are ignored.
+        """
+        removed = {doc_id for doc_id in doc_ids if doc_id in self.doc_lengths}
+        if not removed:
+            return
+        for term in list(self.postings):
+            postings = self.postings[term]
+            for doc_id in removed & postings.keys():
+                del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+        for doc_id in removed:
+            self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(
+        self, query: str, k: int, allowed: Optional[Container[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Return the k highest-scoring chunk IDs for a query.
+
+        Args:
+            query: Query text.
+            k: Number of results.
+            allowed: If given, only these chunk IDs are scored.
+
+        Returns:
+            List of (chunk ID, BM25 score) pairs, best first.
+        """
+        if not self.doc_lengths:
+            return []
+        n_docs = len(self.doc_lengths)
+        avg_length = self.total_length / n_docs
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                length = self.doc_lengths[doc_id] / avg_length
+                norm = self.k1 * (1 - self.b + self.b * length)
+                score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        return nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses vector similarity and BM25 rankings with reciprocal rank fusion.
+
+    Each ranking contributes weight / (rrf_k + rank) to a chunk's fused score.
+    Metadata filters passed as retriever.invoke(question, filters={...})
+    restrict both searches to the matching documents' chunks before scoring.
+    Roles detected in the question only boost their documents: both searches
+    also run restricted to those documents and all four rankings are fused,
+    so a role the detection missed, e.g. in "compare the HR manager and the
+    marketing coordinator", still reaches the context.
+
+    Attributes:
+        vectorstore: FAISS vector store holding the chunk embeddings
+        bm25: BM25 index over the same chunk IDs, or None for vector search only
+        metadata_table: Metadata table of the indexed documents, or None to disable
+            filtering
+        auto_filter: Whether to boost the documents of roles named in the question
+        k: Number of chunks returned
+        fetch_k: Number of candidates taken from each ranking
+        rrf_k: Rank offset of reciprocal rank fusion
+        vector_weight: Weight of the vector ranking
+        bm25_weight: Weight of the BM25 ranking
+    """
+
+    vectorstore: Any
+    bm25: Any = None
+    metadata_table: Any = None
+    auto_filter: bool = True
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    vector_weight: float = 1.0
+    bm25_weight: float = 1.0
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        filters: Optional[Mapping[str, Sequence[str]]] = None,
+    ) -> List[Document]:
+        """Return the k chunks with the highest fused score.
+
+        Args:
+            query: The user's question.
+            run_manager: Callback manager of the retriever run.
+            filters: Metadata field to accepted values, e.g.
+                {"department": ["Finance"]}.
+
+        Returns:
+            The best chunks, best first.
+        """
+        positions = self._candidate_positions(filters)
+        if positions is not None and len(positions) == 0:
+            return []
+        searches = [positions]
+        boosted = self._detected_positions(query, filters)
+        if boosted is not None:
+            searches.append(boosted)
+
+        with metrics.stage("query_embedding"):
+            vector = self.vectorstore.embeddings.embed_query(query)
+        vectors = np.array([vector] * len(searches), dtype=np.float32)
+        with metrics.stage("vector_search"):
+            vector_ids = self._vector_search(vectors, searches)
+        bm25_ids = [self._bm25_search(query, allowed) for allowed in searches]
+        with metrics.stage("rank_fusion"):
+            return self._fuse(vector_ids, bm25_ids)
+
+    def batch_retrieve(
+        self,
+        queries: Sequence[str],
+        filters: Optional[Sequence[Optional[Mapping[str, Sequence[str]]]]] = None,
+    ) -> List[List[Document]]:
+        """Retrieve the chunks of many questions at once.
+
+        All questions are embedded through the query path, in one call where
+        the embeddings model supports it. The unfiltered questions are searched
+        in one FAISS call over their query matrix, and questions restricted to
+        the same chunks, e.g. to the same document, share one call as well.
+
+        Args:
+            queries: The questions.
+            filters: Metadata filters per question, aligned with queries; None
+                entries are detected from the question like in invoke().
+
+        Returns:
+            The best chunks of every question, in the order of queries.
+        """
+        filters = filters if filters is not None else [None] * len(queries)
+        positions = [self._candidate_positions(f) for f in filters]
+        rows = [i for i, p in enumerate(positions) if p is None or len(p)]
+        results: List[List[Document]] = [[] for _ in queries]
+        if not rows:
+            return results
+
+        # One search per question, plus one restricted to its detected roles
+        searches = [(i, positions[i]) for i in rows]
+        for i in rows:
+            boosted = self._detected_positions(queries[i], filters[i])
+            if boosted is not None:
+                searches.append((i, boosted))
+
+        with metrics.stage("query_embedding"):
+            vectors = np.asarray(
+                embed_queries(
+                    self.vectorstore.embeddings, [queries[i] for i in rows]
+                ),
+                dtype=np.float32,
+            )
+        vector_rows = {i: row for row, i in enumerate(rows)}
+        with metrics.stage("vector_search"):
+            found = self._vector_search(
+                vectors[[vector_rows[i] for i, _ in searches]],
+                [allowed for _, allowed in searches],
+            )
+        vector_ids: Dict[int, List[List[str]]] = {i: [] for i in rows}
+        bm25_ids: Dict[int, List[List[str]]] = {i: [] for i in rows}
+        for (i, allowed), ids in zip(searches, found):
+            vector_ids[i].append(ids)
+            bm25_ids[i].append(self._bm25_search(queries[i], allowed))
+        for i in rows:
+            with metrics.stage("rank_fusion"):
+                results[i] = self._fuse(vector_ids[i], bm25_ids[i])
+        return results
+
+    def _candidate_positions(
+        self, filters: Optional[Mapping[str, Sequence[str]]]
+    ) -> Optional[np.ndarray]:
+        """FAISS positions allowed by explicit filters, or None for all."""
+        if self.metadata_table is None or not filters:
+            return None
+        with metrics.stage("metadata_filter"):
+            positions = self.metadata_table.positions(filters)
+            logger.info(f"Filtering retrieval by {filters}: {len(positions)} chunks")
+            return positions
+
+    def _detected_positions(
+        self, query: str, filters: Optional[Mapping[str, Sequence[str]]]
+    ) -> Optional[np.ndarray]:
+        """FAISS positions of the roles named in a question without filters, or None.
+
+        These positions are searched in addition to the whole index, never
+        instead of it, since the question may also be about roles the
+        detection did not recognize.
+        """
+        if self.metadata_table is None or filters is not None or not self.auto_filter:
+            return None
+        with metrics.stage("metadata_filter"):
+            detected = self.metadata_table.detect_filters(query)
+            if not detected:
+                return None
+            positions = self.metadata_table.positions(detected)
+            logger.info(f"Boosting retrieval for {detected}: {len(positions)} chunks")
+            return positions if len(positions) else None
+
+    def _vector_search(
+        self, vectors: np.ndarray, positions: Sequence[Optional[np.ndarray]]
+    ) -> List[List[str]]:
+        """Return the IDs of the fetch_k nearest chunks of every query vector.
+
+        Unrestricted queries are searched together in one call, and so are
+        queries restricted to the same positions.
+
+        Args:
+            vectors: Float32 array of shape (n, d).
+            positions: Allowed positions per query, or None for all.
+
+        Returns:
+            Chunk IDs per query, nearest first.
+        """
+        if self.vectorstore._normalize_L2:
+            vectors = vectors.copy()
+            faiss.normalize_L2(vectors)
+        found: List[Optional[np.ndarray]] = [None] * len(vectors)
+        unrestricted = [i for i, p in enumerate(positions) if p is None]
+        if unrestricted:
+            _, hits = self.vectorstore.index.search(vectors[unrestricted], self.fetch_k)
+            for i, row in zip(unrestricted, hits):
+                found[i] = row
+        groups: Dict[bytes, List[int]] = {}
+        for i, allowed in enumerate(positions):
+            if allowed is not None:
+                groups.setdefault(allowed.tobytes(), []).append(i)
+        for group in groups.values():
+            allowed = positions[group[0]]
+            _, hits = index_factory.search_subset(
+                self.vectorstore.index, vectors[group],
+                min(self.fetch_k, len(allowed)), allowed,
+            )
+            for i, row in zip(group, hits):
+                found[i] = row
+        id_map = self.vectorstore.index_to_docstore_id
+        return [[id_map[int(p)] for p in row if p != -1] for row in found]
+
+    def _bm25_search(self, query: str, positions: Optional[np.ndarray]) -> List[str]:
+        """Return the IDs of the fetch_k best BM25 chunks, within positions if given."""
+        if self.bm25 is None:
+            return []
+        with metrics.stage("bm25_search"):
+            allowed = None
+            if positions is not None:
+                id_map = self.vectorstore.index_to_docstore_id
+                allowed = {id_map[int(p)] for p in positions}
+            ranked = self.bm25.search(query, self.fetch_k, allowed=allowed)
+            return [doc_id for doc_id, _ in ranked]
+
+    def _fuse(
+        self, vector_ids: List[List[str]], bm25_ids: List[List[str]]
+    ) -> List[Document]:
+        """Fuse vector and BM25 rankings and load only the k winning chunks."""
+        scores: Dict[str, float] = {}
+        rankings = [(self.vector_weight, ranking) for ranking in vector_ids]
+        rankings += [(self.bm25_weight, ranking) for ranking in bm25_ids]
+        for weight, ranking in rankings:
+            for rank, doc_id in enumerate(ranking):
+                score = weight / (self.rrf_k + rank + 1)
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        results = []
+        for doc_id, _ in nlargest(self.k, scores.items(), key=lambda item: item[1]):
+            doc = self._lookup(doc_id)
+            if doc is not None:
+                results.append(doc)
+        return results
+
+    def _lookup(self, doc_id: str) -> Optional[Document]:
+        """Fetch a chunk from the vector store's docstore by ID."""
+        doc = self.vectorstore.docstore.search(doc_id)
+        return doc if isinstance(doc, Document) else None
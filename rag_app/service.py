@@ -0,0 +1,228 @@
+"""Asynchronous HTTP query service for the RAG system.
+
+This module exposes the RAG pipeline to other internal tools over HTTP. It
+reuses the DocumentProcessor index and the RAGModel of the Streamlit app, runs
+retrieval in a thread pool, calls the LLM with ainvoke, and bounds the number of
+concurrent and queued requests so overload is answered with a fast 429. The
+service starts listening while the index is still being built; until it is
+ready, /health and /query answer 503.
+
+Run it with:
+    uvicorn --factory rag_app.service:create_app --host 0.0.0.0 --port 8000
+"""
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from rag_app import metrics
+from rag_app.config.loader import load_config, setup_logging
+from rag_app.document_processor import DocumentProcessor
+from rag_app.metadata import FIELDS
+from rag_app.rag_model import RAGModel
+from rag_app.watcher import IndexWatcher, start_if_enabled
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+
+class QueryRequest(BaseModel):
+    """Body of a query request."""
+
+    question: str
+    # Metadata field to accepted values, e.g. {"department": ["Finance"]}
+    filters: Optional[Dict[str, List[str]]] = None
+
+
+class QueryResponse(BaseModel):
+    """Body of a query response."""
+
+    answer: str
+    context: List[Dict[str, Any]]
+    index_version: Optional[str]
+    latency_seconds: float
+
+
+class ConcurrencyLimiter:
+    """Admission control: a concurrency semaphore with a bounded wait queue.
+
+    Attributes:
+        max_concurrency: Maximum number of requests processed at once
+        max_queue: Maximum number of requests waiting for a slot
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int) -> None:
+        """Initialize the limiter.
+
+        Args:
+            max_concurrency: Maximum number of requests processed at once.
+            max_queue: Maximum number of requests waiting for a slot.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a processing slot for the duration of a request.
+
+        Raises:
+            HTTPException: 429 if the wait queue is already full.
+        """
+        if self.in_flight >= self.max_concurrency and self.waiting >= self.max_queue:
+            raise HTTPException(
+                status_code=429, detail="Too many requests, retry later"
+            )
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+def create_app(
+    processor: Optional[Any] = None,
+    model: Optional[RAGModel] = None,
+    max_concurrency: Optional[int] = None,
+    max_queue: Optional[int] = None,
+) -> FastAPI:
+    """Create the FastAPI application.
+
+    Args:
+        processor: DocumentProcessor holding the index. Built from the
+            configuration when None, and indexed in the background at startup
+            if it has no index yet.
+        model: RAGModel used to answer questions. Built with GROQ_API_KEY
+            when None.
+        max_concurrency: Maximum number of queries processed at once.
+            Defaults to service.max_concurrency.
+        max_queue: Maximum number of queries waiting for a slot before new ones
+            are rejected with 429. Defaults to service.max_queue.
+
+    Returns:
+        The configured FastAPI application.
+
+    Raises:
+        ValueError: If no model is given and GROQ_API_KEY is not set.
+    """
+    service_config = config.get('service', {})
+    if processor is None:
+        processor = DocumentProcessor()
+    if model is None:
+        load_dotenv()
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            logger.error("GROQ_API_KEY is not set in environment variables")
+            raise ValueError("GROQ_API_KEY is not set in the environment variables.")
+        model = RAGModel(api_key, embeddings=processor.embeddings)
+
+    limiter = ConcurrencyLimiter(
+        max_concurrency if max_concurrency is not None
+        else service_config.get('max_concurrency', 8),
+        max_queue if max_queue is not None else service_config.get('max_queue', 32),
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # Serve /health while the index loads instead of blocking startup
+        app.state.preparing = asyncio.create_task(_prepare_index(processor))
+        yield
+        app.state.preparing.cancel()
+        try:
+            watcher = await app.state.preparing
+        except (asyncio.CancelledError, Exception):
+            watcher = None
+        if watcher is not None:
+            watcher.stop()
+
+    app = FastAPI(title=config['app']['title'], lifespan=lifespan)
+    app.state.processor = processor
+    app.state.model = model
+    app.state.limiter = limiter
+    app.state.preparing = None
+
+    @app.get("/health")
+    async def health() -> JSONResponse:
+        ready = processor.vectorstore is not None
+        preparing = app.state.preparing
+        failed = (
+            not ready and preparing is not None and preparing.done()
+            and not preparing.cancelled() and preparing.exception() is not None
+        )
+        return JSONResponse(
+            status_code=200 if ready else 503,
+            content={
+                "status": "ok" if ready else "failed" if failed else "loading",
+                "index_version": processor.index_version,
+                "in_flight": limiter.in_flight,
+                "queued": limiter.waiting,
+                "latency": metrics.latency.summary(),
+            },
+        )
+
+    @app.post("/query", response_model=QueryResponse)
+    async def query(request: QueryRequest) -> QueryResponse:
+        async with limiter.slot():
+            vectorstore = processor.vectorstore
+            if vectorstore is None:
+                raise HTTPException(status_code=503, detail="Index is not ready yet")
+            unknown = set(request.filters or {}) - set(FIELDS)
+            if unknown:
+                raise HTTPException(
+                    status_code=400, detail=f"Unknown filter fields: {sorted(unknown)}"
+                )
+            model.set_index_version(processor.index_version)
+            retriever = model.retriever_for(vectorstore, processor.get_retriever)
+            with metrics.track_query(source="service") as timings:
+                response = await model.aget_response(
+                    retriever, request.question, filters=request.filters
+                )
+            return QueryResponse(
+                answer=response["answer"],
+                context=[
+                    {"page_content": doc.page_content, "metadata": doc.metadata}
+                    for doc in response.get("context", [])
+                ],
+                index_version=processor.index_version,
+                latency_seconds=timings.elapsed(),
+            )
+
+    return app
+
+
+async def _prepare_index(processor: Any) -> Optional[IndexWatcher]:
+    """Build the index if the processor has none, then start the watcher if enabled.
+
+    Args:
+        processor: DocumentProcessor holding the index.
+
+    Returns:
+        The running watcher, or None if watching is disabled.
+
+    Raises:
+        Exception: If building the index fails; /health then reports "failed".
+    """
+    if processor.vectorstore is None:
+        logger.info("Building index in the background; queries wait for it")
+        try:
+            await asyncio.to_thread(processor.update_index)
+        except Exception as e:
+            logger.error(f"Error building index: {str(e)}", exc_info=True)
+            raise
+    return start_if_enabled(processor)
@@ -0,0 +1,136 @@
+"""Background start-up for the RAG system.
+
+This module loads the expensive resources (torch, the embedding model, the
+persisted index and the LLM client libraries) in a background thread, so the
+Streamlit UI can render before they are ready. It deliberately imports none
+of them at module level.
+"""
+import os
+import logging
+import threading
+import warnings
+from typing import TYPE_CHECKING, Callable, Optional
+
+from rag_app.config.loader import load_config, setup_logging
+
+if TYPE_CHECKING:
+    from rag_app.document_processor import DocumentProcessor
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+
+def _default_processor() -> "DocumentProcessor":
+    """Import torch and the processor, then build it with the persisted index."""
+    import torch
+
+    # Streamlit's file watcher walks torch.classes, which raises on __path__
+    torch.classes.__path__ = []
+    warnings.filterwarnings("ignore", message=".*torch.classes.*_path.*")
+
+    from rag_app.document_processor import DocumentProcessor
+    from rag_app.watcher import start_if_enabled
+
+    processor = DocumentProcessor()
+    processor.load_persisted_index()
+    # Keep the index up to date in the background when document.watch is enabled
+    start_if_enabled(processor)
+    # Warm the model module too; importing the LLM client stack takes seconds
+    import rag_app.rag_model  # noqa: F401
+    return processor
+
+
+class ResourceLoader:
+    """Builds the DocumentProcessor in a background thread.
+
+    Attributes:
+        processor: The loaded processor, None until loading succeeded
+        error: The exception raised while loading, if any
+    """
+
+    def __init__(
+        self, factory: Optional[Callable[[], "DocumentProcessor"]] = None
+    ) -> None:
+        """Initialize the loader without starting it.
+
+        Args:
+            factory: Builds the processor. Defaults to a DocumentProcessor with
+                the configured embedding model and its persisted index loaded.
+        """
+        self.factory = factory or _default_processor
+        self.processor: Optional["DocumentProcessor"] = None
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> "ResourceLoader":
+        """Start loading, unless already started.
+
+        Returns:
+            The loader itself.
+        """
+        with self._lock:
+            if self._thread is None:
+                embeddings_config = config['document'].get('embeddings', {})
+                parallel = embeddings_config.get('tokenizers_parallelism', True)
+                os.environ.setdefault(
+                    "TOKENIZERS_PARALLELISM", "true" if parallel else "false"
+                )
+                self._thread = threading.Thread(
+                    target=self._run, name="rag-resource-loader", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    @property
+    def status(self) -> str:
+        """Loading state: "loading", "ready" or "failed"."""
+        if not self._done.is_set():
+            return "loading"
+        return "failed" if self.error is not None else "ready"
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Block until loading finished, successfully or not.
+
+        Args:
+            timeout: Maximum number of seconds to wait; None waits indefinitely.
+
+        Returns:
+            True if loading finished within the timeout.
+        """
+        self.start()
+        return self._done.wait(timeout)
+
+    def wait(self, timeout: Optional[float] = None) -> "DocumentProcessor":
+        """Block until loading finished and return the processor.
+
+        Args:
+            timeout: Maximum number of seconds to wait; None waits indefinitely.
+
+        Returns:
+            The loaded DocumentProcessor.
+
+        Raises:
+            TimeoutError: If loading did not finish within the timeout.
+            Exception: The error raised while loading.
+        """
+        if not self.join(timeout):
+            raise TimeoutError("Resources are still loading")
+        if self.error is not None:
+            raise self.error
+        return self.processor
+
+    def _run(self) -> None:
+        """Build the processor and record the outcome."""
+        logger.info("Loading embedding model and index in the background")
+        try:
+            self.processor = self.factory()
+            logger.info("Embedding model and index loaded")
+        except Exception as e:
+            logger.error(f"Error loading resources: {str(e)}", exc_info=True)
+            self.error = e
+        finally:
+            self._done.set()
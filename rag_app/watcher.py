@@ -0,0 +1,215 @@
+"""Background index updates for the RAG system.
+
+IndexWatcher polls the document directory and brings the index up to date
+off the request path whenever PDFs are added, modified or deleted, so nobody
+has to click "Document Embeddings" and no session blocks while embedding.
+DocumentProcessor.update_index applies each update to a copy of the index and
+swaps it in when done, so queries keep running against the previous version.
+
+A burst of file changes, e.g. copying a folder of PDFs, triggers a single
+update once the directory has been quiet for the debounce period. Updates run
+with fewer torch threads and pause between embedded batches, so a rebuild
+leaves CPU for the queries served meanwhile.
+"""
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+from rag_app.config.loader import load_config, setup_logging
+
+if TYPE_CHECKING:
+    from rag_app.document_processor import DocumentProcessor
+
+# Load configuration and setup logging
+config = load_config()
+setup_logging(config)
+logger = logging.getLogger(__name__)
+
+
+class IndexWatcher:
+    """Watches the document directory and updates the index in a background thread.
+
+    Attributes:
+        processor: The DocumentProcessor whose index is kept up to date
+        interval_seconds: Seconds between directory scans
+        debounce_seconds: Quiet period after the last change before updating
+        embedding_threads: Torch intra-op threads during updates; 0 leaves the default
+        duty_cycle: Fraction of the update's wall time spent computing
+        last_stats: Chunk counts of the last successful update
+        last_error: Exception of the last failed update, if any
+    """
+
+    def __init__(
+        self,
+        processor: "DocumentProcessor",
+        interval_seconds: Optional[float] = None,
+        debounce_seconds: Optional[float] = None,
+        embedding_threads: Optional[int] = None,
+        duty_cycle: Optional[float] = None,
+        on_update: Optional[Callable[[Dict[str, int]], None]] = None,
+    ) -> None:
+        """Initialize the watcher without starting it.
+
+        Args:
+            processor: The DocumentProcessor to update.
+            interval_seconds: Seconds between directory scans.
+                Defaults to document.watch.interval_seconds.
+            debounce_seconds: Seconds without further changes before an update
+                starts. Defaults to document.watch.debounce_seconds.
+            embedding_threads: Torch intra-op threads while updating. torch's
+                thread pool is process-wide, so queries embedded during an
+                update use them too. Defaults to document.watch.embedding_threads.
+            duty_cycle: Fraction of time the update may compute, between 0 and 1;
+                after each embedded batch it sleeps for the rest. Defaults to
+                document.watch.duty_cycle.
+            on_update: Called with the chunk counts after each successful update.
+
+        Raises:
+            ValueError: If duty_cycle is not in (0, 1].
+        """
+        watch_config = config['document'].get('watch', {})
+        self.processor = processor
+        self.interval_seconds = (
+            interval_seconds if interval_seconds is not None
+            else watch_config.get('interval_seconds', 5)
+        )
+        self.debounce_seconds = (
+            debounce_seconds if debounce_seconds is not None
+            else watch_config.get('debounce_seconds', 10)
+        )
+        self.embedding_threads = (
+            embedding_threads if embedding_threads is not None
+            else watch_config.get('embedding_threads', 0)
+        )
+        self.duty_cycle = (
+            duty_cycle if duty_cycle is not None
+            else watch_config.get('duty_cycle', 1.0)
+        )
+        if not 0 < self.duty_cycle <= 1:
+            raise ValueError(f"duty_cycle must be in (0, 1], got {self.duty_cycle}")
+        self.on_update = on_update
+        self.last_stats: Optional[Dict[str, int]] = None
+        self.last_error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._batch_start = 0.0
+
+    def start(self) -> "IndexWatcher":
+        """Start watching, unless already started.
+
+        Returns:
+            The watcher itself.
+        """
+        if self._thread is None:
+            logger.info(f"Watching {self.processor.path} for document changes")
+            self._thread = threading.Thread(
+                target=self._run, name="rag-index-watcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop watching; an update in progress is finished first.
+
+        Args:
+            timeout: Maximum number of seconds to wait for the thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        """Update once to catch up, then update after every settled burst of changes.
+
+        A failed update is retried after another debounce period, since the
+        files it failed on no longer show up as changes.
+        """
+        seen = self._snapshot()
+        changed_at = None if self._update() else time.monotonic()
+        while not self._stop.wait(self.interval_seconds):
+            current = self._snapshot()
+            if current != seen:
+                seen, changed_at = current, time.monotonic()
+            elif (
+                changed_at is not None
+                and time.monotonic() - changed_at >= self.debounce_seconds
+            ):
+                changed_at = None if self._update() else time.monotonic()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Size and modification time of every PDF below the document directory."""
+        files = {}
+        for path in Path(self.processor.path).rglob("*.pdf"):
+            try:
+                stat = path.stat()
+            except OSError:
+                # Deleted between listing and stat; the next scan settles it
+                continue
+            files[str(path)] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def _update(self) -> bool:
+        """Bring the index up to date with throttled CPU use.
+
+        Returns:
+            Whether the update succeeded; failures are logged, not raised.
+        """
+        previous_threads = self._limit_threads()
+        self._batch_start = time.monotonic()
+        try:
+            stats = self.processor.update_index(progress_callback=self._throttle)
+        except Exception as e:
+            logger.error(f"Background index update failed: {str(e)}", exc_info=True)
+            self.last_error = e
+            return False
+        finally:
+            self._restore_threads(previous_threads)
+        self.last_stats, self.last_error = stats, None
+        if any(stats.values()) and self.on_update is not None:
+            self.on_update(stats)
+        return True
+
+    def _throttle(self, *progress: Any) -> None:
+        """Sleep after an embedded batch so updates compute duty_cycle of the time."""
+        if self.duty_cycle < 1:
+            busy = time.monotonic() - self._batch_start
+            self._stop.wait(busy * (1 - self.duty_cycle) / self.duty_cycle)
+        self._batch_start = time.monotonic()
+
+    def _limit_threads(self) -> Optional[int]:
+        """Lower torch's intra-op threads for the update; returns the previous count."""
+        if not self.embedding_threads:
+            return None
+        import torch
+
+        previous = torch.get_num_threads()
+        torch.set_num_threads(min(self.embedding_threads, previous))
+        return previous
+
+    def _restore_threads(self, previous: Optional[int]) -> None:
+        """Restore torch's intra-op threads after an update."""
+        if previous is not None:
+            import torch
+
+            torch.set_num_threads(previous)
+
+
+def start_if_enabled(processor: "DocumentProcessor") -> Optional[IndexWatcher]:
+    """Start a watcher for the processor if document.watch.enabled is set.
+
+    Args:
+        processor: The DocumentProcessor to keep up to date.
+
+    Returns:
+        The running watcher, or None if watching is disabled or the document
+        directory does not exist.
+    """
+    if not config['document'].get('watch', {}).get('enabled'):
+        return None
+    if not os.path.isdir(processor.path):
+        logger.warning(f"Not watching {processor.path}: directory does not exist")
+        return None
+    return IndexWatcher(processor).start()
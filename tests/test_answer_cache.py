@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from rag_app.answer_cache import AnswerCache
+
+VOCABULARY = ["salary", "range", "software", "engineer", "benefits", "director", "what", "is", "the"]
+
+
+class BagOfWordsEmbedding(Embeddings):
+    '''Embeds text as word counts over a tiny vocabulary so similarity is predictable'''
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        words = text.lower().replace("?", "").split()
+        return [float(words.count(term)) for term in VOCABULARY]
+
+
+RESPONSE = {"answer": "Between $100k and $130k.", "context": ["chunk"]}
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(BagOfWordsEmbedding(), similarity_threshold=0.9, ttl_seconds=60, max_entries=2)
+
+
+def test_exact_and_similar_questions_hit(cache):
+    '''
+    Test that normalized repeats and close paraphrases return the cached answer
+    '''
+    cache.put("What is the salary range for the Software Engineer?", RESPONSE)
+    assert cache.get("what is the  salary range for the software engineer?") == RESPONSE
+    assert cache.get("What is the salary range for a Software Engineer?") == RESPONSE
+    assert cache.get("What are the director benefits?") is None
+    assert cache.stats() == {"hits": 2, "misses": 1, "entries": 1}
+
+
+def test_entries_expire_after_ttl(cache):
+    '''
+    Test that answers older than the TTL are not served
+    '''
+    with patch("rag_app.answer_cache.time.monotonic", return_value=0.0):
+        cache.put("software engineer salary", RESPONSE)
+    with patch("rag_app.answer_cache.time.monotonic", return_value=61.0):
+        assert cache.get("software engineer salary") is None
+
+
+def test_capacity_evicts_least_recently_used(cache):
+    '''
+    Test that the cache holds at most max_entries answers
+    '''
+    cache.put("software salary", RESPONSE)
+    cache.put("director benefits", RESPONSE)
+    cache.get("software salary")
+    cache.put("engineer range", RESPONSE)
+    assert cache.get("director benefits") is None
+    assert cache.get("software salary") == RESPONSE
+
+
+def test_index_change_invalidates_answers(cache):
+    '''
+    Test that answers are dropped once the vector store version changes
+    '''
+    cache.invalidate("v1")
+    cache.put("software salary", RESPONSE)
+    cache.invalidate("v1")
+    assert cache.get("software salary") == RESPONSE
+    cache.invalidate("v2")
+    assert cache.get("software salary") is None
@@ -1,11 +1,13 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from rag_app.app import RAGApp
+from rag_app.app import RAGApp, config
 
 
 @pytest.fixture
 def mock_env(monkeypatch):
     monkeypatch.setenv("GROQ_API_KEY", "fake-key")
+    # Exercise the blocking get_response path unless a test enables streaming
+    monkeypatch.setitem(config['app']['ui'], 'stream_response', False)
 
 
 @pytest.fixture
@@ -13,6 +15,12 @@ def app(mock_env):
     return RAGApp()
 
 
+def use_vectorstore(monkeypatch, app, vectorstore):
+    '''Make the shared processor serve queries from the given vector store'''
+    monkeypatch.setattr(app.processor, "vectorstore", vectorstore)
+    monkeypatch.setattr(app.processor, "get_retriever", lambda store: store.as_retriever())
+
+
 def test_initialization_sets_up_dependencies(app):
     '''
     Test that the app initializes dependencies correctly
@@ -22,6 +30,15 @@ def test_initialization_sets_up_dependencies(app):
     assert app.api_key == "fake-key"
 
 
+def test_sessions_share_processor_and_model(app):
+    '''
+    Test that every app instance reuses the process-wide processor and model
+    '''
+    other = RAGApp()
+    assert other.processor is app.processor
+    assert other.model is app.model
+
+
 def test_query_documents_with_context(monkeypatch, app):
     '''
     Test that the query documents method works with context
@@ -35,9 +52,9 @@ def test_query_documents_with_context(monkeypatch, app):
     # Mock vectorstore and its retriever
     mock_vectorstore = MagicMock()
     mock_vectorstore.as_retriever.return_value = mock_retriever
-    app.model.get_response = MagicMock(return_value=mock_response)
+    monkeypatch.setattr(app.model, "get_response", MagicMock(return_value=mock_response))
 
-    monkeypatch.setitem(__import__("streamlit").session_state, "vectorstore", mock_vectorstore)
+    use_vectorstore(monkeypatch, app, mock_vectorstore)
 
     # Run query_documents
     app.query_documents("What is the purpose?")
@@ -50,9 +67,8 @@ def test_query_documents_no_vectorstore(monkeypatch, app):
     '''
     Test that query_documents handles missing vectorstore gracefully
     '''
-    # Ensure vectorstore is not in session state
-    if "vectorstore" in __import__("streamlit").session_state:
-        monkeypatch.delitem(__import__("streamlit").session_state, "vectorstore")
+    # Ensure no index is loaded
+    use_vectorstore(monkeypatch, app, None)
 
     # Mock st.warning to verify it's called
     with patch("streamlit.warning") as mock_warning:
@@ -67,7 +83,7 @@ def test_query_documents_retriever_failure(monkeypatch, app):
     # Mock vectorstore that returns None for retriever
     mock_vectorstore = MagicMock()
     mock_vectorstore.as_retriever.return_value = None
-    monkeypatch.setitem(__import__("streamlit").session_state, "vectorstore", mock_vectorstore)
+    use_vectorstore(monkeypatch, app, mock_vectorstore)
 
     # Mock st.error to verify it's called
     with patch("streamlit.error") as mock_error:
@@ -82,10 +98,10 @@ def test_query_documents_model_failure(monkeypatch, app):
     mock_retriever = MagicMock()
     mock_vectorstore = MagicMock()
     mock_vectorstore.as_retriever.return_value = mock_retriever
-    monkeypatch.setitem(__import__("streamlit").session_state, "vectorstore", mock_vectorstore)
+    use_vectorstore(monkeypatch, app, mock_vectorstore)
 
     # Mock model to return invalid response
-    app.model.get_response = MagicMock(return_value={})
+    monkeypatch.setattr(app.model, "get_response", MagicMock(return_value={}))
 
     # Mock st.error to verify it's called
     with patch("streamlit.error") as mock_error:
@@ -99,7 +115,7 @@ def test_query_documents_exception_handling(monkeypatch, app):
     '''
     mock_vectorstore = MagicMock()
     mock_vectorstore.as_retriever.side_effect = Exception("Test exception")
-    monkeypatch.setitem(__import__("streamlit").session_state, "vectorstore", mock_vectorstore)
+    use_vectorstore(monkeypatch, app, mock_vectorstore)
 
     # Mock st.error and st.info to verify they're called
     with patch("streamlit.error") as mock_error, patch("streamlit.info") as mock_info:
@@ -108,4 +124,52 @@ def test_query_documents_exception_handling(monkeypatch, app):
         mock_info.assert_called_once_with("Please try preparing the documents again or check your internet connection.")
 
 
+def test_query_documents_streams_answer(monkeypatch, app):
+    '''
+    Test that streaming renders the answer tokens and reports time to first token
+    '''
+    monkeypatch.setitem(config['app']['ui'], 'stream_response', True)
+    mock_vectorstore = MagicMock()
+    use_vectorstore(monkeypatch, app, mock_vectorstore)
+    context = [MagicMock(page_content="Page 1 content")]
+    monkeypatch.setattr(app.model, "stream_response", MagicMock(
+        return_value=iter([{"context": context}, {"answer": "Hello"}, {"answer": " world"}])
+    ))
+
+    with patch("streamlit.write_stream", side_effect=lambda tokens: "".join(tokens)) as mock_stream, \
+            patch.object(app, "display_similarity_results") as mock_display:
+        app.query_documents("What is the purpose?")
+
+    mock_stream.assert_called_once()
+    app.model.stream_response.assert_called_once_with(
+        mock_vectorstore.as_retriever.return_value, "What is the purpose?"
+    )
+    mock_display.assert_called_once_with(context)
 
+
+def test_prepare_vectorstore_updates_preloaded_index(monkeypatch, app):
+    '''
+    Test that the embeddings button updates the index even when one was preloaded
+    '''
+    use_vectorstore(monkeypatch, app, MagicMock())
+    stats = {"added": 3, "updated": 0, "removed": 1}
+    with patch.object(app.processor, "update_index", return_value=stats) as mock_update, \
+            patch("streamlit.success") as mock_success:
+        app.prepare_vectorstore()
+    mock_update.assert_called_once()
+    mock_success.assert_called_once()
+
+
+def test_query_documents_follows_swapped_index(monkeypatch, app):
+    '''
+    Test that a query after another session's update runs against the new index
+    '''
+    old_store, new_store = MagicMock(), MagicMock()
+    monkeypatch.setattr(app.model, "get_response", MagicMock(return_value={"answer": "Answer.", "context": []}))
+    use_vectorstore(monkeypatch, app, old_store)
+    app.query_documents("What is the purpose?")
+
+    monkeypatch.setattr(app.processor, "vectorstore", new_store)
+    monkeypatch.setattr(app.processor, "index_version", "v2")
+    app.query_documents("What is the purpose?")
+    app.model.get_response.assert_called_with(new_store.as_retriever.return_value, "What is the purpose?")
@@ -0,0 +1,41 @@
+import io
+import json
+
+from langchain_core.documents import Document
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.retrievers import BaseRetriever
+
+from rag_app.batch import per_document, read_questions, run_batch
+from rag_app.rag_model import RAGModel
+
+
+class SourceRetriever(BaseRetriever):
+    '''Retriever returning one chunk of the filtered source'''
+
+    def _get_relevant_documents(self, query, *, run_manager=None, filters=None):
+        source = (filters or {}).get("source", ["all.pdf"])[0]
+        return [Document(page_content=f"Certifications for {source}", metadata={"source": source})]
+
+
+def test_batch_writes_one_line_per_question_and_document(tmp_path, monkeypatch):
+    '''
+    Test that per-document questions are answered and written as JSON lines
+    '''
+    path = tmp_path / "questions.txt"
+    path.write_text("List the required certifications\n\nWhat is the salary range?\n")
+    items = per_document(read_questions(str(path)), [{"source": "a.pdf"}, {"source": "b.pdf"}])
+    assert len(items) == 4
+
+    monkeypatch.setattr(
+        "langchain_groq.ChatGroq", lambda **kwargs: FakeListChatModel(responses=["An answer."])
+    )
+    output = io.StringIO()
+    failed = run_batch(RAGModel("fake-key"), SourceRetriever(), items, output, concurrency=2)
+
+    lines = sorted((json.loads(line) for line in output.getvalue().splitlines()), key=lambda line: line["id"])
+    assert failed == 0
+    assert [line["id"] for line in lines] == [0, 1, 2, 3]
+    assert lines[1]["question"] == "List the required certifications"
+    assert lines[1]["filters"] == {"source": ["b.pdf"]}
+    assert lines[1]["sources"] == ["b.pdf"]
+    assert lines[1]["answer"] == "An answer."
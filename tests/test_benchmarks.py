@@ -0,0 +1,57 @@
+import io
+import json
+import random
+
+from langchain_core.messages import HumanMessage
+from pypdf import PdfReader
+
+from benchmarks.run import compare, main
+from benchmarks.stub_llm import StubChatModel
+from benchmarks.synthetic import generate_job, render_pdf
+from rag_app.metadata import extract_metadata
+
+
+def test_synthetic_pdf_parses_like_a_job_description():
+    '''
+    Test that generated PDFs are readable and their metadata is extracted
+    '''
+    job = generate_job(7, random.Random(0))
+    text = PdfReader(io.BytesIO(render_pdf(job.lines))).pages[0].extract_text()
+    metadata = extract_metadata(job.file_name, text)
+    assert metadata["title"] == job.title
+    assert metadata["department"] == job.department
+    assert metadata["job_code"] == job.job_code
+
+
+def test_stub_llm_is_deterministic():
+    '''
+    Test that the stub answers the same prompt with the same tokens
+    '''
+    llm = StubChatModel(first_token_latency=0, token_latency=0, answer_tokens=5)
+    prompt = [HumanMessage(content="What is the salary of the analyst?")]
+    answer = llm.invoke(prompt).content
+    assert answer == llm.invoke(prompt).content
+    assert answer == "".join(chunk.content for chunk in llm.stream(prompt))
+    assert len(answer.split()) == 5
+
+
+def test_benchmark_writes_comparable_results(tmp_path, capsys):
+    '''
+    Test that a small end-to-end run writes JSON results and compares with a baseline
+    '''
+    output = tmp_path / "result.json"
+    argv = [
+        "--docs", "5", "--queries", "4", "--e2e-queries", "2",
+        "--first-token-latency", "0", "--token-latency", "0", "--answer-tokens", "3",
+        "--output", str(output),
+    ]
+    assert main(argv) == 0
+    result = json.loads(output.read_text())
+    assert result["params"]["docs"] == 5
+    assert result["results"]["ingest"]["chunks"] == result["results"]["parse"]["chunks"]
+    assert result["results"]["retrieval"]["count"] == 4
+    assert result["results"]["e2e"]["first_token"]["count"] == 1
+
+    assert any(line.startswith("retrieval.p50:") for line in compare(result, result))
+    main(argv + ["--baseline", str(output)])
+    assert "Compared with" in capsys.readouterr().out
@@ -0,0 +1,50 @@
+import os
+import pickle
+
+import pytest
+from langchain_core.documents import Document
+
+from rag_app.compact_store import MmapDocstore, remove_stale_files
+
+
+def chunks(*ids):
+    return {
+        chunk_id: Document(page_content=f"Text of {chunk_id} – café", metadata={"page": i})
+        for i, chunk_id in enumerate(ids)
+    }
+
+
+def test_records_are_appended_and_decoded_by_id(tmp_path):
+    '''
+    Test that chunks round-trip, including appends after the file was mapped
+    '''
+    store = MmapDocstore(str(tmp_path))
+    store.add(chunks("a", "b"))
+    assert store.search("a").page_content == "Text of a – café"
+    store.add(chunks("c"))
+    doc = store.search("c")
+    assert (doc.id, doc.metadata) == ("c", {"page": 0})
+    assert store.search("missing") == "ID missing not found."
+    assert len(store) == 3
+    with pytest.raises(ValueError):
+        store.add(chunks("a"))
+
+
+def test_delete_compact_and_reload(tmp_path):
+    '''
+    Test that deleted records are dropped by compaction and a pickled store reopens
+    '''
+    store = MmapDocstore(str(tmp_path))
+    store.add(chunks("a", "b", "c"))
+    store.delete(["a", "b"])
+    assert store.search("a") == "ID a not found."
+    assert store.garbage_ratio() > 0.5
+    old_name = store.compact()
+    assert store.garbage_ratio() == 0.0
+    assert store.search("c").page_content == "Text of c – café"
+
+    reloaded = pickle.loads(pickle.dumps(store))
+    reloaded.open(str(tmp_path))
+    assert reloaded.search("c").page_content == "Text of c – café"
+    assert remove_stale_files(str(tmp_path), keep=store.file_name) == [old_name]
+    assert os.listdir(tmp_path) == [store.file_name]
@@ -0,0 +1,46 @@
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from rag_app.context_budget import ContextBudget, merge_overlapping, remove_near_duplicates
+
+PAGE = " ".join(
+    f"Responsibility {i}: coordinate the quarterly planning cycle with team {i}." for i in range(40)
+)
+
+
+def split_page(source="jd.pdf", page=0):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=60)
+    return splitter.split_documents([Document(page_content=PAGE, metadata={"source": source, "page": page})])
+
+
+def test_adjacent_overlapping_chunks_are_merged():
+    '''
+    Test that overlapping neighbours from the same page are stitched back together
+    '''
+    chunks = split_page()
+    merged = merge_overlapping([chunks[3], chunks[1], chunks[2]])
+    assert len(merged) == 1
+    assert merged[0].page_content in PAGE
+    assert merged[0].page_content.startswith(chunks[1].page_content)
+    assert merged[0].page_content.endswith(chunks[3].page_content)
+
+
+def test_chunks_of_other_pages_are_not_merged():
+    '''
+    Test that identical text from another source stays separate until deduplication
+    '''
+    first, second = split_page("a.pdf")[0], split_page("b.pdf")[0]
+    assert len(merge_overlapping([first, second])) == 2
+    assert remove_near_duplicates([first, second], threshold=0.8) == [first]
+
+
+def test_pack_respects_token_budget():
+    '''
+    Test that packing keeps the most relevant chunks and trims the last one to the budget
+    '''
+    chunks = split_page()
+    budget = ContextBudget(max_tokens=100, chars_per_token=4, min_tokens=10)
+    packed = budget.pack([chunks[0], chunks[5], chunks[9]])
+    assert packed[0] == chunks[0]
+    assert sum(budget.estimate_tokens(doc.page_content) for doc in packed) <= 100 + len(packed)
+    assert packed[-1].page_content in chunks[5].page_content
@@ -1,12 +1,34 @@
+import json
+import os
+import shutil
+import tempfile
 import unittest
-from rag_app.document_processor import DocumentProcessor
+from unittest.mock import patch
+
+import faiss
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag_app.compact_store import MmapDocstore
+from rag_app.document_processor import BM25_FILE, MANIFEST_FILE, DocumentProcessor, config
+
+SAMPLE_PDFS = ["Marketing Coordinator.pdf", "Senior Financial Analyst.pdf"]
+
 
 class TestDocumentProcessor(unittest.TestCase):
     def setUp(self):
         '''
         Initialize the test case with a DocumentProcessor instance.
+
+        The index goes to a temporary directory and the embedding cache is
+        disabled, so the test leaves nothing behind in the working directory.
         '''
-        self.processor = DocumentProcessor()
+        self.tmp = tempfile.mkdtemp()
+        cache_config = {**config['document']['embedding_cache'], "enabled": False}
+        with patch.dict(config['document'], {"embedding_cache": cache_config}):
+            self.processor = DocumentProcessor(index_path=os.path.join(self.tmp, "index"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
 
     def test_embedding_generation(self):
         '''
@@ -17,3 +39,225 @@ class TestDocumentProcessor(unittest.TestCase):
         self.assertIsNotNone(vectorstore)
         self.assertTrue(hasattr(vectorstore, "similarity_search"))
 
+
+class TestIndexPersistence(unittest.TestCase):
+    def setUp(self):
+        '''
+        Copy two job descriptions into a temporary corpus and use fake embeddings.
+        '''
+        self.tmp = tempfile.mkdtemp()
+        self.docs_path = os.path.join(self.tmp, "docs")
+        self.index_path = os.path.join(self.tmp, "index")
+        os.makedirs(self.docs_path)
+        for name in SAMPLE_PDFS:
+            shutil.copy(os.path.join("job_descriptions", name), self.docs_path)
+        self.embeddings = DeterministicFakeEmbedding(size=32)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def make_processor(self):
+        return DocumentProcessor(
+            path=self.docs_path, index_path=self.index_path, embeddings=self.embeddings
+        )
+
+    def test_index_is_persisted_with_manifest(self):
+        '''
+        Test that building the index writes the FAISS files and a manifest.
+        '''
+        self.make_processor().load_and_embed()
+        for name in ("index.faiss", "index.pkl", MANIFEST_FILE):
+            self.assertTrue(os.path.exists(os.path.join(self.index_path, name)))
+        with open(os.path.join(self.index_path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        self.assertEqual(sorted(manifest["files"]), sorted(SAMPLE_PDFS))
+        self.assertEqual(manifest["settings"]["embedding_model"], "all-MiniLM-L6-v2")
+
+    def test_unchanged_corpus_loads_saved_index(self):
+        '''
+        Test that a second processor loads the saved index without re-reading PDFs.
+        '''
+        first = self.make_processor().load_and_embed()
+        processor = self.make_processor()
+        with patch.object(processor, "_split_file") as mock_split:
+            vectorstore = processor.load_and_embed()
+            mock_split.assert_not_called()
+        self.assertEqual(vectorstore.index.ntotal, first.index.ntotal)
+
+    def test_removed_document_chunks_are_deleted(self):
+        '''
+        Test that removing a document deletes only its chunks from the index.
+        '''
+        processor = self.make_processor()
+        processor.update_index()
+        removed_ids = processor.indexed_files[SAMPLE_PDFS[0]]["chunk_ids"]
+        total = processor.vectorstore.index.ntotal
+        os.remove(os.path.join(self.docs_path, SAMPLE_PDFS[0]))
+
+        processor = self.make_processor()
+        stats = processor.update_index()
+        self.assertEqual(stats, {"added": 0, "updated": 0, "removed": len(removed_ids)})
+        self.assertEqual(processor.vectorstore.index.ntotal, total - len(removed_ids))
+        self.assertFalse(set(removed_ids) & set(processor.vectorstore.docstore._dict))
+        self.assertEqual(len(processor.bm25), processor.vectorstore.index.ntotal)
+        self.assertFalse(set(removed_ids) & set(processor.bm25.doc_lengths))
+
+    def test_bm25_index_is_persisted_and_rebuilt(self):
+        '''
+        Test that the BM25 index is saved with the vectors and rebuilt if missing.
+        '''
+        processor = self.make_processor()
+        processor.update_index()
+        self.assertTrue(os.path.exists(os.path.join(self.index_path, BM25_FILE)))
+        expected = dict(processor.bm25.doc_lengths)
+
+        os.remove(os.path.join(self.index_path, BM25_FILE))
+        processor = self.make_processor()
+        processor.update_index()
+        self.assertEqual(processor.bm25.doc_lengths, expected)
+        self.assertIs(processor.get_retriever().bm25, processor.bm25)
+
+    def test_document_metadata_is_extracted_and_filterable(self):
+        '''
+        Test that ingest records per-document metadata and retrieval can filter and boost on it.
+        '''
+        processor = self.make_processor()
+        processor.update_index()
+        metadata = processor.indexed_files["Senior Financial Analyst.pdf"]["metadata"]
+        self.assertEqual(metadata["department"], "Finance")
+        self.assertEqual(metadata["seniority"], "senior")
+
+        docs = processor.get_retriever().invoke("Who is a Marketing Coordinator?")
+        self.assertTrue(docs)
+        self.assertTrue(docs[0].metadata["title"].startswith("Marketing Coordinator"))
+        docs = processor.get_retriever().invoke("degree", filters={"department": ["Finance"]})
+        self.assertTrue(docs)
+        self.assertTrue(all(doc.metadata["department"] == "Finance" for doc in docs))
+
+    def test_only_new_and_modified_documents_are_embedded(self):
+        '''
+        Test that incremental updates split only added or changed files.
+        '''
+        processor = self.make_processor()
+        processor.update_index()
+        shutil.copy(os.path.join("job_descriptions", "Director of Operations.pdf"), self.docs_path)
+        shutil.copy(
+            os.path.join("job_descriptions", "Human Resources Manager.pdf"),
+            os.path.join(self.docs_path, SAMPLE_PDFS[1]),
+        )
+
+        with patch.object(processor, "_split_file", wraps=processor._split_file) as mock_split:
+            stats = processor.update_index()
+        split_files = sorted(call.args[0] for call in mock_split.call_args_list)
+        self.assertEqual(split_files, ["Director of Operations.pdf", SAMPLE_PDFS[1]])
+        self.assertGreater(stats["added"], 0)
+        self.assertGreater(stats["updated"], 0)
+        self.assertEqual(stats["removed"], 0)
+        self.assertEqual(processor.update_index(), {"added": 0, "updated": 0, "removed": 0})
+
+    def test_parallel_ingestion_matches_serial(self):
+        '''
+        Test that parsing in a process pool yields the same chunks in the same order.
+        '''
+        serial = self.make_processor()
+        parallel = DocumentProcessor(
+            path=self.docs_path, index_path=None, embeddings=self.embeddings, ingest_workers=2
+        )
+        files = serial._list_pdfs()
+        expected = list(serial._iter_split_files(files))
+        actual = list(parallel._iter_split_files(files))
+        self.assertEqual([f for f, _ in actual], files)
+        for (_, want), (_, got) in zip(expected, actual):
+            self.assertEqual([c.page_content for c in got], [c.page_content for c in want])
+            self.assertEqual([c.metadata for c in got], [c.metadata for c in want])
+
+    def test_chunks_are_embedded_in_fixed_size_batches(self):
+        '''
+        Test that embedding runs in batches of embed_batch_size and reports progress.
+        '''
+        processor = DocumentProcessor(
+            path=self.docs_path, index_path=None, embeddings=self.embeddings, embed_batch_size=3
+        )
+        progress = []
+        with patch.object(
+            DeterministicFakeEmbedding, "embed_documents", autospec=True,
+            side_effect=DeterministicFakeEmbedding.embed_documents,
+        ) as mock_embed:
+            stats = processor.update_index(progress_callback=lambda *args: progress.append(args))
+        batch_sizes = [len(call.args[1]) for call in mock_embed.call_args_list]
+        self.assertTrue(all(size <= 3 for size in batch_sizes))
+        self.assertEqual(sum(batch_sizes), stats["added"])
+        self.assertEqual(processor.vectorstore.index.ntotal, stats["added"])
+        self.assertEqual(progress[-1], (2, 2, stats["added"]))
+
+    def test_approximate_index_survives_incremental_updates(self):
+        '''
+        Test that an IVF index is built, kept aligned with the docstore on removal and reloaded.
+        '''
+        index_config = {
+            "type": "ivf_flat", "min_vectors": 1, "nlist": 4, "nprobe": 4, "recall_queries": 10,
+        }
+        with patch.dict(config['document'], {"index": index_config}):
+            processor = self.make_processor()
+            processor.update_index()
+            self.assertIsInstance(processor.vectorstore.index, faiss.IndexIVFFlat)
+            os.remove(os.path.join(self.docs_path, SAMPLE_PDFS[0]))
+            processor.update_index()
+            store = processor.vectorstore
+            self.assertIsInstance(store.index, faiss.IndexIVFFlat)
+            self.assertEqual(store.index.ntotal, len(store.docstore._dict))
+            doc = store.docstore.search(store.index_to_docstore_id[0])
+            hit = store.similarity_search(doc.page_content, k=1)[0]
+            self.assertEqual(hit.page_content, doc.page_content)
+
+            reloaded = self.make_processor().load_and_embed()
+            self.assertEqual(reloaded.index.nprobe, 4)
+
+    def test_compact_storage_keeps_chunks_out_of_memory(self):
+        '''
+        Test that the mmap docstore and fp16 vectors survive updates and reloads.
+        '''
+        storage = {"docstore": "mmap", "compact_ratio": 0.1}
+        index_config = {**config['document']['index'], "encoding": "fp16"}
+        with patch.dict(config['document'], {"storage": storage, "index": index_config}):
+            processor = self.make_processor()
+            processor.update_index()
+            store = processor.vectorstore
+            self.assertIsInstance(store.docstore, MmapDocstore)
+            self.assertIsInstance(store.index, faiss.IndexScalarQuantizer)
+
+            os.remove(os.path.join(self.docs_path, SAMPLE_PDFS[0]))
+            processor.update_index()
+            store = processor.vectorstore
+            self.assertEqual(store.index.ntotal, len(store.docstore))
+            chunk_files = [name for name in os.listdir(self.index_path) if name.endswith(".bin")]
+            self.assertEqual(chunk_files, [store.docstore.file_name])
+
+            reloaded = self.make_processor().load_and_embed()
+            doc = reloaded.docstore.search(reloaded.index_to_docstore_id[0])
+            hit = reloaded.similarity_search(doc.page_content, k=1)[0]
+            self.assertEqual(hit.page_content, doc.page_content)
+
+    def test_updates_leave_the_published_index_untouched(self):
+        '''
+        Test that an update is swapped in while retrievers of the old index keep working.
+        '''
+        storage = {"docstore": "mmap", "compact_ratio": 0.1}
+        with patch.dict(config['document'], {"storage": storage}):
+            processor = self.make_processor()
+            processor.update_index()
+            old_store, old_version = processor.vectorstore, processor.index_version
+            old_retriever = processor.get_retriever()
+            total = old_store.index.ntotal
+
+            os.remove(os.path.join(self.docs_path, SAMPLE_PDFS[0]))
+            processor.update_index()
+            self.assertIsNot(processor.vectorstore, old_store)
+            self.assertNotEqual(processor.index_version, old_version)
+            self.assertLess(processor.vectorstore.index.ntotal, total)
+
+            # The old version still answers from its own, compacted-away chunk file
+            self.assertEqual(old_store.index.ntotal, total)
+            self.assertEqual(len(old_store.docstore), total)
+            docs = old_retriever.invoke("Marketing Coordinator social media")
+            self.assertTrue(docs)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import torch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag_app.embedding_backends import (
+    SentenceTransformerEmbeddings, build_embeddings, check_parity, quantize_int8
+)
+
+
+class RecordingEncoder:
+    '''Encoder that embeds a text as its length and records the batches'''
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, **kwargs):
+        self.batches.append(list(texts))
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+def test_batches_are_length_sorted_and_order_is_kept():
+    '''
+    Test that texts are batched by length and vectors come back in input order
+    '''
+    encoder = RecordingEncoder()
+    embeddings = SentenceTransformerEmbeddings(encoder, batch_size=2)
+    texts = ["a" * 10, "b", "c" * 5, "d\nd"]
+    vectors = embeddings.embed_documents(texts)
+    assert [vector[0] for vector in vectors] == [10.0, 1.0, 5.0, 3.0]
+    assert encoder.batches == [["b", "d d"], ["ccccc", "a" * 10]]
+    assert embeddings.embed_query("xyz") == [3.0, 1.0]
+
+
+def test_parity_check():
+    '''
+    Test that identical embeddings pass and different ones are rejected
+    '''
+    reference = DeterministicFakeEmbedding(size=16)
+    assert check_parity(reference, reference) == pytest.approx(1.0)
+    with pytest.raises(ValueError):
+        check_parity(DeterministicFakeEmbedding(size=16), SentenceTransformerEmbeddings(RecordingEncoder()))
+
+
+def test_int8_quantization_stays_close_to_float():
+    '''
+    Test that dynamic int8 quantization keeps outputs close to the float model
+    '''
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(64, 64), torch.nn.ReLU(), torch.nn.Linear(64, 32))
+    inputs = torch.randn(8, 64)
+    expected = model(inputs)
+    quantized = quantize_int8(model)
+    similarity = torch.nn.functional.cosine_similarity(quantized(inputs), expected)
+    assert similarity.min().item() > 0.99
+
+
+def test_unknown_backend_is_rejected():
+    '''
+    Test that a misspelled backend fails instead of silently using torch
+    '''
+    with pytest.raises(ValueError):
+        build_embeddings("all-MiniLM-L6-v2", {"backend": "tensorrt"})
+
+
+def test_passed_parity_check_is_recorded(monkeypatch, tmp_path):
+    '''
+    Test that the reference model is only loaded until a parity check has passed
+    '''
+    loads = []
+
+    def reference(model_name, batch_size):
+        loads.append(model_name)
+        return SentenceTransformerEmbeddings(RecordingEncoder())
+
+    monkeypatch.setattr("sentence_transformers.SentenceTransformer", lambda *args, **kwargs: RecordingEncoder())
+    monkeypatch.setattr("rag_app.embedding_backends.quantize_int8", lambda model: model)
+    monkeypatch.setattr("rag_app.embedding_backends._reference_embeddings", reference)
+
+    embedding_config = {"backend": "torch_int8", "parity_check": True}
+    for _ in range(2):
+        build_embeddings("all-MiniLM-L6-v2", embedding_config, record_dir=str(tmp_path))
+    assert loads == ["all-MiniLM-L6-v2"]
+
+    build_embeddings("all-MiniLM-L6-v2", embedding_config)
+    assert len(loads) == 2
+    with pytest.raises(ValueError):
+        build_embeddings("all-MiniLM-L6-v2", {**embedding_config, "parity_tolerance": 1.5}, record_dir=str(tmp_path))
+    assert len(loads) == 3
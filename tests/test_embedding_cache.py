@@ -0,0 +1,166 @@
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag_app.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def base():
+    embedding = CountingEmbedding(size=8)
+    embedding.calls = []
+    return embedding
+
+
+def make_cache(base, tmp_path, **kwargs):
+    return CachedEmbeddings(base, model_name="test-model", cache_dir=str(tmp_path), **kwargs)
+
+
+def test_repeated_texts_are_served_from_cache(base, tmp_path):
+    '''
+    Test that only texts missing from the cache reach the wrapped model
+    '''
+    cache = make_cache(base, tmp_path)
+    first = cache.embed_documents(["alpha", "beta", "alpha"])
+    second = cache.embed_documents(["beta", "gamma"])
+
+    assert base.calls == [["alpha", "beta"], ["gamma"]]
+    assert first[0] == first[2] == pytest.approx(base.embed_documents(["alpha"])[0])
+    assert second[0] == pytest.approx(first[1])
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 4
+
+
+def test_queries_share_cache_with_documents(base, tmp_path):
+    '''
+    Test that a query matching an embedded chunk (up to whitespace) is a cache hit
+    '''
+    cache = make_cache(base, tmp_path)
+    cache.embed_documents(["senior financial analyst"])
+    base.calls.clear()
+    cache.embed_query("  senior   financial analyst\n")
+    assert base.calls == []
+
+
+def test_batched_queries_use_the_query_path(base, tmp_path):
+    '''
+    Test that uncached queries of a batch are embedded as queries, each once
+    '''
+    cache = make_cache(base, tmp_path)
+    cache.embed_query("alpha")
+    base.calls.clear()
+    vectors = cache.embed_queries(["alpha", "beta", "beta"])
+    assert base.calls == [["beta"]]
+    assert vectors[1] == vectors[2] == pytest.approx(base.embed_query("beta"))
+
+
+def test_cache_persists_across_instances(base, tmp_path):
+    '''
+    Test that embeddings written by one instance are reused by the next
+    '''
+    make_cache(base, tmp_path).embed_documents(["alpha", "beta"])
+    base.calls.clear()
+    cache = make_cache(base, tmp_path)
+    cache.embed_documents(["alpha", "beta"])
+    assert base.calls == []
+    assert cache.stats()["entries"] == 2
+
+
+def test_least_recently_used_entry_is_evicted(base, tmp_path):
+    '''
+    Test that the cache stays within max_entries by evicting the oldest entry
+    '''
+    cache = make_cache(base, tmp_path, max_entries=2)
+    cache.embed_documents(["alpha", "beta"])
+    cache.embed_query("alpha")
+    cache.embed_documents(["gamma"])
+    base.calls.clear()
+
+    cache.embed_documents(["alpha", "gamma", "beta"])
+    assert base.calls == [["beta"]]
+    assert cache.stats()["entries"] == 2
+
+
+def test_queries_and_recency_persist_without_flush(base, tmp_path):
+    '''
+    Test that query embeddings and the LRU order are restored from the arrays
+    '''
+    cache = make_cache(base, tmp_path, max_entries=2)
+    cache.embed_documents(["alpha", "beta"])
+    cache.embed_query("alpha")
+    cache.embed_query("gamma")
+    base.calls.clear()
+
+    reloaded = make_cache(base, tmp_path, max_entries=2)
+    reloaded.embed_documents(["alpha", "gamma"])
+    assert base.calls == []
+    reloaded.embed_documents(["delta"])
+    reloaded.embed_documents(["gamma"])
+    assert base.calls == [["delta"]]
+
+
+def test_other_model_does_not_reuse_entries(base, tmp_path):
+    '''
+    Test that cache keys include the embedding model name
+    '''
+    make_cache(base, tmp_path).embed_documents(["alpha"])
+    base.calls.clear()
+    CachedEmbeddings(base, model_name="other-model", cache_dir=str(tmp_path)).embed_documents(["alpha"])
+    assert base.calls == [["alpha"]]
+
+
+def test_new_cache_does_not_truncate_mapped_files(base, tmp_path):
+    '''
+    Test that replacing the cache files leaves existing mappings intact
+    '''
+    cache = make_cache(base, tmp_path)
+    vector = cache.embed_documents(["alpha"])[0]
+    CachedEmbeddings(base, model_name="other-model", cache_dir=str(tmp_path)).embed_documents(["beta"])
+    base.calls.clear()
+    assert cache.embed_query("alpha") == pytest.approx(vector)
+    assert base.calls == []
+
+
+def test_concurrent_creator_reuses_created_files(base, tmp_path):
+    '''
+    Test that an instance started before the files existed adds to them instead of recreating them
+    '''
+    first = make_cache(base, tmp_path)
+    second = make_cache(base, tmp_path)
+    first.embed_documents(["alpha"])
+    second.embed_documents(["beta"])
+    base.calls.clear()
+    make_cache(base, tmp_path).embed_documents(["alpha", "beta"])
+    assert base.calls == []
+
+
+def test_instances_sharing_a_directory_allocate_distinct_rows(base, tmp_path):
+    '''
+    Test that two instances writing to one cache directory never overwrite each other's rows
+    '''
+    first = make_cache(base, tmp_path)
+    first.embed_documents(["alpha"])
+    second = make_cache(base, tmp_path)
+    first.embed_documents(["beta", "gamma"])
+    second.embed_documents(["delta", "epsilon"])
+    texts = ["alpha", "beta", "gamma", "delta", "epsilon"]
+    expected = base.embed_documents(texts)
+    base.calls.clear()
+
+    reloaded = make_cache(base, tmp_path)
+    np.testing.assert_allclose(reloaded.embed_documents(texts), expected, rtol=1e-6)
+    assert base.calls == []
+    np.testing.assert_allclose(first.embed_documents(["beta"]), expected[1:2], rtol=1e-6)
+    assert base.calls == []
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+# Modules that take seconds to import and must only load in the background
+HEAVY_MODULES = {
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "langchain_community",
+    "langchain_groq",
+    "faiss",
+}
+# Cumulative import time budget of the Streamlit entry module, in seconds
+IMPORT_BUDGET_SECONDS = 2.0
+
+
+def import_times(module):
+    '''Import a module in a fresh interpreter and return cumulative seconds per imported module'''
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_app_import_is_fast_and_skips_heavy_dependencies():
+    '''
+    Test that importing the app loads no heavy dependency and stays within the import budget
+    '''
+    times = import_times("rag_app.app")
+    loaded = {name.split(".")[0] for name in times}
+    assert not HEAVY_MODULES & loaded
+    assert times["rag_app.app"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,143 @@
+import faiss
+import numpy as np
+import pytest
+
+from rag_app.index_factory import (
+    build_index, index_settings, is_lossless, recall_at_k, reconstruct_all,
+    remove_positions, search_subset,
+)
+
+INDEX_CONFIG = {
+    "min_vectors": 100,
+    "nlist": 16,
+    "nprobe": 8,
+    "hnsw_m": 16,
+    "ef_construction": 80,
+    "ef_search": 64,
+    "pq_m": 8,
+    "pq_bits": 6,
+    "train_size": 2000,
+}
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(20, 32))
+    return (centers[rng.integers(0, 20, 2000)] + 0.1 * rng.normal(size=(2000, 32))).astype(np.float32)
+
+
+@pytest.mark.parametrize("index_type, index_class, min_recall", [
+    ("flat", faiss.IndexFlatL2, 1.0),
+    ("ivf_flat", faiss.IndexIVFFlat, 0.9),
+    ("hnsw", faiss.IndexHNSWFlat, 0.9),
+    ("ivf_pq", faiss.IndexIVFPQ, 0.3),
+])
+def test_build_index_types(vectors, index_type, index_class, min_recall):
+    '''
+    Test that every index type is built, filled and reaches a sane recall@4
+    '''
+    index = build_index(vectors, {**INDEX_CONFIG, "type": index_type})
+    assert isinstance(index, index_class)
+    assert index.ntotal == len(vectors)
+    assert recall_at_k(index, vectors, k=4, n_queries=100) >= min_recall
+
+
+def test_search_parameters_are_applied(vectors):
+    '''
+    Test that nprobe and efSearch come from the configuration
+    '''
+    ivf = build_index(vectors, {**INDEX_CONFIG, "type": "ivf_flat"})
+    assert ivf.nprobe == 8
+    hnsw = build_index(vectors, {**INDEX_CONFIG, "type": "hnsw"})
+    assert hnsw.hnsw.efSearch == 64
+    np.testing.assert_array_equal(np.sort(reconstruct_all(ivf), axis=0), np.sort(vectors, axis=0))
+
+
+def test_small_corpus_keeps_flat_index(vectors):
+    '''
+    Test that corpora below min_vectors keep exact search and nlist is capped
+    '''
+    index = build_index(vectors[:50], {**INDEX_CONFIG, "type": "ivf_flat"})
+    assert isinstance(index, faiss.IndexFlatL2)
+    index = build_index(vectors[:200], {**INDEX_CONFIG, "type": "ivf_flat", "nlist": 1024})
+    assert index.nlist == 200 // 39
+
+
+def test_index_settings_exclude_search_parameters():
+    '''
+    Test that tuning nprobe does not change the settings that force a rebuild
+    '''
+    settings = index_settings({**INDEX_CONFIG, "type": "ivf_pq"})
+    assert settings == {"type": "ivf_pq", "nlist": 16, "pq_m": 8, "pq_bits": 6}
+    with pytest.raises(ValueError):
+        index_settings({"type": "lsh"})
+
+
+@pytest.mark.parametrize("index_type, encoding, index_class, lossless", [
+    ("flat", "fp16", faiss.IndexScalarQuantizer, True),
+    ("flat", "sq8", faiss.IndexScalarQuantizer, False),
+    ("ivf_flat", "fp16", faiss.IndexIVFScalarQuantizer, True),
+    ("hnsw", "sq8", faiss.IndexHNSWSQ, False),
+])
+def test_compact_encodings(vectors, index_type, encoding, index_class, lossless):
+    '''
+    Test that reduced-precision encodings shrink the index and keep recall high
+    '''
+    config = {**INDEX_CONFIG, "type": index_type, "encoding": encoding}
+    index = build_index(vectors, config)
+    assert isinstance(index, index_class)
+    assert is_lossless(index) == lossless
+    assert index_settings(config)["encoding"] == encoding
+    full = build_index(vectors, {**INDEX_CONFIG, "type": index_type})
+    assert faiss.serialize_index(index).nbytes < faiss.serialize_index(full).nbytes
+    assert recall_at_k(index, vectors, k=4, n_queries=100) >= 0.8
+    if lossless:
+        np.testing.assert_allclose(np.sort(reconstruct_all(index), axis=0), np.sort(vectors, axis=0), atol=1e-2)
+
+
+@pytest.mark.parametrize("index_type, encoding", [
+    ("flat", "sq8"),
+    ("ivf_flat", "float32"),
+    ("ivf_pq", "float32"),
+])
+def test_remove_positions_keeps_positions_contiguous(vectors, index_type, encoding):
+    '''
+    Test that removing vectors renumbers the remaining ones to their new positions
+    '''
+    index = build_index(vectors, {**INDEX_CONFIG, "type": index_type, "encoding": encoding})
+    reconstruct_all(index)
+    original = reconstruct_all(index)
+    remove_positions(index, np.arange(0, 1000, dtype=np.int64))
+
+    assert index.ntotal == 1000
+    np.testing.assert_array_equal(reconstruct_all(index), original[1000:])
+    _, found = index.search(original[1000:1100], 1)
+    assert (found[:, 0] == np.arange(100)).mean() >= 0.5
+
+
+def test_hnsw_does_not_support_removal(vectors):
+    '''
+    Test that HNSW removal is refused instead of corrupting the graph
+    '''
+    index = build_index(vectors, {**INDEX_CONFIG, "type": "hnsw"})
+    with pytest.raises(ValueError):
+        remove_positions(index, np.arange(10, dtype=np.int64))
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+def test_search_subset_searches_many_queries_at_once(vectors, index_type):
+    '''
+    Test that a query matrix finds the same subset neighbours as one query at a time
+    '''
+    index = build_index(vectors, {**INDEX_CONFIG, "type": index_type})
+    positions = np.arange(0, 2000, 7, dtype=np.int64)
+    queries = vectors[:5]
+
+    _, found = search_subset(index, queries, 4, positions)
+
+    assert found.shape == (5, 4)
+    assert np.isin(found, positions).all()
+    for query, row in zip(queries, found):
+        _, single = search_subset(index, query[None], 4, positions)
+        np.testing.assert_array_equal(row, single[0])
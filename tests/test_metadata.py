@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from langchain_community.document_loaders import PyPDFLoader
+
+from rag_app.metadata import MetadataTable, extract_metadata
+
+
+def first_page(name):
+    return PyPDFLoader(f"job_descriptions/{name}").load()[0].page_content
+
+
+@pytest.fixture
+def table():
+    files = {
+        name: {"metadata": extract_metadata(name, first_page(name))}
+        for name in [
+            "Chief Technology Officer (CTO).pdf",
+            "Senior Financial Analyst.pdf",
+            "Software Engineer II (Mid-Level).pdf",
+        ]
+    }
+    index_to_docstore_id = {
+        0: "Senior Financial Analyst.pdf::0",
+        1: "Software Engineer II (Mid-Level).pdf::0",
+        2: "Chief Technology Officer (CTO).pdf::0",
+        3: "Software Engineer II (Mid-Level).pdf::1",
+    }
+    table = MetadataTable()
+    table.update(files, index_to_docstore_id)
+    return table
+
+
+def test_extract_metadata_from_first_page():
+    '''
+    Test that title, department, seniority and job code are read from the job description
+    '''
+    metadata = extract_metadata("Chief Technology Officer (CTO).pdf", first_page("Chief Technology Officer (CTO).pdf"))
+    assert metadata["title"] == "Chief Technology Officer (CTO)"
+    assert metadata["department"] == "Executive"
+    assert metadata["seniority"] == "executive"
+    assert metadata["job_code"] == "TECH-610"
+    assert "cto" in metadata["aliases"]
+
+    metadata = extract_metadata("Marketing Coordinator.pdf", first_page("Marketing Coordinator.pdf"))
+    assert metadata["title"] == "Marketing Coordinator (Entry-Level)"
+    assert metadata["seniority"] == "entry"
+
+
+def test_extract_metadata_falls_back_to_file_name():
+    '''
+    Test that documents without a parsed first page still get a title and seniority
+    '''
+    metadata = extract_metadata("finance/Senior Financial Analyst.pdf")
+    assert metadata["title"] == "Senior Financial Analyst"
+    assert metadata["seniority"] == "senior"
+    assert metadata["department"] is None
+
+
+def test_detect_filters_from_role_names(table):
+    '''
+    Test that roles named in a question, by title or alias, become source filters
+    '''
+    assert table.detect_filters("What does a software engineer do?") == {
+        "source": ["Software Engineer II (Mid-Level).pdf"]
+    }
+    assert table.detect_filters("Who does the CTO report to?") == {
+        "source": ["Chief Technology Officer (CTO).pdf"]
+    }
+    assert table.detect_filters("Which roles need a degree?") is None
+
+
+def test_positions_match_all_filters(table):
+    '''
+    Test that filters resolve to the FAISS positions of the matching documents' chunks
+    '''
+    np.testing.assert_array_equal(table.positions({"department": ["information technology"]}), [1, 3])
+    np.testing.assert_array_equal(table.positions({"seniority": ["senior", "executive"]}), [0, 2])
+    assert len(table.positions({"department": "Finance", "seniority": "mid"})) == 0
+    with pytest.raises(ValueError):
+        table.positions({"salary": ["high"]})
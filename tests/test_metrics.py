@@ -0,0 +1,43 @@
+import json
+import logging
+
+from rag_app import metrics
+from rag_app.metrics import LatencyRecorder
+
+
+def test_summary_reports_percentiles_over_rolling_window():
+    '''
+    Test that percentiles only consider the most recent samples
+    '''
+    recorder = LatencyRecorder(window=100)
+    for value in range(200):
+        recorder.record("llm", float(value))
+    summary = recorder.summary()["llm"]
+    assert summary["count"] == 100
+    assert summary["p50"] == 149.5
+    assert 194 < summary["p95"] < 195
+    assert summary["p99"] > summary["p95"]
+
+
+def test_track_query_logs_one_json_line_with_stages(caplog):
+    '''
+    Test that nested queries share one timing record written as JSON
+    '''
+    logger = logging.getLogger("rag_app.metrics.queries")
+    logger.addHandler(caplog.handler)
+    try:
+        with metrics.track_query(streamed=False) as outer:
+            with metrics.stage("vector_search"):
+                pass
+            with metrics.track_query() as inner:
+                metrics.record("llm", 0.25)
+            assert inner is outer
+    finally:
+        logger.removeHandler(caplog.handler)
+
+    lines = [json.loads(r.getMessage()) for r in caplog.records if r.name == logger.name]
+    assert len(lines) == 1
+    assert lines[0]["streamed"] is False
+    assert lines[0]["stages"]["llm"] == 0.25
+    assert set(lines[0]["stages"]) == {"vector_search", "llm"}
+    assert lines[0]["total_seconds"] >= 0
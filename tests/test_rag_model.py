@@ -0,0 +1,171 @@
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.retrievers import BaseRetriever
+
+from rag_app import metrics
+from rag_app.rag_model import RAGModel
+
+
+class StaticRetriever(BaseRetriever):
+    '''Retriever that always returns the same documents'''
+
+    docs: list
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.docs
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(
+        "langchain_groq.ChatGroq", lambda **kwargs: FakeListChatModel(responses=["An answer."])
+    )
+    return RAGModel("fake-key")
+
+
+@pytest.fixture
+def retriever():
+    return StaticRetriever(docs=[Document(page_content="Salary: $120k")])
+
+
+def test_answer_chain_is_reused_across_queries(model, retriever):
+    '''
+    Test that repeated queries reuse the prebuilt answer chain
+    '''
+    chain = model.answer_chain
+    first = model.get_response(retriever, "What is the salary?")
+    model.get_response(retriever, "What are the benefits?")
+    assert model.answer_chain is chain
+    assert first["answer"] == "An answer."
+    assert [doc.page_content for doc in first["context"]] == ["Salary: $120k"]
+
+
+def test_set_retriever_rebinds_retriever_for_vectorstore(model, retriever):
+    '''
+    Test that retriever_for returns a newly bound retriever instead of building one
+    '''
+    store = object()
+    model.set_retriever(retriever, store)
+    other = StaticRetriever(docs=[Document(page_content="Benefits: dental")])
+    model.set_retriever(other, store)
+    assert model.retriever is other
+    assert model.retriever_for(store, build=lambda s: retriever) is other
+    response = model.get_response(model.retriever_for(store), "What are the benefits?")
+    assert [doc.page_content for doc in response["context"]] == ["Benefits: dental"]
+
+
+def test_retriever_for_reuses_retriever_of_same_vectorstore(model, retriever):
+    '''
+    Test that a vector store's retriever is created only once
+    '''
+    class Store:
+        calls = 0
+
+        def as_retriever(self):
+            Store.calls += 1
+            return retriever
+
+    store = Store()
+    assert model.retriever_for(store) is retriever
+    assert model.retriever_for(store) is retriever
+    assert Store.calls == 1
+
+
+def test_stream_response_yields_context_then_tokens(model, retriever):
+    '''
+    Test that streaming yields the retrieved context before the answer tokens
+    '''
+    parts = list(model.stream_response(retriever, "What is the salary?"))
+    assert [doc.page_content for doc in parts[0]["context"]] == ["Salary: $120k"]
+    assert "".join(part["answer"] for part in parts[1:]) == "An answer."
+    assert len(parts) > 2
+
+
+def test_get_response_times_each_stage(model):
+    '''
+    Test that a vector store query records embedding, search, prompt and LLM stages
+    '''
+    store = FAISS.from_texts(["Salary: $120k", "Benefits: dental"], DeterministicFakeEmbedding(size=8))
+    with metrics.track_query() as timings:
+        model.get_response(store.as_retriever(search_kwargs={"k": 1}), "What is the salary?")
+    assert {"query_embedding", "vector_search", "prompt_assembly", "llm"} <= set(timings.stages)
+
+
+class RateLimitError(Exception):
+    '''API error carrying an HTTP status and a Retry-After header'''
+
+    status_code = 429
+
+    def __init__(self):
+        super().__init__("Rate limit reached")
+        self.response = type("Response", (), {"headers": {"retry-after": "0"}})()
+
+
+class FlakyChain:
+    '''Answer chain failing with the given errors before answering'''
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def ainvoke(self, prompt_value):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "An answer."
+
+
+def test_batch_responses_retry_rate_limits(model, retriever):
+    '''
+    Test that rate-limited LLM calls are retried and results come back in order
+    '''
+    model.answer_chain = FlakyChain(RateLimitError(), RateLimitError())
+    completed = []
+    results = model.batch_responses(
+        retriever, ["What is the salary?", "What are the benefits?"],
+        concurrency=1, on_result=lambda i, response: completed.append(i),
+    )
+    assert [r["answer"] for r in results] == ["An answer.", "An answer."]
+    assert [r["input"] for r in results] == ["What is the salary?", "What are the benefits?"]
+    assert model.answer_chain.calls == 4
+    assert sorted(completed) == [0, 1]
+
+
+def test_batch_responses_isolate_failures(model, retriever):
+    '''
+    Test that a non-retryable error fails only its own question
+    '''
+    model.answer_chain = FlakyChain(ValueError("Invalid request"))
+    results = model.batch_responses(retriever, ["First?", "Second?"], concurrency=1)
+    assert results[0] == {"input": "First?", "error": "Invalid request"}
+    assert results[1]["answer"] == "An answer."
+    assert model.answer_chain.calls == 2
+
+
+def test_reranker_keeps_best_candidates(monkeypatch):
+    '''
+    Test that retrieved candidates are reranked before the prompt and timed as a stage
+    '''
+    from rag_app.reranker import CrossEncoderReranker
+
+    class LengthModel:
+        def predict(self, pairs, **kwargs):
+            return [len(text) for _, text in pairs]
+
+    monkeypatch.setattr(
+        "langchain_groq.ChatGroq", lambda **kwargs: FakeListChatModel(responses=["An answer."])
+    )
+    model = RAGModel("fake-key", reranker=CrossEncoderReranker(model=LengthModel(), top_n=1))
+    retriever = StaticRetriever(docs=[
+        Document(page_content="Salary: $120k"),
+        Document(page_content="Salary: $120k base plus a 10% annual bonus"),
+    ])
+    with metrics.track_query() as timings:
+        response = model.get_response(retriever, "What is the salary?")
+    assert [doc.page_content for doc in response["context"]] == [
+        "Salary: $120k base plus a 10% annual bonus"
+    ]
+    assert "rerank" in timings.stages
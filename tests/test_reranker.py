@@ -0,0 +1,47 @@
+from langchain_core.documents import Document
+
+from rag_app.reranker import CrossEncoderReranker
+
+
+class OverlapModel:
+    '''Cross-encoder stand-in scoring a pair by shared words and recording its batches'''
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches.append(pairs)
+        return [len(set(query.lower().split()) & set(text.lower().split())) for query, text in pairs]
+
+
+DOCS = [
+    Document(page_content="Benefits include dental and vision"),
+    Document(page_content="Required certifications: CPA or CFA"),
+    Document(page_content="The salary range is $90k to $120k"),
+]
+
+
+def test_candidates_are_scored_in_one_batch_and_cut_to_top_n():
+    '''
+    Test that chunks are reordered by cross-encoder score and only the best are kept
+    '''
+    model = OverlapModel()
+    reranker = CrossEncoderReranker(model=model, top_n=2)
+    docs = reranker.rerank("what is the salary range", DOCS)
+    assert docs[0] is DOCS[2]
+    assert len(docs) == 2
+    assert len(model.batches) == 1 and len(model.batches[0]) == 3
+
+
+def test_scores_are_cached_per_query_and_chunk():
+    '''
+    Test that repeated pairs skip the model and the cache is bounded
+    '''
+    model = OverlapModel()
+    reranker = CrossEncoderReranker(model=model, top_n=1, max_entries=4)
+    reranker.rerank("required certifications", DOCS)
+    assert reranker.rerank("required certifications", DOCS) == [DOCS[1]]
+    assert len(model.batches) == 1
+    reranker.rerank("required certifications", DOCS + [Document(page_content="CPA required")])
+    assert model.batches[-1] == [("required certifications", "CPA required")]
+    assert reranker.stats() == {"hits": 6, "misses": 4, "entries": 4}
@@ -0,0 +1,165 @@
+from unittest.mock import patch
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag_app import index_factory
+from rag_app.metadata import MetadataTable, extract_metadata
+from rag_app.retrievers import BM25Index, HybridRetriever, tokenize
+
+CHUNKS = {
+    "a::0": "Senior Financial Analyst responsible for budgeting and forecasting",
+    "b::0": "Marketing Coordinator with HubSpot and social media experience",
+    "c::0": "Software Engineer writing C++ and Python services",
+}
+
+
+def build_bm25():
+    bm25 = BM25Index()
+    for doc_id, text in CHUNKS.items():
+        bm25.add(doc_id, text)
+    return bm25
+
+
+def test_tokenize_keeps_language_names():
+    '''
+    Test that terms like C++ survive tokenization
+    '''
+    assert tokenize("C++ and C# Engineer") == ["c++", "and", "c#", "engineer"]
+
+
+def test_bm25_ranks_exact_terms_first():
+    '''
+    Test that a chunk containing the rare query term ranks first
+    '''
+    bm25 = build_bm25()
+    hits = bm25.search("Which role needs HubSpot?", k=3)
+    assert hits[0][0] == "b::0"
+    assert bm25.search("c++", k=3)[0][0] == "c::0"
+    assert bm25.search("unknownterm", k=3) == []
+
+
+def test_bm25_remove_and_replace():
+    '''
+    Test that removed chunks are no longer returned and re-adding replaces the text
+    '''
+    bm25 = build_bm25()
+    bm25.remove(["b::0", "missing"])
+    assert len(bm25) == 2
+    assert bm25.search("hubspot", k=3) == []
+    bm25.add("a::0", "HubSpot reporting")
+    assert bm25.search("hubspot", k=3)[0][0] == "a::0"
+    assert bm25.search("forecasting", k=3) == []
+    assert bm25.total_length == sum(bm25.doc_lengths.values())
+
+
+def test_hybrid_retriever_fuses_rankings():
+    '''
+    Test that the fused ranking returns k chunks and includes the BM25 match
+    '''
+    embeddings = DeterministicFakeEmbedding(size=16)
+    vectorstore = FAISS.from_texts(list(CHUNKS.values()), embeddings, ids=list(CHUNKS))
+    retriever = HybridRetriever(
+        vectorstore=vectorstore, bm25=build_bm25(), k=2, fetch_k=3, vector_weight=0.0
+    )
+    docs = retriever.invoke("HubSpot")
+    assert len(docs) == 2
+    assert docs[0].page_content == CHUNKS["b::0"]
+
+
+def test_hybrid_retriever_restricts_candidates_by_metadata():
+    '''
+    Test that filtered retrieval only returns chunks of the matching documents
+    '''
+    embeddings = DeterministicFakeEmbedding(size=16)
+    vectorstore = FAISS.from_texts(list(CHUNKS.values()), embeddings, ids=list(CHUNKS))
+    table = MetadataTable()
+    table.update(
+        {
+            "a": {"metadata": extract_metadata("Senior Financial Analyst.pdf")},
+            "b": {"metadata": extract_metadata("Marketing Coordinator.pdf")},
+            "c": {"metadata": extract_metadata("Software Engineer.pdf")},
+        },
+        vectorstore.index_to_docstore_id,
+    )
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=build_bm25(), metadata_table=table, k=3)
+
+    docs = retriever.invoke("experience", filters={"seniority": ["entry"]})
+    assert [doc.id for doc in docs] == ["b::0"]
+    assert retriever.invoke("anything", filters={"department": ["Legal"]}) == []
+
+
+def test_detected_roles_are_boosted_not_restricted():
+    '''
+    Test that a role detected in the question ranks first without excluding other roles
+    '''
+    embeddings = DeterministicFakeEmbedding(size=16)
+    vectorstore = FAISS.from_texts(list(CHUNKS.values()), embeddings, ids=list(CHUNKS))
+    table = MetadataTable()
+    table.update(
+        {
+            "a": {"metadata": extract_metadata("Senior Financial Analyst.pdf")},
+            "b": {"metadata": extract_metadata("Marketing Coordinator.pdf")},
+            "c": {"metadata": extract_metadata("Software Engineer.pdf")},
+        },
+        vectorstore.index_to_docstore_id,
+    )
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=build_bm25(), metadata_table=table, k=2)
+
+    docs = retriever.invoke("What does a Software Engineer do?")
+    assert docs[0].id == "c::0"
+    # Only "software engineer" is a known role; the HubSpot work must still be found
+    docs = retriever.invoke("Compare the software engineer and the HubSpot marketing role")
+    assert {doc.id for doc in docs} == {"b::0", "c::0"}
+
+
+def test_batch_retrieve_matches_invoke():
+    '''
+    Test that batched retrieval returns the same chunks as one query at a time
+    '''
+    embeddings = DeterministicFakeEmbedding(size=16)
+    vectorstore = FAISS.from_texts(list(CHUNKS.values()), embeddings, ids=list(CHUNKS))
+    table = MetadataTable()
+    table.update(
+        {
+            "a": {"metadata": extract_metadata("Senior Financial Analyst.pdf")},
+            "b": {"metadata": extract_metadata("Marketing Coordinator.pdf")},
+            "c": {"metadata": extract_metadata("Software Engineer.pdf")},
+        },
+        vectorstore.index_to_docstore_id,
+    )
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=build_bm25(), metadata_table=table, k=2)
+    queries = ["HubSpot", "What does a Software Engineer do?", "experience", "budgeting"]
+    filters = [None, None, {"seniority": ["entry"]}, {"department": ["Legal"]}]
+
+    with patch.object(DeterministicFakeEmbedding, "embed_documents", side_effect=AssertionError):
+        batched = retriever.batch_retrieve(queries, filters)
+    expected = [retriever.invoke(q, filters=f) for q, f in zip(queries, filters)]
+    assert [[doc.id for doc in docs] for docs in batched] == [[doc.id for doc in docs] for docs in expected]
+    assert batched[3] == []
+
+
+def test_batch_retrieve_searches_questions_with_the_same_filter_together():
+    '''
+    Test that questions restricted to the same chunks share one subset search
+    '''
+    embeddings = DeterministicFakeEmbedding(size=16)
+    vectorstore = FAISS.from_texts(list(CHUNKS.values()), embeddings, ids=list(CHUNKS))
+    table = MetadataTable()
+    table.update(
+        {
+            "a": {"metadata": extract_metadata("Senior Financial Analyst.pdf")},
+            "b": {"metadata": extract_metadata("Marketing Coordinator.pdf")},
+            "c": {"metadata": extract_metadata("Software Engineer.pdf")},
+        },
+        vectorstore.index_to_docstore_id,
+    )
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=build_bm25(), metadata_table=table, k=2)
+    queries = ["HubSpot", "social media", "budgeting", "forecasting"]
+    entry, senior = {"seniority": ["entry"]}, {"seniority": ["senior"]}
+    filters = [entry, entry, senior, senior]
+
+    with patch.object(index_factory, "search_subset", wraps=index_factory.search_subset) as search:
+        batched = retriever.batch_retrieve(queries, filters)
+    assert search.call_count == 2
+    assert [[doc.id for doc in docs] for docs in batched] == [["b::0"], ["b::0"], ["a::0"], ["a::0"]]
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from rag_app.rag_model import RAGModel
+from rag_app.service import ConcurrencyLimiter, create_app
+
+
+@pytest.fixture
+def processor():
+    vectorstore = FAISS.from_texts(
+        ["Salary: $120k", "Benefits: dental"], DeterministicFakeEmbedding(size=8)
+    )
+    return SimpleNamespace(
+        vectorstore=vectorstore,
+        index_version="v1",
+        update_index=lambda: None,
+        get_retriever=lambda store: store.as_retriever(),
+    )
+
+
+@pytest.fixture
+def client(processor):
+    model = RAGModel("fake-key", llm=FakeListChatModel(responses=["Stub answer."]))
+    with TestClient(create_app(processor=processor, model=model)) as client:
+        yield client
+
+
+def test_query_returns_answer_and_context(client):
+    '''
+    Test that the query endpoint answers with the stub LLM and retrieved chunks
+    '''
+    response = client.post("/query", json={"question": "What is the salary?"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"] == "Stub answer."
+    assert {c["page_content"] for c in body["context"]} == {"Salary: $120k", "Benefits: dental"}
+    assert body["index_version"] == "v1"
+    assert body["latency_seconds"] >= 0
+
+
+def test_health_reports_readiness(client, processor):
+    '''
+    Test that the health endpoint reflects whether the index is loaded
+    '''
+    assert client.get("/health").json()["status"] == "ok"
+    processor.vectorstore = None
+    response = client.get("/health")
+    assert response.status_code == 503
+    assert response.json()["status"] == "loading"
+
+
+def test_index_is_built_without_blocking_startup(processor):
+    '''
+    Test that the service answers 503 while the index is built in the background
+    '''
+    vectorstore, processor.vectorstore = processor.vectorstore, None
+    release = threading.Event()
+
+    def update_index():
+        assert release.wait(30)
+        processor.vectorstore = vectorstore
+
+    processor.update_index = update_index
+    model = RAGModel("fake-key", llm=FakeListChatModel(responses=["Stub answer."]))
+    with TestClient(create_app(processor=processor, model=model)) as client:
+        response = client.get("/health")
+        assert (response.status_code, response.json()["status"]) == (503, "loading")
+        assert client.post("/query", json={"question": "Salary?"}).status_code == 503
+        release.set()
+        for _ in range(300):
+            if client.get("/health").status_code == 200:
+                break
+            time.sleep(0.01)
+        assert client.post("/query", json={"question": "Salary?"}).status_code == 200
+
+
+def test_health_reports_failed_index_build(processor):
+    '''
+    Test that a failed background index build is reported by the health endpoint
+    '''
+    processor.vectorstore = None
+
+    def update_index():
+        raise ValueError("No PDF documents found")
+
+    processor.update_index = update_index
+    model = RAGModel("fake-key", llm=FakeListChatModel(responses=["Stub answer."]))
+    with TestClient(create_app(processor=processor, model=model)) as client:
+        for _ in range(300):
+            response = client.get("/health")
+            if response.json()["status"] != "loading":
+                break
+            time.sleep(0.01)
+        assert (response.status_code, response.json()["status"]) == (503, "failed")
+
+
+def test_limiter_rejects_when_queue_is_full():
+    '''
+    Test that requests beyond concurrency plus queue depth fail fast with 429
+    '''
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        running = [asyncio.create_task(hold()), asyncio.create_task(hold())]
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.waiting) == (1, 1)
+        with pytest.raises(HTTPException) as error:
+            async with limiter.slot():
+                pass
+        release.set()
+        await asyncio.gather(*running)
+        return error.value.status_code
+
+    assert asyncio.run(scenario()) == 429
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from rag_app.startup import ResourceLoader
+
+
+def test_loader_builds_processor_in_background():
+    '''
+    Test that the processor is built off the calling thread and returned once ready
+    '''
+    release = threading.Event()
+    threads = []
+
+    def factory():
+        threads.append(threading.current_thread())
+        release.wait(5)
+        return "processor"
+
+    loader = ResourceLoader(factory).start()
+    assert loader.status == "loading"
+    with pytest.raises(TimeoutError):
+        loader.wait(timeout=0.01)
+    release.set()
+    assert loader.wait(timeout=5) == "processor"
+    assert loader.status == "ready"
+    assert threads[0] is not threading.current_thread()
+
+
+def test_loader_reports_failure():
+    '''
+    Test that a loading error is reported as status and re-raised to waiters
+    '''
+    def factory():
+        raise RuntimeError("model download failed")
+
+    loader = ResourceLoader(factory).start()
+    assert loader.join(timeout=5)
+    assert loader.status == "failed"
+    with pytest.raises(RuntimeError, match="model download failed"):
+        loader.wait()
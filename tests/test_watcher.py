@@ -0,0 +1,82 @@
+import os
+import shutil
+import threading
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from rag_app.document_processor import DocumentProcessor
+from rag_app.watcher import IndexWatcher
+
+SAMPLE_PDFS = ["Marketing Coordinator.pdf", "Senior Financial Analyst.pdf"]
+
+
+def test_watcher_updates_once_per_burst_of_changes(tmp_path):
+    '''
+    Test that a burst of new PDFs is picked up by a single background update
+    '''
+    docs_path = tmp_path / "docs"
+    docs_path.mkdir()
+    processor = DocumentProcessor(
+        path=str(docs_path), index_path=str(tmp_path / "index"),
+        embeddings=DeterministicFakeEmbedding(size=32),
+    )
+    shutil.copy(os.path.join("job_descriptions", SAMPLE_PDFS[0]), docs_path)
+
+    updates = []
+    updated = threading.Event()
+
+    def on_update(stats):
+        updates.append(stats)
+        updated.set()
+
+    watcher = IndexWatcher(
+        processor, interval_seconds=0.05, debounce_seconds=0.3, duty_cycle=0.5, on_update=on_update
+    ).start()
+    try:
+        assert updated.wait(30)
+        updated.clear()
+        first_version = processor.index_version
+        for name in ["Senior Financial Analyst.pdf", "Copy of Senior Financial Analyst.pdf"]:
+            shutil.copy(os.path.join("job_descriptions", SAMPLE_PDFS[1]), docs_path / name)
+        assert updated.wait(30)
+    finally:
+        watcher.stop(timeout=30)
+
+    assert len(updates) == 2
+    assert updates[1]["added"] > 0 and updates[1]["removed"] == 0
+    assert processor.index_version != first_version
+    assert len(processor.indexed_files) == 3
+
+
+def test_failed_update_is_retried(tmp_path):
+    '''
+    Test that an update that failed is retried without further file changes
+    '''
+    attempts = []
+    retried = threading.Event()
+
+    class FlakyProcessor:
+        path = str(tmp_path)
+
+        def update_index(self, progress_callback=None):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("disk full")
+            retried.set()
+            return {"added": 0, "updated": 0, "removed": 0}
+
+    watcher = IndexWatcher(FlakyProcessor(), interval_seconds=0.05, debounce_seconds=0.1).start()
+    try:
+        assert retried.wait(30)
+    finally:
+        watcher.stop(timeout=30)
+    assert watcher.last_error is None
+
+
+def test_duty_cycle_must_be_a_fraction():
+    '''
+    Test that an invalid duty cycle is rejected
+    '''
+    with pytest.raises(ValueError):
+        IndexWatcher(processor=None, duty_cycle=0)